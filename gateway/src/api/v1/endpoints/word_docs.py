@@ -59,6 +59,40 @@ async def upload_word_document(
     return response
 
 
+@router.post("/upload-url", summary="Tạo URL upload trực tiếp tài liệu Word")
+async def create_word_upload_url(
+        filename: str = Form(...),
+        title: Optional[str] = Form(None),
+        description: Optional[str] = Form(None),
+        current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Tạo presigned URL để upload file Word lớn thẳng lên MinIO.
+    """
+    headers = {"X-User-ID": str(current_user["id"])}
+    data_payload = {"filename": filename}
+    if title:
+        data_payload["title"] = title
+    if description:
+        data_payload["description"] = description
+
+    response = await word_service.post_form("/documents/upload-url", data=data_payload, headers=headers)
+    return response
+
+
+@router.post("/{document_id}/finalize", summary="Hoàn tất upload trực tiếp tài liệu Word")
+async def finalize_word_upload(
+        document_id: str,
+        current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Ghi nhận tài liệu Word đã được upload trực tiếp lên MinIO.
+    """
+    headers = {"X-User-ID": str(current_user["id"])}
+    response = await word_service.post_form(f"/documents/{document_id}/finalize", headers=headers)
+    return response
+
+
 @router.post("/convert/to-pdf", summary="Chuyển đổi tài liệu Word sang PDF")
 async def convert_word_to_pdf(
         file: UploadFile = File(...),
@@ -161,6 +195,19 @@ async def get_word_templates(
     return response
 
 
+@router.get("/status/{task_id}", summary="Lấy trạng thái tác vụ xử lý tài liệu Word")
+async def get_word_task_status(
+    task_id: str,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Lấy trạng thái tác vụ chuyển đổi/watermark/áp dụng mẫu.
+    """
+    headers = {"X-User-ID": str(current_user["id"])}
+    response = await word_service.get(f"/documents/tasks/{task_id}", headers=headers)
+    return response
+
+
 @router.get("/download/{document_id}", summary="Tải xuống tài liệu Word")
 async def download_word_document(
     document_id: str,
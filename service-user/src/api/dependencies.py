@@ -7,8 +7,8 @@ import jwt
 from jwt.exceptions import PyJWTError
 
 from domain.models import User, TokenData
-from infrastructure.database import get_db_session
-from infrastructure.repository import UserRepository, RoleRepository, RefreshTokenRepository, DocumentRepository, DocumentCategoryRepository
+from infrastructure.database import get_db_session, get_lookup_db_session
+from infrastructure.repository import UserRepository, CachedUserRepository, RoleRepository, RefreshTokenRepository, DocumentRepository, DocumentCategoryRepository
 from application.services import UserService, AuthService, DocumentService, DocumentCategoryService
 from application.security import verify_token
 from core.config import settings
@@ -18,11 +18,11 @@ logger = logging.getLogger(__name__)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
 
 
-def get_user_repository(session: AsyncSession = Depends(get_db_session)) -> UserRepository:
+def get_user_repository(session: AsyncSession = Depends(get_db_session)) -> CachedUserRepository:
     """
-    Dependency để lấy UserRepository.
+    Dependency để lấy UserRepository (có cache roles/permissions).
     """
-    return UserRepository(session)
+    return CachedUserRepository(session)
 
 
 def get_role_repository(session: AsyncSession = Depends(get_db_session)) -> RoleRepository:
@@ -32,6 +32,13 @@ def get_role_repository(session: AsyncSession = Depends(get_db_session)) -> Role
     return RoleRepository(session)
 
 
+def get_lookup_role_repository(session: AsyncSession = Depends(get_lookup_db_session)) -> RoleRepository:
+    """
+    Dependency để lấy RoleRepository trên session riêng, dùng cho truy vấn song song.
+    """
+    return RoleRepository(session)
+
+
 def get_refresh_token_repository(session: AsyncSession = Depends(get_db_session)) -> RefreshTokenRepository:
     """
     Dependency để lấy RefreshTokenRepository.
@@ -65,7 +72,7 @@ def get_user_service(
 
 def get_auth_service(
     user_repository: UserRepository = Depends(get_user_repository),
-    role_repository: RoleRepository = Depends(get_role_repository),
+    role_repository: RoleRepository = Depends(get_lookup_role_repository),
     token_repository: RefreshTokenRepository = Depends(get_refresh_token_repository)
 ) -> AuthService:
     """
@@ -10,7 +10,6 @@ from application.services import UserService, AuthService, DocumentService, Docu
 from application.dto import UserCreateDTO, UserUpdateDTO, UserRegisterDTO, TokenResponseDTO
 from api.dependencies import get_user_service, get_current_user, get_auth_service, get_document_service, get_document_category_service, get_optional_current_user
 from domain.models import User, Document, DocumentCategory
-from application.security import create_access_token
 from core.config import settings
 
 router = APIRouter()
@@ -143,7 +142,7 @@ async def refresh_token(
         token_data = await auth_service.verify_refresh_token(refresh_token)
         user_id = token_data.user_id
         
-        user = await user_service.get_user(user_id)
+        user = await user_service.get_user_for_token(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -151,7 +150,7 @@ async def refresh_token(
                 headers={"WWW-Authenticate": "Bearer"},
             )
             
-        access_token = create_access_token(user)
+        access_token = await user_service.create_user_access_token(user)
         new_refresh_token = await auth_service.create_refresh_token(user_id)
         
         await auth_service.revoke_refresh_token(refresh_token)
@@ -226,7 +225,13 @@ async def create_user(
     """
     Tạo người dùng mới.
     """
-    return await user_service.create_user(user_data)
+    try:
+        return await user_service.create_user(user_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.put("/users/{user_id}", tags=["users"])
 async def update_user(
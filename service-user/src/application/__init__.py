@@ -1,6 +1,6 @@
 from application.services import UserService, RoleService, AuthService
 from application.dto import UserCreateDTO, UserUpdateDTO, RoleCreateDTO, RoleUpdateDTO
-from application.security import create_access_token, get_password_hash, verify_password, verify_token
+from application.security import create_access_token, get_password_hash, get_password_hash_async, verify_password, verify_password_async, verify_token
 
 __all__ = [
     "UserService",
@@ -12,6 +12,8 @@ __all__ = [
     "RoleUpdateDTO",
     "create_access_token",
     "get_password_hash",
+    "get_password_hash_async",
     "verify_password",
+    "verify_password_async",
     "verify_token"
 ] 
\ No newline at end of file
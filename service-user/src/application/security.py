@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from passlib.context import CryptContext
 from jose import jwt, JWTError
+import asyncio
 import uuid
 import json
 
@@ -9,7 +10,7 @@ from core.config import settings
 from domain.models import User, TokenData
 from domain.exceptions import TokenExpiredException, InvalidTokenException
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -39,6 +40,33 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Xác minh mật khẩu trong thread pool để không chặn event loop.
+    
+    Args:
+        plain_password: Mật khẩu gốc
+        hashed_password: Mật khẩu đã được băm
+    
+    Returns:
+        True nếu mật khẩu khớp, ngược lại False
+    """
+    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Băm mật khẩu trong thread pool để không chặn event loop.
+    
+    Args:
+        password: Mật khẩu gốc
+    
+    Returns:
+        Mật khẩu đã được băm
+    """
+    return await asyncio.to_thread(pwd_context.hash, password)
+
+
 def create_access_token(
     user_or_id,
     username: str = None,
@@ -79,7 +107,7 @@ def create_access_token(
         else:
             user_id = user_or_id
             
-        if not username or not roles or not permissions:
+        if not username or roles is None or permissions is None:
             raise ValueError("Nếu user_or_id không phải là User object, phải cung cấp username, roles và permissions")
     
     if expires_delta:
@@ -1,21 +1,26 @@
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+import asyncio
 import logging
 import json
 
-from domain.models import TokenData, User, Role, Permission, RefreshToken, UserProfile, Document, DocumentCategory
-from infrastructure.repository import UserRepository, RoleRepository, RefreshTokenRepository, DocumentRepository, DocumentCategoryRepository
+from domain.models import TokenData, User, Role, Permission, UserProfile, Document, DocumentCategory
+from infrastructure.repository import UserRepository, CachedUserRepository, RoleRepository, RefreshTokenRepository, DocumentRepository, DocumentCategoryRepository
 from application.dto import UserCreateDTO, UserUpdateDTO, RoleCreateDTO, RoleUpdateDTO
-from application.security import verify_password, get_password_hash, create_access_token, create_refresh_token
+from application.security import verify_password_async, get_password_hash_async, create_access_token, create_refresh_token
 from domain.exceptions import UserNotFoundException, RoleNotFoundException
 
 logger = logging.getLogger(__name__)
 
+_USER_UPDATE_FIELDS = ("full_name", "is_active", "is_verified", "profile_image")
+_ROLE_UPDATE_FIELDS = ("description",)
+
 
 class UserService:
     """Service cho các hoạt động liên quan đến User."""
     
-    def __init__(self, repository: UserRepository, token_repository: RefreshTokenRepository):
+    def __init__(self, repository: CachedUserRepository, token_repository: RefreshTokenRepository):
         self.repository = repository
         self.token_repository = token_repository
     
@@ -35,35 +40,48 @@ class UserService:
         """Lấy thông tin user theo email."""
         return await self.repository.get_user_by_email(email)
     
+    async def get_user_for_token(self, user_id: str) -> Optional[User]:
+        """Lấy user theo ID cho việc cấp token, không nạp roles/permissions."""
+        return await self.repository.get_user_for_token(user_id)
+    
+    async def create_user_access_token(self, user: User) -> str:
+        """Tạo access token cho user, lấy roles/permissions từ cache nếu có."""
+        roles, permissions = await self.repository.get_roles_permissions(user)
+        return create_access_token(
+            user.id,
+            username=user.username,
+            roles=roles,
+            permissions=permissions
+        )
+    
     async def get_users(self, skip: int = 0, limit: int = 100) -> List[User]:
         """Lấy danh sách users."""
         return await self.repository.get_users(skip, limit)
     
     async def create_user(self, user_data: UserCreateDTO) -> Optional[User]:
         """Tạo user mới."""
-        existing_user = await self.repository.get_user_by_username(user_data.username)
-        if existing_user:
-            logger.warning(f"Tên đăng nhập đã tồn tại: {user_data.username}")
-            return None
-
-        existing_email = await self.repository.get_user_by_email(user_data.email)
-        if existing_email:
-            logger.warning(f"Email đã tồn tại: {user_data.email}")
-            return None
-
         try:
-            hashed_password = get_password_hash(user_data.password)
+            hashed_password = await get_password_hash_async(user_data.password)
             
-            user = User(
-                username=user_data.username,
-                email=user_data.email,
-                hashed_password=hashed_password,
-                full_name=user_data.full_name,
-                is_active=user_data.is_active if user_data.is_active is not None else True,
-                is_verified=user_data.is_verified if user_data.is_verified is not None else False,
-            )
+            user = {
+                "username": user_data.username,
+                "email": user_data.email,
+                "hashed_password": hashed_password,
+                "full_name": user_data.full_name,
+                "is_active": user_data.is_active if user_data.is_active is not None else True,
+                "is_verified": user_data.is_verified if user_data.is_verified is not None else False,
+            }
             
             return await self.repository.create_user(user)
+        except IntegrityError as e:
+            detail = str(e.orig)
+            if "(username)" in detail:
+                logger.warning(f"Tên đăng nhập đã tồn tại: {user_data.username}")
+                raise ValueError(f"Username '{user_data.username}' already exists")
+            if "(email)" in detail:
+                logger.warning(f"Email đã tồn tại: {user_data.email}")
+                raise ValueError(f"Email '{user_data.email}' already exists")
+            raise
         except Exception as e:
             logger.error(f"Lỗi khi tạo người dùng: {str(e)}")
             return None
@@ -74,34 +92,19 @@ class UserService:
         if not user:
             return None
         
-        update_data = {}
+        update_data = {k: v for k in _USER_UPDATE_FIELDS if (v := getattr(user_data, k)) is not None}
         
         if user_data.email is not None and user_data.email != user.email:
-            existing_user = await self.repository.get_user_by_email(user_data.email)
-            if existing_user and existing_user.id != user_id:
+            if await self.repository.exists_by_email(user_data.email):
                 raise ValueError(f"Email '{user_data.email}' already exists")
             update_data["email"] = user_data.email
         
-        if user_data.full_name is not None:
-            update_data["full_name"] = user_data.full_name
-        
-        if user_data.is_active is not None:
-            update_data["is_active"] = user_data.is_active
-        
-        if user_data.is_verified is not None:
-            update_data["is_verified"] = user_data.is_verified
-        
-        if user_data.profile_image is not None:
-            update_data["profile_image"] = user_data.profile_image
-        
         if user_data.password is not None:
-            update_data["hashed_password"] = get_password_hash(user_data.password)
+            update_data["hashed_password"] = await get_password_hash_async(user_data.password)
         
         if not update_data:
             return user
         
-        update_data["updated_at"] = datetime.utcnow()
-        
         return await self.repository.update_user(user_id, update_data)
     
     async def delete_user(self, user_id: str) -> bool:
@@ -114,30 +117,28 @@ class UserService:
     
     async def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         """Xác thực user với username và password."""
-        user = await self.repository.get_user_by_username(username)
+        user = await self.repository.get_user_for_auth(username)
         if not user:
             return None
         
-        if not verify_password(password, user.hashed_password):
+        if not await verify_password_async(password, user.hashed_password):
             return None
         
         await self.repository.update_user(user.id, {"last_login": datetime.utcnow()})
 
-        access_token = create_access_token(
-            user_or_id=user
-        )
+        access_token = await self.create_user_access_token(user)
         
         token_str = create_refresh_token()
         expires_at = datetime.utcnow() + timedelta(days=30)
         
-        refresh_token_obj = RefreshToken(
-            token=token_str,
-            user_id=user.id,
-            expires_at=expires_at,
-            created_at=datetime.utcnow()
-        )
+        refresh_token_data = {
+            "token": token_str,
+            "user_id": user.id,
+            "expires_at": expires_at,
+            "created_at": datetime.utcnow()
+        }
         
-        refresh_token = await self.token_repository.create_refresh_token(refresh_token_obj)
+        refresh_token = await self.token_repository.create_refresh_token(refresh_token_data)
 
         return {
             "access_token": access_token,
@@ -170,16 +171,17 @@ class RoleService:
     
     async def create_role(self, role_data: RoleCreateDTO) -> Role:
         """Tạo role mới."""
-        existing_role = await self.repository.get_role_by_name(role_data.name)
-        if existing_role:
-            raise ValueError(f"Role '{role_data.name}' already exists")
-        
-        role = Role(
-            name=role_data.name,
-            description=role_data.description
-        )
+        role = {
+            "name": role_data.name,
+            "description": role_data.description
+        }
         
-        return await self.repository.create_role(role)
+        try:
+            return await self.repository.create_role(role)
+        except IntegrityError as e:
+            if "(name)" in str(e.orig):
+                raise ValueError(f"Role '{role_data.name}' already exists")
+            raise
     
     async def update_role(self, role_id: str, role_data: RoleUpdateDTO) -> Optional[Role]:
         """Cập nhật thông tin role."""
@@ -187,22 +189,16 @@ class RoleService:
         if not role:
             return None
         
-        update_data = {}
+        update_data = {k: v for k in _ROLE_UPDATE_FIELDS if (v := getattr(role_data, k)) is not None}
         
         if role_data.name is not None and role_data.name != role.name:
-            existing_role = await self.repository.get_role_by_name(role_data.name)
-            if existing_role and existing_role.id != role_id:
+            if await self.repository.exists_by_name(role_data.name):
                 raise ValueError(f"Role '{role_data.name}' already exists")
             update_data["name"] = role_data.name
         
-        if role_data.description is not None:
-            update_data["description"] = role_data.description
-        
         if not update_data:
             return role
         
-        update_data["updated_at"] = datetime.utcnow()
-        
         return await self.repository.update_role(role_id, update_data)
     
     async def delete_role(self, role_id: str) -> bool:
@@ -229,11 +225,13 @@ class AuthService:
     
     async def assign_role_to_user(self, user_id: str, role_id: str) -> bool:
         """Gán role cho user."""
-        user = await self.user_repository.get_user_by_id(user_id)
+        user, role = await asyncio.gather(
+            self.user_repository.get_user_by_id(user_id),
+            self.role_repository.get_role_by_id(role_id)
+        )
         if not user:
             raise UserNotFoundException(f"User with ID {user_id} not found")
         
-        role = await self.role_repository.get_role_by_id(role_id)
         if not role:
             raise RoleNotFoundException(f"Role with ID {role_id} not found")
         
@@ -242,11 +240,13 @@ class AuthService:
     
     async def remove_role_from_user(self, user_id: str, role_id: str) -> bool:
         """Xóa role khỏi user."""
-        user = await self.user_repository.get_user_by_id(user_id)
+        user, role = await asyncio.gather(
+            self.user_repository.get_user_by_id(user_id),
+            self.role_repository.get_role_by_id(role_id)
+        )
         if not user:
             raise UserNotFoundException(f"User with ID {user_id} not found")
         
-        role = await self.role_repository.get_role_by_id(role_id)
         if not role:
             raise RoleNotFoundException(f"Role with ID {role_id} not found")
         
@@ -267,12 +267,12 @@ class AuthService:
         
         token_str = create_token()
         expires_at = datetime.utcnow() + timedelta(days=30) 
-        refresh_token = RefreshToken(
-            token=token_str,
-            user_id=user_id,
-            expires_at=expires_at,
-            created_at=datetime.utcnow()
-        )
+        refresh_token = {
+            "token": token_str,
+            "user_id": user_id,
+            "expires_at": expires_at,
+            "created_at": datetime.utcnow()
+        }
         
         await self.token_repository.create_refresh_token(refresh_token)
         
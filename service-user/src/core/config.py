@@ -24,6 +24,12 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+    # Role/permission cache settings
+    # Cache nằm trong từng tiến trình: replica khác chỉ thấy thay đổi role sau tối đa ROLE_CACHE_TTL_SECONDS
+    ROLE_CACHE_TTL_SECONDS: int = int(os.getenv("ROLE_CACHE_TTL_SECONDS", "60"))
+    ROLE_CACHE_MAXSIZE: int = int(os.getenv("ROLE_CACHE_MAXSIZE", "10000"))
 
     # RabbitMQ settings
     RABBITMQ_HOST: str = os.getenv("RABBITMQ_HOST", "rabbitmq")
@@ -2,8 +2,8 @@ from datetime import datetime
 from enum import Enum
 from typing import List, Optional, Dict, Any
 import uuid
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table, Text, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -36,10 +36,12 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     last_login = Column(DateTime, nullable=True)
     profile_image = Column(String(255), nullable=True)
     user_metadata = Column(Text, nullable=True)
+    # {"roles": [...], "permissions": [{"resource": ..., "action": ...}]}, được trigger trong DB cập nhật
+    role_cache = Column(JSONB, nullable=True)
 
     roles = relationship("Role", secondary=user_roles, back_populates="users")
     refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
@@ -92,7 +94,7 @@ class Role(Base):
     name = Column(String(50), unique=True, index=True, nullable=False)
     description = Column(String(255))
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     users = relationship("User", secondary=user_roles, back_populates="roles")
     permissions = relationship("Permission", secondary=role_permissions, back_populates="roles")
@@ -1,10 +1,11 @@
 from infrastructure.database import get_db_session, init_db
-from infrastructure.repository import UserRepository, RoleRepository, RefreshTokenRepository
+from infrastructure.repository import UserRepository, CachedUserRepository, RoleRepository, RefreshTokenRepository
 
 __all__ = [
     "get_db_session",
     "init_db",
     "UserRepository",
+    "CachedUserRepository",
     "RoleRepository", 
     "RefreshTokenRepository"
 ] 
\ No newline at end of file
@@ -0,0 +1,36 @@
+from typing import Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from core.config import settings
+
+RolesPermissions = Tuple[List[str], List[Dict[str, str]]]
+
+_role_permission_cache: TTLCache = TTLCache(
+    maxsize=settings.ROLE_CACHE_MAXSIZE,
+    ttl=settings.ROLE_CACHE_TTL_SECONDS
+)
+
+
+def get_cached_roles_permissions(user_id: str) -> Optional[RolesPermissions]:
+    """
+    Lấy (roles, permissions) của user từ cache trong tiến trình.
+    """
+    return _role_permission_cache.get(str(user_id))
+
+
+def cache_roles_permissions(user_id: str, roles: List[str], permissions: List[Dict[str, str]]) -> None:
+    """
+    Lưu (roles, permissions) của user vào cache.
+    """
+    _role_permission_cache[str(user_id)] = (roles, permissions)
+
+
+def invalidate_roles_permissions(user_id: Optional[str] = None) -> None:
+    """
+    Xóa cache của một user, hoặc toàn bộ cache nếu không truyền user_id.
+    """
+    if user_id is None:
+        _role_permission_cache.clear()
+    else:
+        _role_permission_cache.pop(str(user_id), None)
@@ -20,6 +20,98 @@ async_session_factory = sessionmaker(
     expire_on_commit=False
 )
 
+ROLE_CACHE_STATEMENTS = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS role_cache JSONB",
+    """
+    CREATE OR REPLACE FUNCTION refresh_user_role_cache(target_user_id UUID) RETURNS void AS $$
+    BEGIN
+        UPDATE users SET role_cache = jsonb_build_object(
+            'roles', COALESCE((
+                SELECT jsonb_agg(DISTINCT r.name)
+                FROM user_roles ur JOIN roles r ON r.id = ur.role_id
+                WHERE ur.user_id = target_user_id
+            ), '[]'::jsonb),
+            'permissions', COALESCE((
+                SELECT jsonb_agg(DISTINCT jsonb_build_object('resource', p.resource, 'action', p.action))
+                FROM user_roles ur
+                JOIN role_permissions rp ON rp.role_id = ur.role_id
+                JOIN permissions p ON p.id = rp.permission_id
+                WHERE ur.user_id = target_user_id
+            ), '[]'::jsonb)
+        )
+        WHERE id = target_user_id;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION user_roles_refresh_role_cache() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            PERFORM refresh_user_role_cache(OLD.user_id);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM refresh_user_role_cache(NEW.user_id);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION role_permissions_refresh_role_cache() RETURNS trigger AS $$
+    DECLARE
+        changed_role_ids UUID[];
+    BEGIN
+        IF TG_TABLE_NAME = 'roles' THEN
+            changed_role_ids := ARRAY[NEW.id];
+        ELSIF TG_OP = 'DELETE' THEN
+            changed_role_ids := ARRAY[OLD.role_id];
+        ELSIF TG_OP = 'UPDATE' THEN
+            changed_role_ids := ARRAY[OLD.role_id, NEW.role_id];
+        ELSE
+            changed_role_ids := ARRAY[NEW.role_id];
+        END IF;
+        PERFORM refresh_user_role_cache(affected.user_id)
+        FROM (SELECT DISTINCT ur.user_id FROM user_roles ur WHERE ur.role_id = ANY(changed_role_ids)) affected;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION permissions_refresh_role_cache() RETURNS trigger AS $$
+    BEGIN
+        PERFORM refresh_user_role_cache(affected.user_id)
+        FROM (
+            SELECT DISTINCT ur.user_id
+            FROM role_permissions rp JOIN user_roles ur ON ur.role_id = rp.role_id
+            WHERE rp.permission_id = NEW.id
+        ) affected;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_user_roles_role_cache
+    AFTER INSERT OR UPDATE OR DELETE ON user_roles
+    FOR EACH ROW EXECUTE FUNCTION user_roles_refresh_role_cache()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_role_permissions_role_cache
+    AFTER INSERT OR UPDATE OR DELETE ON role_permissions
+    FOR EACH ROW EXECUTE FUNCTION role_permissions_refresh_role_cache()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_permissions_role_cache
+    AFTER UPDATE OF resource, action ON permissions
+    FOR EACH ROW EXECUTE FUNCTION permissions_refresh_role_cache()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_roles_role_cache
+    AFTER UPDATE OF name ON roles
+    FOR EACH ROW EXECUTE FUNCTION role_permissions_refresh_role_cache()
+    """,
+    "SELECT refresh_user_role_cache(id) FROM users WHERE role_cache IS NULL",
+]
+
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency để lấy session database.
@@ -35,6 +127,17 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+async def get_lookup_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency để lấy session database riêng cho các truy vấn đọc chạy song song
+    với session chính của request (AsyncSession không hỗ trợ truy vấn đồng thời).
+    """
+    async with async_session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
 async def init_db():
     """
     Khởi tạo database nếu cần.
@@ -61,4 +164,7 @@ async def init_db():
                     await conn.execute(sa.text("ALTER TABLE users ADD COLUMN user_metadata TEXT"))
                     print("Đã thêm cột user_metadata.")
             except Exception as e2:
-                print(f"Không thể thêm cột user_metadata: {str(e2)}") 
\ No newline at end of file
+                print(f"Không thể thêm cột user_metadata: {str(e2)}")
+
+        for statement in ROLE_CACHE_STATEMENTS:
+            await conn.execute(sa.text(statement)) 
\ No newline at end of file
@@ -1,13 +1,28 @@
 from typing import List, Optional, Dict, Any
-from sqlalchemy import select, update, delete, func, and_
+from sqlalchemy import select, insert, update, delete, func, and_, event
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from datetime import datetime
 
 from domain.models import User, Role, Permission, RefreshToken, Document, DocumentCategory
+from infrastructure.cache import (
+    RolesPermissions, get_cached_roles_permissions, cache_roles_permissions, invalidate_roles_permissions
+)
 from application.security import get_password_hash, verify_password
 
 
+def _invalidate_roles_permissions_after_commit(session: AsyncSession, user_id: Optional[str] = None) -> None:
+    """
+    Xóa cache (roles, permissions) sau khi transaction commit thành công,
+    để request khác không nạp lại dữ liệu cũ vào cache trước lúc commit.
+    """
+    event.listen(
+        session.sync_session, "after_commit",
+        lambda _session: invalidate_roles_permissions(user_id),
+        once=True
+    )
+
+
 class UserRepository:
     """Repository để tương tác với database để quản lý User."""
     
@@ -32,6 +47,13 @@ class UserRepository:
         result = await self.session.execute(query)
         return result.scalars().first()
     
+    async def get_user_for_auth(self, username: str) -> Optional[User]:
+        """Lấy user theo username cho luồng xác thực, đọc roles/permissions từ role_cache."""
+        query = select(User).where(User.username == username)
+        
+        result = await self.session.execute(query)
+        return result.scalars().first()
+    
     async def get_user_by_email(self, email: str) -> Optional[User]:
         """Lấy user theo email."""
         query = select(User).options(
@@ -41,6 +63,11 @@ class UserRepository:
         result = await self.session.execute(query)
         return result.scalars().first()
     
+    async def exists_by_email(self, email: str) -> bool:
+        """Kiểm tra email đã tồn tại mà không nạp entity."""
+        query = select(1).where(User.email == email).limit(1)
+        return (await self.session.scalar(query)) is not None
+    
     async def get_users(self, skip: int = 0, limit: int = 100) -> List[User]:
         """Lấy danh sách users với phân trang."""
         query = select(User).options(
@@ -50,12 +77,11 @@ class UserRepository:
         result = await self.session.execute(query)
         return list(result.scalars().all())
     
-    async def create_user(self, user: User) -> User:
+    async def create_user(self, user_data: Dict[str, Any]) -> User:
         """Tạo user mới."""
-        self.session.add(user)
-        await self.session.flush()
-        await self.session.refresh(user)
-        return user
+        query = insert(User).values(**user_data).returning(User)
+        result = await self.session.execute(query)
+        return result.scalar_one()
     
     async def update_user(self, user_id: str, user_data: Dict[str, Any]) -> Optional[User]:
         """Cập nhật thông tin user."""
@@ -72,13 +98,59 @@ class UserRepository:
     
     async def assign_role_to_user(self, user: User, role: Role) -> None:
         """Gán role cho user."""
+        role = await self.session.merge(role, load=False)
         user.roles.append(role)
         await self.session.flush()
+        self.session.expire(user, ["role_cache"])
     
     async def remove_role_from_user(self, user: User, role: Role) -> None:
         """Xóa role khỏi user."""
+        role = await self.session.merge(role, load=False)
         user.roles.remove(role)
         await self.session.flush()
+        self.session.expire(user, ["role_cache"])
+
+
+class CachedUserRepository(UserRepository):
+    """UserRepository có cache (roles, permissions) theo user_id cho luồng cấp token."""
+    
+    async def get_user_for_token(self, user_id: str) -> Optional[User]:
+        """Lấy user theo ID mà không nạp roles/permissions."""
+        query = select(User).where(User.id == user_id)
+        
+        result = await self.session.execute(query)
+        return result.scalars().first()
+    
+    async def get_roles_permissions(self, user: User) -> RolesPermissions:
+        """Lấy (roles, permissions) của user: cache -> role_cache -> quan hệ roles."""
+        cached = get_cached_roles_permissions(user.id)
+        if cached is not None:
+            return cached
+        
+        if user.role_cache is not None:
+            roles = user.role_cache.get("roles", [])
+            permissions = user.role_cache.get("permissions", [])
+        else:
+            user = await self.get_user_by_id(user.id)
+            roles = [role.name for role in user.roles]
+            permissions = [
+                {"resource": permission.resource, "action": permission.action}
+                for role in user.roles
+                for permission in role.permissions
+            ]
+        
+        cache_roles_permissions(user.id, roles, permissions)
+        return roles, permissions
+    
+    async def assign_role_to_user(self, user: User, role: Role) -> None:
+        """Gán role cho user và xóa cache của user."""
+        await super().assign_role_to_user(user, role)
+        _invalidate_roles_permissions_after_commit(self.session, user.id)
+    
+    async def remove_role_from_user(self, user: User, role: Role) -> None:
+        """Xóa role khỏi user và xóa cache của user."""
+        await super().remove_role_from_user(user, role)
+        _invalidate_roles_permissions_after_commit(self.session, user.id)
 
 
 class RoleRepository:
@@ -105,6 +177,11 @@ class RoleRepository:
         result = await self.session.execute(query)
         return result.scalars().first()
     
+    async def exists_by_name(self, name: str) -> bool:
+        """Kiểm tra tên role đã tồn tại mà không nạp entity."""
+        query = select(1).where(Role.name == name).limit(1)
+        return (await self.session.scalar(query)) is not None
+    
     async def get_roles(self) -> List[Role]:
         """Lấy danh sách roles."""
         query = select(Role).options(
@@ -114,35 +191,38 @@ class RoleRepository:
         result = await self.session.execute(query)
         return list(result.scalars().all())
     
-    async def create_role(self, role: Role) -> Role:
+    async def create_role(self, role_data: Dict[str, Any]) -> Role:
         """Tạo role mới."""
-        self.session.add(role)
-        await self.session.flush()
-        await self.session.refresh(role)
-        return role
+        query = insert(Role).values(**role_data).returning(Role)
+        result = await self.session.execute(query)
+        return result.scalar_one()
     
     async def update_role(self, role_id: str, role_data: Dict[str, Any]) -> Optional[Role]:
         """Cập nhật thông tin role."""
         query = update(Role).where(Role.id == role_id).values(**role_data).returning(Role)
         result = await self.session.execute(query)
         await self.session.flush()
+        _invalidate_roles_permissions_after_commit(self.session)
         return result.scalars().first()
     
     async def delete_role(self, role_id: str) -> bool:
         """Xóa role."""
         query = delete(Role).where(Role.id == role_id)
         result = await self.session.execute(query)
+        _invalidate_roles_permissions_after_commit(self.session)
         return result.rowcount > 0
     
     async def assign_permission_to_role(self, role: Role, permission: Permission) -> None:
         """Gán permission cho role."""
         role.permissions.append(permission)
         await self.session.flush()
+        _invalidate_roles_permissions_after_commit(self.session)
     
     async def remove_permission_from_role(self, role: Role, permission: Permission) -> None:
         """Xóa permission khỏi role."""
         role.permissions.remove(permission)
         await self.session.flush()
+        _invalidate_roles_permissions_after_commit(self.session)
 
 
 class RefreshTokenRepository:
@@ -160,12 +240,11 @@ class RefreshTokenRepository:
         result = await self.session.execute(query)
         return result.scalars().first()
     
-    async def create_refresh_token(self, refresh_token: RefreshToken) -> RefreshToken:
+    async def create_refresh_token(self, token_data: Dict[str, Any]) -> RefreshToken:
         """Tạo refresh token mới."""
-        self.session.add(refresh_token)
-        await self.session.flush()
-        await self.session.refresh(refresh_token)
-        return refresh_token
+        query = insert(RefreshToken).values(**token_data).returning(RefreshToken)
+        result = await self.session.execute(query)
+        return result.scalar_one()
     
     async def revoke_refresh_token(self, token: str) -> bool:
         """Thu hồi refresh token."""
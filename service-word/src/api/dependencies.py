@@ -19,4 +19,4 @@ async def get_current_user_id_from_header(x_user_id: Optional[str] = Header(None
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid X-User-ID header: must be a valid UUID format",
-        )
\ No newline at end of file
+        )
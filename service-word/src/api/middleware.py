@@ -0,0 +1,64 @@
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware giới hạn kích thước body của request.
+    Request có Content-Length vượt quá max_size bị từ chối (413) trước khi gọi ứng dụng;
+    request chunked không có Content-Length được đếm byte khi nhận và bị dừng ngay khi vượt giới hạn.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int):
+        self.app = app
+        self.max_size = max_size
+
+    def _too_large_detail(self) -> str:
+        return f"File vượt quá kích thước tối đa {self.max_size // (1024 * 1024)}MB"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                content_length = value
+                break
+
+        if content_length is not None:
+            try:
+                size = int(content_length)
+            except ValueError:
+                response = ORJSONResponse(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    content={"detail": "Invalid Content-Length header"}
+                )
+                await response(scope, receive, send)
+                return
+            if size > self.max_size:
+                response = ORJSONResponse(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    content={"detail": self._too_large_detail()}
+                )
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    # HTTPException được ExceptionMiddleware của ứng dụng chuyển thành response 413
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=self._too_large_detail()
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
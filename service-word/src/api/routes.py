@@ -1,69 +1,66 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Depends, Query, Path, Request
-from fastapi.responses import JSONResponse, FileResponse
-from typing import List, Optional, Dict, Any
+from fastapi.responses import ORJSONResponse, StreamingResponse, Response
+from starlette.background import BackgroundTask
+from typing import Optional
 import os
-import uuid
-import tempfile
-import shutil
-from datetime import datetime
-import json
+import orjson
 import logging
+from urllib.parse import quote
 
-from domain.models import WordDocumentInfo as DocumentInfo, TemplateInfo, InternshipReportModel, RewardReportModel, LaborContractModel
-from application.dto import CreateDocumentDTO, TemplateDataDTO, WatermarkDTO
+from application.dto import CreateDocumentDTO, TemplateDataDTO, WatermarkDTO, InternshipReportModel, RewardReportModel, LaborContractModel
 from application.services import DocumentService, TemplateService
-from infrastructure.repository import DocumentRepository, TemplateRepository, BatchProcessingRepository
-from infrastructure.minio_client import MinioClient
-from infrastructure.rabbitmq_client import RabbitMQClient
+from infrastructure.cache import get_cached_document_list, cache_document_list, get_cached_template_list, cache_template_list
+from core.config import settings
 from .dependencies import get_current_user_id_from_header
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
-def get_document_service(request: Request) -> DocumentService:
-    minio_client = MinioClient()
-    rabbitmq_client = RabbitMQClient()
-    db_session_factory = request.app.state.db_session_factory
-    if not db_session_factory:
-        logger.error("Lỗi nghiêm trọng: Database session factory không khả dụng trong get_document_service.")
-        raise HTTPException(status_code=503, detail="Database session factory không khả dụng.")
-    
-    document_repo = DocumentRepository(minio_client, db_session_factory)
-    return DocumentService(document_repo, minio_client, rabbitmq_client)
+_WORD_EXTS = frozenset({".doc", ".docx"})
+_DATA_EXTS = frozenset({".csv", ".xlsx", ".xls"})
+_UPLOAD_RESPONSE_FIELDS = frozenset({
+    "id", "title", "description", "created_at", "file_size", "file_type", "original_filename"
+})
 
 
-def get_template_service(request: Request) -> TemplateService:
-    minio_client = MinioClient()
-    rabbitmq_client = RabbitMQClient()
-    db_session_factory = request.app.state.db_session_factory
+def _require_ext(filename: Optional[str], allowed: frozenset) -> None:
+    """
+    Kiểm tra phần mở rộng file, trả về 400 nếu không hợp lệ.
+    """
+    if not filename or os.path.splitext(filename)[1].lower() not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chỉ chấp nhận file {', '.join(sorted(allowed))}"
+        )
 
-    if not db_session_factory:
-        logger.error("Lỗi nghiêm trọng: Database session factory không khả dụng trong get_template_service.")
-        raise HTTPException(status_code=503, detail="Database session factory không khả dụng.")
 
-    document_repo = DocumentRepository(minio_client, db_session_factory)
-    
-    template_repo = TemplateRepository(minio_client)
-    
-    batch_repo = BatchProcessingRepository()
-    
-    template_service = TemplateService(
-        template_repository=template_repo, 
-        minio_client=minio_client,
-        rabbitmq_client=rabbitmq_client,
-        batch_processing_repository=batch_repo
-    )
-    
-    template_service.set_document_repository(document_repo)
-    
+def _accepted(message: str, task_id: str, status_code: int = 202) -> ORJSONResponse:
+    """
+    Response cho các tác vụ đã được đưa vào hàng đợi.
+    """
+    return ORJSONResponse(status_code=status_code, content={"status": "processing", "message": message, "task_id": task_id})
+
+
+def get_document_service(request: Request) -> DocumentService:
+    document_service = request.app.state.document_service
+    if document_service is None:
+        raise HTTPException(status_code=503, detail="Document service không khả dụng.")
+    return document_service
+
+
+def get_template_service(request: Request) -> TemplateService:
+    template_service = request.app.state.template_service
+    if template_service is None:
+        raise HTTPException(status_code=503, detail="Template service không khả dụng.")
     return template_service
 
 
 @router.get("/documents", summary="Lấy danh sách tài liệu Word")
 async def get_documents(
-        skip: int = 0,
-        limit: int = 10,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
         search: Optional[str] = None,
         current_user_id: str = Depends(get_current_user_id_from_header),
         document_service: DocumentService = Depends(get_document_service)
@@ -72,12 +69,18 @@ async def get_documents(
     Lấy danh sách tài liệu Word từ hệ thống.
     Chỉ trả về tài liệu của người dùng (current_user_id).
     """
-    try:
-        documents, total_count = await document_service.get_documents(skip, limit, search, current_user_id)
-        return {"items": documents, "total_count": total_count}
-    except Exception as e:
-        logger.error(f"Lỗi khi lấy danh sách tài liệu: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    cached_body = get_cached_document_list(current_user_id, skip, limit, search)
+    if cached_body is not None:
+        return Response(content=cached_body, media_type="application/json")
+    documents, total_count = await document_service.get_documents(skip, limit, search, current_user_id)
+    body = orjson.dumps({
+        "items": [document.model_dump(mode="json") for document in documents],
+        "total_count": total_count,
+        "skip": skip,
+        "limit": limit
+    })
+    cache_document_list(current_user_id, skip, limit, search, body)
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("/documents/upload", summary="Tải lên tài liệu Word mới")
@@ -92,41 +95,69 @@ async def upload_document(
     """
     Tải lên tài liệu Word mới vào hệ thống.
     """
-    try:
-        if not file.filename.endswith(('.doc', '.docx')):
-            raise HTTPException(status_code=400, detail="Chỉ chấp nhận file .doc hoặc .docx")
-
-        document_dto = CreateDocumentDTO(
-            title=title or os.path.splitext(file.filename)[0],
-            description=description or "",
-            original_filename=file.filename,
-            user_id=current_user_id
+    _require_ext(file.filename, _WORD_EXTS)
+    document_dto = CreateDocumentDTO(
+        title=title or os.path.splitext(file.filename)[0],
+        description=description or "",
+        original_filename=file.filename,
+        user_id=current_user_id
+    )
+
+    document_info = await document_service.create_document(document_dto, file.file)
+
+    background_tasks.add_task(
+            document_service.process_document_async,
+        document_id=document_info.id,
+        user_id=current_user_id
         )
 
-        content = await file.read()
-        document_info = await document_service.create_document(document_dto, content)
-
-        background_tasks.add_task(
-                document_service.process_document_async,
-            document_id=document_info.id,
-            user_id=current_user_id
-            )
-
-        return {
-            "id": document_info.id,
-            "title": document_info.title,
-            "description": document_info.description,
-            "created_at": document_info.created_at.isoformat(),
-            "file_size": document_info.file_size,
-            "file_type": document_info.file_type,
-            "original_filename": document_info.original_filename
-        }
-    except Exception as e:
-        logger.error(f"Lỗi khi tải lên tài liệu: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.post("/documents/convert/to-pdf", summary="Chuyển đổi tài liệu Word sang PDF")
+    return ORJSONResponse(document_info.model_dump(mode="json", include=_UPLOAD_RESPONSE_FIELDS))
+
+
+@router.post("/documents/upload-url", summary="Tạo URL upload trực tiếp tài liệu Word lên MinIO")
+async def create_upload_url(
+        filename: str = Form(...),
+        title: Optional[str] = Form(None),
+        description: Optional[str] = Form(None),
+        current_user_id: str = Depends(get_current_user_id_from_header),
+        document_service: DocumentService = Depends(get_document_service)
+):
+    """
+    Tạo presigned URL để client PUT file lớn thẳng lên MinIO, sau đó gọi
+    POST /documents/{document_id}/finalize để ghi nhận tài liệu.
+    """
+    _require_ext(filename, _WORD_EXTS)
+    document_dto = CreateDocumentDTO(
+        title=title or os.path.splitext(filename)[0],
+        description=description or "",
+        original_filename=filename,
+        user_id=current_user_id
+    )
+    return ORJSONResponse(await document_service.create_upload_url(document_dto))
+
+
+@router.post("/documents/{document_id}/finalize", summary="Hoàn tất upload trực tiếp tài liệu Word")
+async def finalize_upload(
+        background_tasks: BackgroundTasks,
+        document_id: str = Path(..., description="ID tài liệu trả về từ /documents/upload-url"),
+        current_user_id: str = Depends(get_current_user_id_from_header),
+        document_service: DocumentService = Depends(get_document_service)
+):
+    """
+    Ghi nhận tài liệu đã được upload trực tiếp lên MinIO.
+    """
+    document_info = await document_service.finalize_upload(document_id, current_user_id)
+
+    background_tasks.add_task(
+        document_service.process_document_async,
+        document_id=document_info.id,
+        user_id=current_user_id
+    )
+
+    return ORJSONResponse(document_info.model_dump(mode="json", include=_UPLOAD_RESPONSE_FIELDS))
+
+
+@router.post("/documents/convert/to-pdf", status_code=202, summary="Chuyển đổi tài liệu Word sang PDF")
 async def convert_to_pdf(
         file: UploadFile = File(...),
         current_user_id: str = Depends(get_current_user_id_from_header),
@@ -135,25 +166,13 @@ async def convert_to_pdf(
     """
     Chuyển đổi tài liệu Word sang định dạng PDF.
     """
-    try:
-        if not file.filename.endswith(('.doc', '.docx')):
-            raise HTTPException(status_code=400, detail="Only .doc or .docx files are accepted")
-
-        content = await file.read()
-        result = await document_service.convert_to_pdf(content, file.filename, current_user_id)
+    _require_ext(file.filename, _WORD_EXTS)
+    task_id = await document_service.submit_convert_to_pdf(file.file, file.filename, current_user_id)
 
-        return {
-            "status": "success",
-            "message": "Tài liệu đã được chuyển đổi thành công",
-            "filename": result["filename"],
-            "download_url": f"/documents/download/{result['id']}"
-        }
-    except Exception as e:
-        logger.error(f"Lỗi khi chuyển đổi Word sang PDF: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    return _accepted("Yêu cầu chuyển đổi đã được nhận và đang được xử lý.", task_id)
 
 
-@router.post("/documents/watermark", summary="Thêm watermark vào tài liệu Word")
+@router.post("/documents/watermark", status_code=202, summary="Thêm watermark vào tài liệu Word")
 async def add_watermark(
         file: UploadFile = File(...),
         watermark_text: str = Form(...),
@@ -165,44 +184,38 @@ async def add_watermark(
     """
     Thêm watermark vào tài liệu Word.
     """
-    try:
-        if not file.filename.endswith(('.doc', '.docx')):
-            raise HTTPException(status_code=400, detail="Chỉ chấp nhận file .doc hoặc .docx")
-
-        content = await file.read()
-        watermark_dto = WatermarkDTO(text=watermark_text, position=position, opacity=opacity)
-        result = await document_service.add_watermark(content, file.filename, watermark_dto, current_user_id)
+    _require_ext(file.filename, _WORD_EXTS)
+    watermark_dto = WatermarkDTO(text=watermark_text, position=position, opacity=opacity)
+    task_id = await document_service.submit_add_watermark(file.file, file.filename, watermark_dto, current_user_id)
 
-        return {
-            "status": "success",
-            "message": "Watermark đã được thêm thành công",
-            "filename": result["filename"],
-            "download_url": f"/documents/download/{result['id']}"
-        }
-    except Exception as e:
-        logger.error(f"Lỗi khi thêm watermark: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    return _accepted("Yêu cầu thêm watermark đã được nhận và đang được xử lý.", task_id)
 
 
 @router.get("/documents/templates", summary="Lấy danh sách mẫu tài liệu Word")
 async def get_templates(
         category: Optional[str] = None,
-        skip: int = 0,
-        limit: int = 10,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
         template_service: TemplateService = Depends(get_template_service)
 ):
     """
     Lấy danh sách mẫu tài liệu Word từ hệ thống (public templates).
     """
-    try:
-        templates, total_count = await template_service.get_templates(category, skip, limit)
-        return {"items": templates, "total_count": total_count}
-    except Exception as e:
-        logger.error(f"Lỗi khi lấy danh sách mẫu: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.post("/documents/templates/apply", summary="Áp dụng mẫu tài liệu Word")
+    cached_body = get_cached_template_list(category, skip, limit)
+    if cached_body is not None:
+        return Response(content=cached_body, media_type="application/json")
+    templates, total_count = await template_service.get_templates(category, skip, limit)
+    body = orjson.dumps({
+        "items": [template.model_dump(mode="json") for template in templates],
+        "total_count": total_count,
+        "skip": skip,
+        "limit": limit
+    })
+    cache_template_list(category, skip, limit, body)
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("/documents/templates/apply", status_code=202, summary="Áp dụng mẫu tài liệu Word")
 async def apply_template(
         template_id: str = Form(...),
         data: str = Form(...),
@@ -214,31 +227,23 @@ async def apply_template(
     Áp dụng mẫu tài liệu Word với dữ liệu được cung cấp.
     """
     try:
-        json_data = json.loads(data)
-        template_data_dto = TemplateDataDTO(
-            template_id=template_id,
-            data=json_data,
-            output_format=output_format,
-            user_id=current_user_id
-        )
-        result = await template_service.apply_template(template_data_dto)
-
-        return {
-            "status": "success",
-            "message": "Mẫu đã được áp dụng thành công",
-            "filename": result["filename"],
-            "download_url": f"/documents/download/{result['id']}"
-        }
-    except json.JSONDecodeError:
+        json_data = orjson.loads(data)
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Dữ liệu JSON không hợp lệ")
-    except Exception as e:
-        logger.error(f"Lỗi khi áp dụng mẫu: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+
+    template_data_dto = TemplateDataDTO(
+        template_id=template_id,
+        data=json_data,
+        output_format=output_format,
+        user_id=current_user_id
+    )
+    task_id = await template_service.submit_apply_template(template_data_dto)
+
+    return _accepted("Yêu cầu áp dụng mẫu đã được nhận và đang được xử lý.", task_id)
 
 
 @router.post("/documents/templates/batch", summary="Tạo nhiều tài liệu Word từ template")
 async def create_batch_documents(
-        background_tasks: BackgroundTasks,
         template_id: str = Form(...),
         data_file: UploadFile = File(...),
         current_user_id: str = Depends(get_current_user_id_from_header),
@@ -248,28 +253,31 @@ async def create_batch_documents(
     """
     Tạo nhiều tài liệu Word từ một template và tập dữ liệu (CSV, Excel).
     """
-    try:
-        if not data_file.filename.endswith(('.csv', '.xlsx', '.xls')):
-            raise HTTPException(status_code=400, detail="Chỉ chấp nhận file .csv, .xlsx hoặc .xls")
-
-        content = await data_file.read()
-        result_task_id = await template_service.create_batch_documents_from_file(
-            template_id=template_id, 
-            file_content=content, 
-            original_filename=data_file.filename,
-            output_format=output_format, 
-            user_id=current_user_id,
-            background_tasks=background_tasks
-            )
-
-        return {
-            "status": "processing",
-            "message": "Yêu cầu tạo tài liệu hàng loạt đã được nhận và đang được xử lý.",
-            "task_id": result_task_id
-        }
-    except Exception as e:
-        logger.error(f"Lỗi khi tạo batch tài liệu: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    _require_ext(data_file.filename, _DATA_EXTS)
+    result_task_id = await template_service.create_batch_documents_from_file(
+        template_id=template_id, 
+        file_content=data_file.file, 
+        original_filename=data_file.filename,
+        output_format=output_format, 
+        user_id=current_user_id
+        )
+
+    return _accepted("Yêu cầu tạo tài liệu hàng loạt đã được nhận và đang được xử lý.", result_task_id, status_code=200)
+
+
+@router.get("/documents/tasks/{task_id}", summary="Lấy trạng thái tác vụ xử lý tài liệu Word")
+async def get_task_status(
+        task_id: str = Path(..., description="ID của tác vụ"),
+        current_user_id: str = Depends(get_current_user_id_from_header),
+        document_service: DocumentService = Depends(get_document_service)
+):
+    """
+    Lấy trạng thái tác vụ chuyển đổi/watermark/áp dụng mẫu đang chạy trên worker.
+    """
+    task_status = await document_service.get_task_status(task_id, current_user_id)
+    if not task_status:
+        raise HTTPException(status_code=404, detail="Tác vụ không tồn tại hoặc không có quyền truy cập")
+    return ORJSONResponse(task_status.model_dump(mode="json"))
 
 
 @router.get("/documents/download/{document_id}", summary="Tải xuống tài liệu Word")
@@ -282,18 +290,20 @@ async def download_document(
     Tải xuống tài liệu Word theo ID.
     Service sẽ kiểm tra quyền truy cập dựa trên current_user_id.
     """
-    try:
-        file_path, media_type, filename = await document_service.download_document(document_id, current_user_id)
-        if not file_path or not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail="Tài liệu không tồn tại hoặc không có quyền truy cập")
-        
-        response_background_tasks = BackgroundTasks()
-        response_background_tasks.add_task(os.unlink, file_path)
-
-        return FileResponse(path=file_path, media_type=media_type, filename=filename, background=response_background_tasks)
-    except Exception as e:
-        logger.error(f"Lỗi khi tải tài liệu {document_id}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Lỗi máy chủ khi tải tài liệu.")
+    document_info, minio_response = await document_service.download_document(document_id, current_user_id)
+    if not document_info:
+        raise HTTPException(status_code=404, detail="Tài liệu không tồn tại hoặc không có quyền truy cập")
+
+    def release_minio_response():
+        minio_response.close()
+        minio_response.release_conn()
+
+    return StreamingResponse(
+        minio_response.stream(DOWNLOAD_CHUNK_SIZE),
+        media_type=document_info.file_type,
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(document_info.original_filename)}"},
+        background=BackgroundTask(release_minio_response)
+    )
 
 
 @router.delete("/documents/{document_id}", summary="Xóa tài liệu Word")
@@ -306,12 +316,8 @@ async def delete_document(
     Xóa tài liệu Word theo ID.
     Service sẽ kiểm tra quyền xóa dựa trên current_user_id.
     """
-    try:
-        await document_service.delete_document(document_id, current_user_id)
-        return {"status": "success", "message": "Tài liệu đã được xóa thành công"}
-    except Exception as e:
-        logger.error(f"Lỗi khi xóa tài liệu {document_id}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    await document_service.delete_document(document_id, current_user_id)
+    return ORJSONResponse({"status": "success", "message": "Tài liệu đã được xóa thành công"})
 
 
 @router.post("/documents/templates/internship-report", summary="Tạo báo cáo kết quả thực tập")
@@ -323,17 +329,13 @@ async def create_internship_report(
     """
     Tạo báo cáo kết quả thực tập từ mẫu.
     """
-    try:
-        result = await template_service.create_internship_report(data, current_user_id)
-        return {
-            "status": "success",
-            "message": "Báo cáo thực tập đã được tạo thành công",
-            "filename": result["filename"],
-            "download_url": f"/documents/download/{result['id']}"
-        }
-    except Exception as e:
-        logger.error(f"Lỗi khi tạo báo cáo thực tập: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await template_service.create_internship_report(data, current_user_id)
+    return ORJSONResponse({
+        "status": "success",
+        "message": "Báo cáo thực tập đã được tạo thành công",
+        "filename": result["filename"],
+        "download_url": f"/documents/download/{result['id']}"
+    })
 
 
 @router.post("/documents/templates/reward-report", summary="Tạo báo cáo thưởng")
@@ -345,17 +347,13 @@ async def create_reward_report(
     """
     Tạo báo cáo thưởng từ mẫu.
     """
-    try:
-        result = await template_service.create_reward_report(data, current_user_id)
-        return {
-            "status": "success",
-            "message": "Báo cáo thưởng đã được tạo thành công",
-            "filename": result["filename"],
-            "download_url": f"/documents/download/{result['id']}"
-        }
-    except Exception as e:
-        logger.error(f"Lỗi khi tạo báo cáo thưởng: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await template_service.create_reward_report(data, current_user_id)
+    return ORJSONResponse({
+        "status": "success",
+        "message": "Báo cáo thưởng đã được tạo thành công",
+        "filename": result["filename"],
+        "download_url": f"/documents/download/{result['id']}"
+    })
 
 
 @router.post("/documents/templates/labor-contract", summary="Tạo hợp đồng lao động")
@@ -367,17 +365,13 @@ async def create_labor_contract(
     """
     Tạo hợp đồng lao động từ mẫu.
     """
-    try:
-        result = await template_service.create_labor_contract(data, current_user_id)
-        return {
-            "status": "success",
-            "message": "Hợp đồng lao động đã được tạo thành công",
-            "filename": result["filename"],
-            "download_url": f"/documents/download/{result['id']}"
-        }
-    except Exception as e:
-        logger.error(f"Lỗi khi tạo hợp đồng lao động: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await template_service.create_labor_contract(data, current_user_id)
+    return ORJSONResponse({
+        "status": "success",
+        "message": "Hợp đồng lao động đã được tạo thành công",
+        "filename": result["filename"],
+        "download_url": f"/documents/download/{result['id']}"
+    })
 
 
 @router.post("/documents/templates/invitation", summary="Tạo lời mời từ danh sách nhân viên")
@@ -394,23 +388,12 @@ async def generate_invitations(
     - **data_file**: File Excel chứa danh sách nhân viên
     - **output_format**: Định dạng đầu ra (docx, pdf, zip)
     """
-    try:
-        if not data_file.filename.endswith(('.xlsx', '.xls', '.csv')):
-            raise HTTPException(status_code=400, detail="Chỉ chấp nhận file Excel (.xlsx, .xls) hoặc CSV (.csv)")
-
-        file_content = await data_file.read()
-        task_id = await template_service.generate_invitations_from_file(
-            file_content=file_content,
-            original_filename=data_file.filename,
-            output_format=output_format,
-            user_id=current_user_id,
-            background_tasks=background_tasks
-        )
-        return {
-            "status": "processing",
-            "message": "Yêu cầu tạo lời mời hàng loạt đang được xử lý.",
-            "task_id": task_id
-        }
-    except Exception as e:
-        logger.error(f"Lỗi khi tạo lời mời hàng loạt: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    _require_ext(data_file.filename, _DATA_EXTS)
+    task_id = await template_service.generate_invitations_from_file(
+        file_content=data_file.file,
+        original_filename=data_file.filename,
+        output_format=output_format,
+        user_id=current_user_id,
+        background_tasks=background_tasks
+    )
+    return _accepted("Yêu cầu tạo lời mời hàng loạt đang được xử lý.", task_id, status_code=200)
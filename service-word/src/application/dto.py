@@ -1,43 +1,28 @@
 from typing import Dict, List, Optional, Any
-from pydantic import BaseModel, Field
+import msgspec
+from pydantic import BaseModel, ConfigDict, Field
 
-class CreateDocumentDTO(BaseModel):
+from domain.exceptions import InvalidDataFormatException
+
+
+class BaseDTO(BaseModel):
+    """
+    Lớp cơ sở cho các DTO của service Word.
+    """
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
+
+class CreateDocumentDTO(msgspec.Struct, kw_only=True):
     """
-    DTO để tạo mới tài liệu Word.
+    DTO để tạo mới tài liệu Word (chỉ truyền nội bộ routes -> services).
     """
     title: str
     description: str = ""
     original_filename: str
-    doc_metadata: Dict[str, Any] = Field(default_factory=dict)
+    doc_metadata: Dict[str, Any] = msgspec.field(default_factory=dict)
     user_id: Optional[str] = None
 
-    def __init__(
-        self,
-        title: str,
-        description: str,
-        original_filename: str,
-        doc_metadata: Dict[str, Any] = None,
-        user_id: Optional[str] = None
-    ):
-        """
-        Khởi tạo DTO cho việc tạo tài liệu Word mới.
-
-        Args:
-            title: Tiêu đề của tài liệu
-            description: Mô tả của tài liệu
-            original_filename: Tên file gốc
-            doc_metadata: Metadata của tài liệu
-            user_id: ID của người dùng tạo tài liệu
-        """
-        super().__init__(
-            title=title,
-            description=description,
-            original_filename=original_filename,
-            doc_metadata=doc_metadata or {},
-            user_id=user_id
-        )
-
-class UpdateDocumentDTO(BaseModel):
+class UpdateDocumentDTO(BaseDTO):
     """
     DTO để cập nhật thông tin tài liệu Word.
     """
@@ -45,7 +30,7 @@ class UpdateDocumentDTO(BaseModel):
     description: Optional[str] = None
     doc_metadata: Optional[Dict[str, Any]] = None
 
-class CreateTemplateDTO(BaseModel):
+class CreateTemplateDTO(BaseDTO):
     """
     DTO để tạo mới template.
     """
@@ -55,18 +40,22 @@ class CreateTemplateDTO(BaseModel):
     fields: List[Dict[str, Any]] = Field(default_factory=list)
     doc_metadata: Dict[str, Any] = Field(default_factory=dict)
 
-class TemplateDataDTO(BaseModel):
+class TemplateDataDTO(msgspec.Struct, kw_only=True):
     """
-    DTO để áp dụng mẫu Word với dữ liệu.
+    DTO để áp dụng mẫu Word với dữ liệu (chỉ truyền nội bộ routes -> services).
     """
     template_id: str
     data: Dict[str, Any]
     output_format: str = "docx"  # docx, pdf
     user_id: str
 
-class WatermarkDTO(BaseModel):
+    def __post_init__(self):
+        if not isinstance(self.data, dict):
+            raise InvalidDataFormatException("Dữ liệu áp dụng mẫu phải là một JSON object")
+
+class WatermarkDTO(msgspec.Struct, kw_only=True):
     """
-    DTO cho việc thêm watermark vào tài liệu.
+    DTO cho việc thêm watermark vào tài liệu (chỉ truyền nội bộ routes -> services).
     """
     text: str
     position: str = "center"  # center, top-left, top-right, bottom-left, bottom-right
@@ -75,7 +64,14 @@ class WatermarkDTO(BaseModel):
     font_name: str = "Times New Roman"  # Tên font
     rotation: int = -45  # Góc xoay (độ)
 
-class BatchProcessingDTO(BaseModel):
+    def __post_init__(self):
+        self.text = self.text.strip()
+        if not self.text:
+            raise InvalidDataFormatException("Nội dung watermark không được để trống")
+        if not 0.0 <= self.opacity <= 1.0:
+            raise InvalidDataFormatException("opacity phải nằm trong khoảng 0.0 - 1.0")
+
+class BatchProcessingDTO(BaseDTO):
     """
     DTO cho việc xử lý hàng loạt tài liệu.
     """
@@ -85,17 +81,18 @@ class BatchProcessingDTO(BaseModel):
     output_format: str = "docx"  # docx, pdf, zip
     callback_url: Optional[str] = None
 
-class TaskStatusDTO(BaseModel):
+class TaskStatusDTO(BaseDTO):
     """
     DTO cho trạng thái của task xử lý bất đồng bộ.
     """
     task_id: str
-    status: str  # processing, completed, failed
+    status: str  # pending, processing, completed, failed
     message: str = ""
     result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
     progress: float = 0.0  # 0.0 - 1.0
 
-class DocumentFilterDTO(BaseModel):
+class DocumentFilterDTO(BaseDTO):
     """
     DTO để lọc danh sách tài liệu.
     """
@@ -106,58 +103,58 @@ class DocumentFilterDTO(BaseModel):
     sort_by: Optional[str] = "created_at"
     sort_order: Optional[str] = "desc"
 
-class InternshipReportModel(BaseModel):
-    """
-    DTO cho báo cáo kết quả thực tập.
-    """
-    department: str
-    location: str
-    day: str
-    month: str
-    year: str
-    intern_name: str
-    internship_duration: str
-    supervisor_name: str
-    ethics_evaluation: str
-    capacity_evaluation: str
-    compliance_evaluation: str
-    group_activities: str
+class InternshipReportModel(BaseDTO):
+    """
+    DTO cho báo cáo kết quả thực tập
+    """
+    department: str = Field(..., description="Tên phòng ban")
+    location: str = Field(..., description="Địa danh")
+    day: str = Field(..., description="Ngày (2 chữ số)")
+    month: str = Field(..., description="Tháng (2 chữ số)")
+    year: str = Field(..., description="Năm (4 chữ số)")
+    intern_name: str = Field(..., description="Họ tên thực tập sinh")
+    internship_duration: str = Field(..., description="Thời gian thực tập")
+    supervisor_name: str = Field(..., description="Tên người hướng dẫn")
+    ethics_evaluation: str = Field(..., description="Đánh giá phẩm chất đạo đức")
+    capacity_evaluation: str = Field(..., description="Đánh giá năng lực")
+    compliance_evaluation: str = Field(..., description="Đánh giá ý thức chấp hành")
+    group_activities: str = Field(..., description="Đánh giá hoạt động đoàn thể")
 
-class RewardReportModel(BaseModel):
-    """
-    DTO cho báo cáo thưởng.
-    """
-    location: str
-    day: str
-    month: str
-    year: str
-    title: str
-    recipient: str
-    approver_name: str
-    submitter_name: str
-
-class LaborContractModel(BaseModel):
-    """
-    DTO cho hợp đồng lao động.
-    """
-    contract_number: str
-    day: str
-    month: str
-    year: str
-    representative_name: str
-    position: str
-    employee_name: str
-    nationality: str
-    date_of_birth: str
-    gender: str
-    profession: str
-    permanent_address: str
-    current_address: str
-    id_number: str
-    id_issue_date: str
-    id_issue_place: str
-    job_position: str
-    start_date: str
-    end_date: str
-    salary: str
-    allowance: str
\ No newline at end of file
+class RewardReportModel(BaseDTO):
+    """
+    DTO cho báo cáo thưởng
+    """
+    location: str = Field(..., description="Địa danh")
+    day: str = Field(..., description="Ngày (2 chữ số)")
+    month: str = Field(..., description="Tháng (2 chữ số)")
+    year: str = Field(..., description="Năm (4 chữ số)")
+    title: str = Field(..., description="Tiêu đề báo cáo")
+    recipient: str = Field(..., description="Người nhận báo cáo")
+    approver_name: str = Field(..., description="Người ký xác nhận")
+    submitter_name: str = Field(..., description="Người làm đơn")
+
+class LaborContractModel(BaseDTO):
+    """
+    DTO cho hợp đồng lao động
+    """
+    contract_number: str = Field(..., description="Số hợp đồng")
+    day: str = Field(..., description="Ngày ký")
+    month: str = Field(..., description="Tháng ký")
+    year: str = Field(..., description="Năm ký")
+    representative_name: str = Field(..., description="Tên đại diện công ty")
+    position: str = Field(..., description="Chức vụ đại diện")
+    employee_name: str = Field(..., description="Tên nhân viên")
+    nationality: str = Field(..., description="Quốc tịch")
+    date_of_birth: str = Field(..., description="Ngày sinh")
+    gender: str = Field(..., description="Giới tính")
+    profession: str = Field(..., description="Nghề nghiệp")
+    permanent_address: str = Field(..., description="Địa chỉ thường trú")
+    current_address: str = Field(..., description="Địa chỉ hiện tại")
+    id_number: str = Field(..., description="Số CMND/CCCD")
+    id_issue_date: str = Field(..., description="Ngày cấp")
+    id_issue_place: str = Field(..., description="Nơi cấp")
+    job_position: str = Field(..., description="Vị trí công việc")
+    start_date: str = Field(..., description="Ngày bắt đầu")
+    end_date: str = Field(..., description="Ngày kết thúc")
+    salary: str = Field(..., description="Mức lương")
+    allowance: str = Field(..., description="Phụ cấp")
@@ -1,35 +1,320 @@
 import os
 import io
-import tempfile
 import asyncio
+import functools
+from contextlib import asynccontextmanager
+import time
+import hashlib
+import threading
+import itertools
+import codecs
+import csv
+import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import tempfile
 import uuid
 import json
-import pandas as pd
 import zipfile
-from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+from xml.sax.saxutils import escape as xml_escape
+import msgspec
+from typing import List, Dict, Any, Optional, Tuple, Union, BinaryIO, Iterator, Callable, Awaitable
 from datetime import datetime
 import logging
 import shutil
+import aiofiles.os
+import aiofiles.tempfile
+import anyio
+import anyio.to_thread
+from cachetools import LRUCache
 from fastapi import BackgroundTasks
 
-from application.dto import CreateDocumentDTO, CreateTemplateDTO, TemplateDataDTO, WatermarkDTO, BatchProcessingDTO, InternshipReportModel, RewardReportModel, LaborContractModel
+from application.dto import CreateDocumentDTO, CreateTemplateDTO, TemplateDataDTO, WatermarkDTO, BatchProcessingDTO, TaskStatusDTO, InternshipReportModel, RewardReportModel, LaborContractModel
 from domain.models import WordDocumentInfo as DocumentInfo, TemplateInfo, BatchProcessingInfo
 from domain.exceptions import DocumentNotFoundException, TemplateNotFoundException, StorageException
 from domain.exceptions import ConversionException, WatermarkException, TemplateApplicationException, InvalidDataFormatException
-from infrastructure.repository import DocumentRepository, TemplateRepository, BatchProcessingRepository
+from domain.exceptions import InvalidDocumentFormatException, FileTooLargeException
+from infrastructure.repository import DocumentRepository, TemplateRepository, BatchProcessingRepository, TaskStatusRepository
 from infrastructure.minio_client import MinioClient
 from infrastructure.rabbitmq_client import RabbitMQClient
 from core.config import settings
+from core.logging_config import setup_process_logging
 from utils import WordConverter
 from utils.watermark import WatermarkHelper
 
 from docx import Document as DocxDocument
-from docx.shared import Pt, Inches, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.shared import Cm
 
 logger = logging.getLogger(__name__)
 
+# Chữ ký đầu file: .docx là ZIP (OOXML), .doc là OLE2 Compound File
+_WORD_FILE_SIGNATURES = {
+    ".docx": b"PK\x03\x04",
+    ".doc": b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",
+}
+_PRECOMPRESSED_EXTS = ('.docx', '.pdf', '.xlsx', '.pptx', '.zip', '.png', '.jpg', '.jpeg')
+
+_conversion_semaphores: Dict[str, asyncio.Semaphore] = {}
+_conversion_waiting: Dict[str, int] = {}
+_cpu_limiter: Optional[anyio.CapacityLimiter] = None
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_cache: LRUCache = LRUCache(maxsize=settings.RENDER_CACHE_MAX_BYTES, getsizeof=len)
+_render_cache_lock = threading.Lock()
+_render_cache_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+_DOCX_BODY_PART = "word/document.xml"
+_template_parts_cache: LRUCache = LRUCache(maxsize=16)
+_XML_TAG = re.compile(rb'<[^>]*>')
+_XML_INVALID_CHARS = re.compile(r'[\x00-\x1f]')
+
+
+async def _run_cpu_bound(func, *args, **kwargs):
+    """
+    Chạy công việc đồng bộ nặng CPU (python-docx, LibreOffice, pandas) trên một nhóm luồng riêng
+    giới hạn theo số CPU, để threadpool mặc định vẫn sẵn sàng cho I/O MinIO.
+    """
+    global _cpu_limiter
+    if _cpu_limiter is None:
+        _cpu_limiter = anyio.CapacityLimiter(os.cpu_count() or 1)
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=_cpu_limiter)
+
+
+def get_conversion_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Số lượt chuyển đổi LibreOffice đang chờ theo từng loại file, dùng để điều chỉnh WORD_CONV_CONCURRENCY.
+    """
+    return {
+        file_type: {"waiting": _conversion_waiting.get(file_type, 0), "limit": settings.WORD_CONV_CONCURRENCY}
+        for file_type in _conversion_semaphores
+    }
+
+
+async def _run_in_render_pool(func, *args):
+    """
+    Chạy việc dựng tài liệu python-docx (thuần Python, giữ GIL) trên pool tiến trình
+    để các dòng của batch được dựng song song theo số CPU.
+    """
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            # fork sao chép cả các luồng (threadpool, QueueListener, gRPC) và khóa chúng đang giữ của tiến trình cha,
+            # tiến trình con có thể treo khi lấy lại khóa đó; spawn khởi động một interpreter sạch
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_process_logging
+        )
+    return await asyncio.get_running_loop().run_in_executor(_render_pool, func, *args)
+
+
+@asynccontextmanager
+async def _conversion_slot(file_type: str):
+    """
+    Giữ một suất chuyển đổi PDF cho loại file, giới hạn số tiến trình chạy đồng thời
+    để tránh hết bộ nhớ khi nhiều file lớn được chuyển đổi cùng lúc.
+    """
+    semaphore = _conversion_semaphores.setdefault(file_type, asyncio.Semaphore(settings.WORD_CONV_CONCURRENCY))
+    _conversion_waiting[file_type] = _conversion_waiting.get(file_type, 0) + 1
+    try:
+        await semaphore.acquire()
+    finally:
+        _conversion_waiting[file_type] -= 1
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+async def convert_to_pdf_limited(input_path: str, output_path: str) -> None:
+    """
+    Chuyển đổi sang PDF bằng backend PDF_BACKEND trong giới hạn suất chuyển đổi của loại file.
+    """
+    async with _conversion_slot(os.path.splitext(input_path)[1].lower() or "unknown"):
+        if settings.PDF_BACKEND == "libreoffice":
+            await WordConverter.convert_to_pdf_using_libreoffice_async(input_path, output_path)
+        else:
+            await _run_cpu_bound(WordConverter.convert_to_pdf, input_path, output_path, method=settings.PDF_BACKEND)
+
+
+async def _convert_many_to_pdf_limited(input_paths: List[str], output_dir: str) -> List[Optional[str]]:
+    """
+    Chuyển nhiều file sang PDF trong một lần gọi LibreOffice, chiếm một suất chuyển đổi cho cả nhóm.
+    """
+    async with _conversion_slot(os.path.splitext(input_paths[0])[1].lower() or "unknown"):
+        return await WordConverter.convert_many_to_pdf_using_libreoffice_async(input_paths, output_dir)
+
+
+def _fill_placeholders(template_content: bytes, data: Dict[str, Any]) -> bytes:
+    """
+    Thay các placeholder {{key}} trong đoạn văn và ô bảng bằng một regex biên dịch sẵn,
+    mỗi đoạn văn chỉ được quét một lần. Đoạn văn không đổi được giữ nguyên để không mất định dạng run.
+    """
+    pattern = re.compile(r'\{\{(' + '|'.join(re.escape(str(key)) for key in data) + r')\}\}')
+    values = {str(key): str(value) for key, value in data.items()}
+
+    doc = DocxDocument(io.BytesIO(template_content))
+    paragraphs = itertools.chain(
+        doc.paragraphs,
+        (paragraph for table in doc.tables for row in table.rows for cell in row.cells for paragraph in cell.paragraphs)
+    )
+    for paragraph in paragraphs:
+        text = paragraph.text
+        if '{{' not in text:
+            continue
+        new_text = pattern.sub(lambda match: values[match.group(1)], text)
+        if new_text != text:
+            paragraph.text = new_text
+
+    output_io = io.BytesIO()
+    doc.save(output_io)
+    return output_io.getvalue()
+
+
+def _template_parts(template_content: bytes) -> List[Tuple[str, int, bytes]]:
+    """
+    Các phần (tên, kiểu nén, nội dung) của gói .docx mẫu, được cache theo hash template
+    để mỗi lần dựng không phải giải nén lại.
+    """
+    key = hashlib.blake2b(template_content, digest_size=16).digest()
+    with _render_cache_lock:
+        parts = _template_parts_cache.get(key)
+    if parts is None:
+        with zipfile.ZipFile(io.BytesIO(template_content)) as zf:
+            parts = [(info.filename, info.compress_type, zf.read(info)) for info in zf.infolist()]
+        with _render_cache_lock:
+            _template_parts_cache[key] = parts
+    return parts
+
+
+def _fill_placeholders_xml(template_content: bytes, data: Dict[str, Any]) -> Optional[bytes]:
+    """
+    Thay placeholder {{key}} trực tiếp trên word/document.xml rồi nén lại, không dựng cây python-docx.
+    Trả về None khi cách này không cho cùng kết quả (Word tách placeholder qua nhiều run,
+    giá trị chứa xuống dòng/tab/ký tự điều khiển) để dùng _fill_placeholders.
+    """
+    values = {str(key): str(value) for key, value in data.items()}
+    if not values or any(_XML_INVALID_CHARS.search(value) for value in values.values()):
+        return None
+    try:
+        parts = _template_parts(template_content)
+    except zipfile.BadZipFile:
+        return None
+    body = next((content for name, _, content in parts if name == _DOCX_BODY_PART), None)
+    if body is None:
+        return None
+
+    replacements = {xml_escape(key).encode(): xml_escape(value).encode() for key, value in values.items()}
+    pattern = re.compile(rb'\{\{(' + b'|'.join(re.escape(key) for key in replacements) + rb')\}\}')
+    # Mọi placeholder nhìn thấy trong văn bản phải nằm liền trong một run thì mới thay được trên XML
+    if len(pattern.findall(body)) != len(pattern.findall(_XML_TAG.sub(b'', body))):
+        return None
+
+    rendered_body = pattern.sub(lambda match: replacements[match.group(1)], body)
+    output_io = io.BytesIO()
+    with zipfile.ZipFile(output_io, 'w') as zf:
+        for name, compress_type, content in parts:
+            zf.writestr(
+                name,
+                rendered_body if name == _DOCX_BODY_PART else content,
+                compress_type=compress_type,
+                compresslevel=1
+            )
+    return output_io.getvalue()
+
+
+def _render_template(template_content: bytes, data: Dict[str, Any]) -> bytes:
+    """
+    Dựng tài liệu từ mẫu: thay trực tiếp trên document.xml khi được, nếu không thì dùng python-docx.
+    Là hàm cấp module để chạy được trên pool tiến trình.
+    """
+    rendered = _fill_placeholders_xml(template_content, data)
+    if rendered is None:
+        rendered = _fill_placeholders(template_content, data)
+    return rendered
+
+
+async def _render_template_cached(template_content: bytes, data: Dict[str, Any]) -> bytes:
+    """
+    _render_template có cache LRU (giới hạn theo tổng số byte) theo (hash template, dữ liệu),
+    để các dòng/yêu cầu trùng dữ liệu không phải parse và ghi lại tài liệu.
+    Khi trượt cache, việc dựng chạy trên pool tiến trình vì python-docx giữ GIL.
+    """
+    key = (
+        hashlib.blake2b(template_content, digest_size=16).digest(),
+        frozenset((str(k), str(v)) for k, v in data.items())
+    )
+    with _render_cache_lock:
+        cached = _render_cache.get(key)
+        if cached is not None:
+            _render_cache_stats["hits"] += 1
+            return cached
+        _render_cache_stats["misses"] += 1
+
+    rendered = await _run_in_render_pool(_render_template, template_content, data)
+    if len(rendered) <= _render_cache.maxsize:
+        with _render_cache_lock:
+            _render_cache[key] = rendered
+    return rendered
+
+
+def get_render_cache_stats() -> Dict[str, Any]:
+    """
+    Số lần trúng/trượt cache dựng mẫu, dùng để biết cache có hiệu quả hay không.
+    """
+    with _render_cache_lock:
+        hits, misses = _render_cache_stats["hits"], _render_cache_stats["misses"]
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "size_bytes": _render_cache.currsize
+        }
+
+
+@asynccontextmanager
+async def _converted_pdf(content: bytes):
+    """
+    Chuyển nội dung Word sang PDF qua LibreOffice và trả về file PDF đang mở để upload dạng stream,
+    không đọc toàn bộ PDF vào bộ nhớ. File tạm nằm trong một thư mục tạm được dọn tự động.
+    """
+    await aiofiles.os.makedirs(settings.SCRATCH_DIR, exist_ok=True)
+    async with aiofiles.tempfile.TemporaryDirectory(dir=settings.SCRATCH_DIR) as work_dir:
+        word_path = os.path.join(work_dir, "input.docx")
+        pdf_path = os.path.join(work_dir, "input.pdf")
+        await asyncio.to_thread(Path(word_path).write_bytes, content)
+        await convert_to_pdf_limited(word_path, pdf_path)
+        pdf_file = await asyncio.to_thread(open, pdf_path, "rb")
+        try:
+            yield pdf_file
+        finally:
+            pdf_file.close()
+
+
+async def _run_tracked_task(task_repository: TaskStatusRepository, message: Dict[str, Any], handler) -> None:
+    """
+    Chạy một tác vụ từ queue và ghi lại trạng thái processing -> completed/failed.
+    """
+    task_id = message["task_id"]
+    task_status = {
+        "status": "processing",
+        "task_type": message.get("task_type"),
+        "user_id": message.get("user_id"),
+        "progress": 0.0
+    }
+    await task_repository.save(task_id, task_status)
+    try:
+        result = await handler()
+        task_status.update(
+            status="completed",
+            message="Tác vụ đã hoàn thành",
+            progress=1.0,
+            result={**result, "download_url": f"/documents/download/{result['id']}"}
+        )
+    except Exception as e:
+        logger.error(f"Lỗi khi xử lý task {task_id} ({message.get('task_type')}): {e}", exc_info=True)
+        task_status.update(status="failed", error=str(e))
+    await task_repository.save(task_id, task_status)
+
+
 class DocumentService:
     """
     Service xử lý tài liệu Word.
@@ -39,7 +324,8 @@ class DocumentService:
             self,
             document_repository: DocumentRepository,
             minio_client: MinioClient,
-            rabbitmq_client: RabbitMQClient
+            rabbitmq_client: RabbitMQClient,
+            task_repository: Optional[TaskStatusRepository] = None
     ):
         """
         Khởi tạo service.
@@ -48,18 +334,20 @@ class DocumentService:
             document_repository: Repository để làm việc với tài liệu
             minio_client: Client MinIO để lưu trữ tài liệu
             rabbitmq_client: Client RabbitMQ để gửi tin nhắn
+            task_repository: Repository lưu trạng thái tác vụ bất đồng bộ
         """
         self.document_repository = document_repository
         self.minio_client = minio_client
         self.rabbitmq_client = rabbitmq_client
+        self.task_repository = task_repository or TaskStatusRepository()
 
-    async def create_document(self, dto: CreateDocumentDTO, content: bytes) -> DocumentInfo:
+    async def create_document(self, dto: CreateDocumentDTO, content: Union[bytes, BinaryIO]) -> DocumentInfo:
         """
         Tạo tài liệu mới.
 
         Args:
             dto: DTO chứa thông tin tài liệu
-            content: Nội dung tài liệu
+            content: Nội dung tài liệu (bytes hoặc file-like object để upload theo từng phần)
 
         Returns:
             Thông tin tài liệu đã tạo
@@ -68,7 +356,6 @@ class DocumentService:
             title=dto.title,
             description=dto.description,
             original_filename=dto.original_filename,
-            file_size=len(content),
             file_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document" if dto.original_filename.endswith(
                 ".docx") else "application/msword",
             storage_path="",  
@@ -80,6 +367,83 @@ class DocumentService:
 
         return document_info
 
+    async def create_upload_url(self, dto: CreateDocumentDTO) -> Dict[str, Any]:
+        """
+        Tạo presigned URL để client upload tài liệu trực tiếp lên MinIO.
+
+        Args:
+            dto: DTO chứa thông tin tài liệu
+
+        Returns:
+            Dict chứa document_id, upload_url và expires_in
+        """
+        document_id = str(uuid.uuid4())
+        object_name = self.minio_client.new_document_object_name(dto.original_filename)
+        upload_url = await self.minio_client.get_presigned_upload_url(object_name, settings.DIRECT_UPLOAD_URL_EXPIRES)
+
+        await self.task_repository.save(document_id, {
+            "status": "pending",
+            "task_type": "direct_upload",
+            "user_id": dto.user_id,
+            "object_name": object_name,
+            "document": msgspec.structs.asdict(dto)
+        })
+        return {
+            "document_id": document_id,
+            "upload_url": upload_url,
+            "expires_in": settings.DIRECT_UPLOAD_URL_EXPIRES
+        }
+
+    async def finalize_upload(self, document_id: str, user_id: str) -> DocumentInfo:
+        """
+        Ghi nhận tài liệu mà client đã upload trực tiếp lên MinIO qua presigned URL.
+
+        Args:
+            document_id: ID tài liệu trả về từ create_upload_url
+            user_id: ID người dùng
+
+        Returns:
+            Thông tin tài liệu đã tạo
+        """
+        pending = await self.task_repository.get(document_id)
+        if (not pending or pending.get("task_type") != "direct_upload"
+                or pending.get("user_id") != user_id or pending.get("status") != "pending"):
+            raise DocumentNotFoundException(document_id)
+
+        object_stat = await self.minio_client.stat_document(pending["object_name"])
+        if object_stat is None:
+            raise DocumentNotFoundException(document_id)
+
+        dto = CreateDocumentDTO(**pending["document"])
+
+        # Upload trực tiếp không đi qua API nên phải áp dụng lại giới hạn kích thước và định dạng ở đây
+        signature = _WORD_FILE_SIGNATURES.get(os.path.splitext(dto.original_filename)[1].lower())
+        rejection: Optional[Exception] = None
+        if object_stat.size > settings.MAX_UPLOAD_SIZE:
+            rejection = FileTooLargeException(settings.MAX_UPLOAD_SIZE)
+        elif signature is None or not (
+                await self.minio_client.read_document_head(pending["object_name"], len(signature))
+        ).startswith(signature):
+            rejection = InvalidDocumentFormatException(dto.original_filename)
+        if rejection is not None:
+            await self.minio_client.delete_document(pending["object_name"])
+            await self.task_repository.save(document_id, {**pending, "status": "rejected"})
+            raise rejection
+        document_info = DocumentInfo(
+            id=document_id,
+            title=dto.title,
+            description=dto.description,
+            original_filename=dto.original_filename,
+            file_size=object_stat.size,
+            storage_path=pending["object_name"],
+            doc_metadata=dto.doc_metadata,
+            user_id=dto.user_id
+        )
+        document_info = await self.document_repository.save(document_info, None)
+
+        await self.task_repository.save(document_id, {**pending, "status": "completed"})
+        return document_info
+
     async def get_documents(self, skip: int = 0, limit: int = 10, search: Optional[str] = None, user_id: Optional[str] = None) -> Tuple[List[DocumentInfo], int]:
         """
         Lấy danh sách tài liệu.
@@ -118,32 +482,24 @@ class DocumentService:
         """
         await self.document_repository.delete(document_id, user_id_check=user_id_check)
 
-    async def download_document(self, document_id: str, user_id_check: Optional[str] = None) -> Tuple[str, str, str]:
+    async def download_document(self, document_id: str, user_id_check: Optional[str] = None) -> Tuple[Optional[DocumentInfo], Any]:
         """
-        Tải xuống tài liệu.
+        Mở luồng tải xuống tài liệu trực tiếp từ MinIO.
 
         Args:
             document_id: ID của tài liệu
             user_id_check: ID người dùng để kiểm tra quyền sở hữu (optional)
 
         Returns:
-            Tuple chứa (file_path, media_type, filename)
+            Tuple chứa (thông tin tài liệu, MinIO response để stream), (None, None) nếu không tồn tại
         """
+        document_info = await self.document_repository.get_info(document_id, user_id_check=user_id_check)
+        if not document_info:
+            return None, None
+
         try:
-            document_info, content = await self.document_repository.get(document_id, user_id_check=user_id_check)
-            
-            # Tạo file tạm thời để trả về
-            temp_dir = settings.TEMP_DIR
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            temp_filename = f"{uuid.uuid4()}_{document_info.original_filename}"
-            temp_path = os.path.join(temp_dir, temp_filename)
-            
-            with open(temp_path, "wb") as f:
-                f.write(content)
-            
-            return temp_path, document_info.file_type, document_info.original_filename
-            
+            minio_response = await self.minio_client.get_document_stream(document_info.storage_path)
+            return document_info, minio_response
         except Exception as e:
             logger.error(f"Lỗi khi tải tài liệu {document_id}: {e}", exc_info=True)
             raise StorageException(f"Không thể tải tài liệu: {str(e)}")
@@ -161,43 +517,19 @@ class DocumentService:
             Dict chứa thông tin tài liệu PDF
         """
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_word_file_obj:
-                temp_word_file_obj.write(content)
-                temp_word_path = temp_word_file_obj.name
-            
             pdf_basename = os.path.splitext(original_filename)[0] + ".pdf"
-            os.makedirs(settings.TEMP_DIR, exist_ok=True)
-            temp_pdf_path = os.path.join(settings.TEMP_DIR, f"{uuid.uuid4()}_{pdf_basename}")
-
-            try:
-                WordConverter.convert_to_pdf(
-                    input_path=temp_word_path,
-                    output_path=temp_pdf_path,
-                    method="libreoffice"  
+            async with _converted_pdf(content) as pdf_file:
+                document_info_pdf = DocumentInfo(
+                    title=os.path.splitext(original_filename)[0] + " (PDF)",
+                    description=f"PDF được chuyển đổi từ {original_filename}",
+                    original_filename=pdf_basename,
+                    file_size=0,
+                    file_type="application/pdf",
+                    storage_path="",  
+                    doc_metadata={"converted_from": original_filename, "original_word_filename": original_filename},
+                    user_id=user_id
                 )
-
-                with open(temp_pdf_path, "rb") as f:
-                    pdf_content = f.read()
-            finally:
-                if os.path.exists(temp_word_path):
-                    os.unlink(temp_word_path)
-                if os.path.exists(temp_pdf_path) and not 'pdf_content' in locals():
-                    os.unlink(temp_pdf_path)
-
-            document_info_pdf = DocumentInfo(
-                title=os.path.splitext(original_filename)[0] + " (PDF)",
-                description=f"PDF được chuyển đổi từ {original_filename}",
-                original_filename=pdf_basename,
-                file_size=len(pdf_content),
-                file_type="application/pdf",
-                storage_path="",  
-                doc_metadata={"converted_from": original_filename, "original_word_filename": original_filename},
-                user_id=user_id
-            )
-            saved_pdf_info = await self.document_repository.save(document_info_pdf, pdf_content)
-            
-            if os.path.exists(temp_pdf_path):
-                os.unlink(temp_pdf_path)
+                saved_pdf_info = await self.document_repository.save(document_info_pdf, pdf_file)
 
             return {
                 "id": saved_pdf_info.id,
@@ -206,10 +538,6 @@ class DocumentService:
             }
         except Exception as e:
             logger.error(f"Lỗi khi chuyển đổi Word sang PDF cho file {original_filename}, user {user_id}: {e}", exc_info=True)
-            if 'temp_word_path' in locals() and os.path.exists(temp_word_path):
-                os.unlink(temp_word_path)
-            if 'temp_pdf_path' in locals() and os.path.exists(temp_pdf_path):
-                os.unlink(temp_pdf_path)
             raise ConversionException(f"Lỗi khi chuyển đổi sang PDF: {str(e)}")
 
     async def add_watermark(self, content: bytes, original_filename: str, dto: WatermarkDTO, user_id: str) -> Dict[str, Any]:
@@ -226,7 +554,8 @@ class DocumentService:
             Dict chứa thông tin tài liệu đã thêm watermark
         """
         try:
-            output_content = WatermarkHelper.add_watermark(
+            output_content = await _run_cpu_bound(
+                WatermarkHelper.add_watermark,
                 input_data=content,
                 text=dto.text,
                 position=dto.position,
@@ -265,6 +594,76 @@ class DocumentService:
             logger.error(f"Lỗi khi thêm watermark vào file {original_filename}, user {user_id}: {str(e)}", exc_info=True)
             raise
 
+    async def _submit_file_task(self, task_type: str, stream: BinaryIO, original_filename: str, user_id: str, params: Dict[str, Any]) -> str:
+        """
+        Stream file tải lên vào MinIO và đăng tác vụ cho worker, trả về task_id.
+        """
+        task_id = str(uuid.uuid4())
+        object_name = await self.minio_client.upload_document_stream(stream=stream, filename=original_filename)
+        await self.task_repository.save(task_id, {
+            "status": "pending",
+            "task_type": task_type,
+            "user_id": user_id,
+            "progress": 0.0
+        })
+        await self.rabbitmq_client.publish_task(task_id, task_type, {
+            "user_id": user_id,
+            "object_name": object_name,
+            "original_filename": original_filename,
+            **params
+        })
+        return task_id
+
+    async def submit_convert_to_pdf(self, stream: BinaryIO, original_filename: str, user_id: str) -> str:
+        """
+        Đăng tác vụ chuyển đổi Word sang PDF cho worker.
+
+        Returns:
+            ID của tác vụ
+        """
+        return await self._submit_file_task("convert_to_pdf", stream, original_filename, user_id, {})
+
+    async def submit_add_watermark(self, stream: BinaryIO, original_filename: str, dto: WatermarkDTO, user_id: str) -> str:
+        """
+        Đăng tác vụ thêm watermark cho worker.
+
+        Returns:
+            ID của tác vụ
+        """
+        return await self._submit_file_task("watermark", stream, original_filename, user_id, {"watermark": msgspec.structs.asdict(dto)})
+
+    async def get_task_status(self, task_id: str, user_id: Optional[str] = None) -> Optional[TaskStatusDTO]:
+        """
+        Lấy trạng thái tác vụ bất đồng bộ.
+
+        Args:
+            task_id: ID của tác vụ
+            user_id: ID người dùng để kiểm tra quyền sở hữu (optional)
+        """
+        task_status = await self.task_repository.get(task_id)
+        if not task_status or (user_id and task_status.get("user_id") != user_id):
+            return None
+        return TaskStatusDTO(**task_status)
+
+    async def run_task(self, message: Dict[str, Any]) -> None:
+        """
+        Worker: thực thi tác vụ convert_to_pdf / watermark đã được đăng lên queue.
+        """
+        object_name = message["object_name"]
+        original_filename = message["original_filename"]
+        user_id = message["user_id"]
+
+        async def handler() -> Dict[str, Any]:
+            try:
+                content = await self.minio_client.download_document(object_name)
+                if message["task_type"] == "watermark":
+                    return await self.add_watermark(content, original_filename, WatermarkDTO(**message["watermark"]), user_id)
+                return await self.convert_to_pdf(content, original_filename, user_id)
+            finally:
+                await self.minio_client.delete_document(object_name)
+
+        await _run_tracked_task(self.task_repository, message, handler)
+
     async def process_document_async(self, document_id: str, user_id: Optional[str] = None) -> None:
         """
         Xử lý tài liệu bất đồng bộ.
@@ -273,11 +672,11 @@ class DocumentService:
             document_id: ID của tài liệu
         """
         try:
-            document_info, _ = await self.document_repository.get(document_id, user_id_check=user_id)
+            document_info = await self.document_repository.get_info(document_id, user_id_check=user_id)
 
             await self.rabbitmq_client.publish_convert_to_pdf_task(document_id)
         except Exception as e:
-            print(f"Lỗi khi xử lý tài liệu {document_id}: {str(e)}")
+            logger.exception(f"Lỗi khi xử lý tài liệu {document_id}: {str(e)}")
 
 
 class TemplateService:
@@ -290,7 +689,9 @@ class TemplateService:
             template_repository: TemplateRepository,
             minio_client: MinioClient,
             rabbitmq_client: RabbitMQClient,
-            batch_processing_repository: Optional[BatchProcessingRepository] = None
+            batch_processing_repository: Optional[BatchProcessingRepository] = None,
+            task_repository: Optional[TaskStatusRepository] = None,
+            document_repository: Optional[DocumentRepository] = None
     ):
         """
         Khởi tạo service.
@@ -299,12 +700,16 @@ class TemplateService:
             template_repository: Repository để làm việc với mẫu tài liệu
             minio_client: Client MinIO để lưu trữ mẫu tài liệu
             rabbitmq_client: Client RabbitMQ để gửi tin nhắn
+            batch_processing_repository: Repository lưu trạng thái xử lý hàng loạt
+            task_repository: Repository lưu trạng thái tác vụ bất đồng bộ
+            document_repository: Repository tài liệu dùng chung để lưu kết quả
         """
         self.template_repository = template_repository
         self.minio_client = minio_client
         self.rabbitmq_client = rabbitmq_client
-        self.document_repository = None
+        self.document_repository = document_repository
         self.batch_processing_repository = batch_processing_repository or BatchProcessingRepository()
+        self.task_repository = task_repository or TaskStatusRepository()
 
     def set_document_repository(self, document_repository: DocumentRepository):
         """Cho phép inject DocumentRepository sau khi khởi tạo, tránh circular dependency."""
@@ -370,7 +775,7 @@ class TemplateService:
 
     async def _save_applied_template_as_document(
         self, 
-        content_bytes: bytes, 
+        content: Union[bytes, BinaryIO], 
         original_template_filename: str, 
         output_format: str, 
         user_id: str, 
@@ -391,7 +796,7 @@ class TemplateService:
             title=f"{base_name} (from template {template_id})",
             description=f"Created from template {template_id}",
             original_filename=output_filename,
-            file_size=len(content_bytes),
+            file_size=len(content) if isinstance(content, bytes) else 0,
             file_type=file_type,
             document_category="word",
             user_id=user_id,
@@ -401,7 +806,7 @@ class TemplateService:
                 "filled_data_preview": {k: str(v)[:50] + '...' if isinstance(v, str) and len(v) > 50 else v for k, v in filled_data.items()}
             }
         )
-        saved_doc = await self.document_repository.save(doc_info_to_save, content_bytes)
+        saved_doc = await self.document_repository.save(doc_info_to_save, content)
         return {
             "id": saved_doc.id,
             "filename": saved_doc.original_filename,
@@ -413,36 +818,69 @@ class TemplateService:
         if not template_info:
             raise TemplateNotFoundException(dto.template_id)
 
+        return await self._apply_with_bytes(template_info, template_content, dto.data, dto.output_format, dto.user_id)
+
+    async def _apply_with_bytes(self, template_info: TemplateInfo, template_content: bytes, data: Dict[str, Any],
+                                output_format: str, user_id: str) -> Dict[str, Any]:
+        """
+        Áp dụng mẫu đã được tải sẵn, để các luồng xử lý nhiều dòng chỉ cần lấy template một lần.
+        """
         filled_content_bytes = template_content
+        if template_info.original_filename.lower().endswith('.docx') and data:
+            filled_content_bytes = await _render_template_cached(template_content, data)
+
+        if not (template_info.original_filename.endswith(('.doc', '.docx')) and output_format == 'pdf'):
+            return await self._save_applied_template_as_document(
+                filled_content_bytes, 
+                template_info.original_filename, 
+                output_format, 
+                user_id,
+                template_info.template_id,
+                data
+            )
 
-        if template_info.original_filename.endswith(('.doc', '.docx')) and dto.output_format == 'pdf':
-            try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_filled_doc:
-                    temp_filled_doc.write(filled_content_bytes)
-                    temp_filled_doc_path = temp_filled_doc.name
-                
-                pdf_output_path = os.path.splitext(temp_filled_doc_path)[0] + ".pdf"
-                WordConverter.convert_to_pdf(temp_filled_doc_path, pdf_output_path, method="libreoffice")
-                
-                with open(pdf_output_path, "rb") as f:
-                    final_output_bytes = f.read()
-                
-                os.unlink(temp_filled_doc_path)
-                os.unlink(pdf_output_path)
-            except Exception as e:
-                logger.error(f"Error converting filled template {dto.template_id} to PDF for user {dto.user_id}: {e}", exc_info=True)
-                raise TemplateApplicationException(f"Error converting filled template to PDF: {e}")
-        else:
-            final_output_bytes = filled_content_bytes
+        try:
+            async with _converted_pdf(filled_content_bytes) as pdf_file:
+                return await self._save_applied_template_as_document(
+                    pdf_file, 
+                    template_info.original_filename, 
+                    output_format, 
+                    user_id,
+                    template_info.template_id,
+                    data
+                )
+        except StorageException:
+            raise
+        except Exception as e:
+            logger.error(f"Error converting filled template {template_info.template_id} to PDF for user {user_id}: {e}", exc_info=True)
+            raise TemplateApplicationException(f"Error converting filled template to PDF: {e}")
 
-        return await self._save_applied_template_as_document(
-            final_output_bytes, 
-            template_info.original_filename, 
-            dto.output_format, 
-            dto.user_id,
-            dto.template_id,
-            dto.data
-        )
+    async def submit_apply_template(self, dto: TemplateDataDTO) -> str:
+        """
+        Đăng tác vụ áp dụng mẫu cho worker.
+
+        Returns:
+            ID của tác vụ
+        """
+        task_id = str(uuid.uuid4())
+        await self.task_repository.save(task_id, {
+            "status": "pending",
+            "task_type": "apply_template",
+            "user_id": dto.user_id,
+            "progress": 0.0
+        })
+        await self.rabbitmq_client.publish_task(task_id, "apply_template", {
+            "user_id": dto.user_id,
+            "template": msgspec.structs.asdict(dto)
+        })
+        return task_id
+
+    async def run_task(self, message: Dict[str, Any]) -> None:
+        """
+        Worker: thực thi tác vụ apply_template đã được đăng lên queue.
+        """
+        dto = TemplateDataDTO(**message["template"])
+        await _run_tracked_task(self.task_repository, message, lambda: self.apply_template(dto))
 
     async def _create_document_from_data(self, data: Dict[str, Any], template_filename: str, output_filename_base: str, user_id: str) -> Tuple[str, bytes]:
         """
@@ -454,19 +892,24 @@ class TemplateService:
         Trả về: (tên file output thực tế, nội dung file bytes)
         """
         logger.info(f"Tạo tài liệu {output_filename_base} cho user {user_id} từ template {template_filename}")
+        output_bytes = await _run_cpu_bound(self._build_placeholder_docx, output_filename_base, data)
+        generated_filename = f"{output_filename_base}.docx"
+        return generated_filename, output_bytes
+
+    @staticmethod
+    def _build_placeholder_docx(output_filename_base: str, data: Dict[str, Any]) -> bytes:
         doc = DocxDocument()
         doc.add_heading(f'Placeholder cho {output_filename_base}', 0)
         doc.add_paragraph(f'Dữ liệu: {json.dumps(data, ensure_ascii=False, indent=2)}')
         output_io = io.BytesIO()
         doc.save(output_io)
-        output_bytes = output_io.getvalue()
-        generated_filename = f"{output_filename_base}.docx"
-        return generated_filename, output_bytes
+        return output_io.getvalue()
 
     async def create_internship_report(self, data: InternshipReportModel, user_id: str) -> Dict[str, Any]:
         output_filename_base = f"internship_report_{data.intern_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}"
+        form_data = data.model_dump()
         generated_filename, output_bytes = await self._create_document_from_data(
-            data.dict(), 
+            form_data, 
             "internship_report_template.docx",
             output_filename_base,
             user_id
@@ -477,13 +920,14 @@ class TemplateService:
             "docx", 
             user_id,
             "internship-report-form",
-            data.dict()
+            form_data
         )
 
     async def create_reward_report(self, data: RewardReportModel, user_id: str) -> Dict[str, Any]:
         output_filename_base = f"reward_report_{data.recipient.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}"
+        form_data = data.model_dump()
         generated_filename, output_bytes = await self._create_document_from_data(
-            data.dict(),
+            form_data,
             "reward_report_template.docx",
             output_filename_base,
             user_id
@@ -494,13 +938,14 @@ class TemplateService:
             "docx",
             user_id,
             "reward-report-form",
-            data.dict()
+            form_data
         )
 
     async def create_labor_contract(self, data: LaborContractModel, user_id: str) -> Dict[str, Any]:
         output_filename_base = f"labor_contract_{data.employee_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}"
+        form_data = data.model_dump()
         generated_filename, output_bytes = await self._create_document_from_data(
-            data.dict(),
+            form_data,
             "labor_contract_template.docx",
             output_filename_base,
             user_id
@@ -511,9 +956,237 @@ class TemplateService:
             "docx",
             user_id,
             "labor-contract-form",
-            data.dict()
+            form_data
         )
 
+    async def _render_batch_item(self, index: int, item_data: Dict[str, Any], original_data_filename: str,
+                           output_format: str, temp_dir_for_batch: str) -> str:
+        """
+        Tạo tài liệu cho một dòng dữ liệu của batch, trả về đường dẫn file kết quả trong thư mục batch.
+        """
+        output_filename_base = f"{os.path.splitext(original_data_filename)[0]}_item_{index+1}"
+        if output_format == 'pdf':
+            temp_filled_item_doc_path = await _run_in_render_pool(
+                self._write_batch_item_docx, index, item_data, output_filename_base, temp_dir_for_batch
+            )
+            try:
+                pdf_item_output_path = os.path.splitext(temp_filled_item_doc_path)[0] + ".pdf"
+                await convert_to_pdf_limited(temp_filled_item_doc_path, pdf_item_output_path)
+            finally:
+                await aiofiles.os.remove(temp_filled_item_doc_path)
+            return pdf_item_output_path
+
+        return await _run_in_render_pool(
+            self._write_batch_item_docx, index, item_data, output_filename_base, temp_dir_for_batch
+        )
+
+    async def _render_batch_items(self, start_index: int, data_list: List[Dict[str, Any]], original_data_filename: str,
+                                  output_format: str, temp_dir_for_batch: str,
+                                  on_group_done: Optional[Callable[[int, List[Union[str, BaseException]]], Awaitable[None]]] = None
+                                  ) -> List[Union[str, BaseException]]:
+        """
+        Dựng song song các dòng của batch theo từng nhóm BATCH_RENDER_CONCURRENCY để giới hạn bộ nhớ.
+        Trả về đường dẫn file kết quả hoặc ngoại lệ của từng dòng, theo đúng thứ tự dòng.
+        on_group_done(vị trí dòng đầu của nhóm, kết quả nhóm) được gọi sau mỗi nhóm.
+        """
+        if output_format == 'pdf' and settings.PDF_BACKEND == "libreoffice":
+            return await self._render_batch_pdf_pipeline(
+                start_index, data_list, original_data_filename, temp_dir_for_batch, on_group_done
+            )
+
+        results: List[Union[str, BaseException]] = []
+        group_size = settings.BATCH_RENDER_CONCURRENCY
+        for group_start in range(0, len(data_list), group_size):
+            group_results = await asyncio.gather(
+                *(
+                    self._render_batch_item(start_index + group_start + offset, item_data, original_data_filename,
+                                            output_format, temp_dir_for_batch)
+                    for offset, item_data in enumerate(data_list[group_start:group_start + group_size])
+                ),
+                return_exceptions=True
+            )
+            results.extend(group_results)
+            if on_group_done is not None:
+                await on_group_done(start_index + group_start, group_results)
+        return results
+
+    async def _render_batch_pdf_pipeline(self, start_index: int, data_list: List[Dict[str, Any]], original_data_filename: str,
+                                         temp_dir_for_batch: str,
+                                         on_group_done: Optional[Callable[[int, List[Union[str, BaseException]]], Awaitable[None]]]
+                                         ) -> List[Union[str, BaseException]]:
+        """
+        Dựng PDF theo hai giai đoạn chồng lên nhau: trong lúc LibreOffice chuyển nhóm trước,
+        pool tiến trình dựng docx cho nhóm sau, để CPU và soffice không phải chờ nhau.
+        Mỗi lúc chỉ có tối đa hai nhóm docx tạm trên đĩa.
+        """
+        results: List[Union[str, BaseException]] = []
+        group_size = settings.BATCH_RENDER_CONCURRENCY
+        pending: Optional[Tuple[int, asyncio.Task]] = None
+
+        async def finish(group_start: int, conversion: asyncio.Task) -> None:
+            group_results = await conversion
+            results.extend(group_results)
+            if on_group_done is not None:
+                await on_group_done(start_index + group_start, group_results)
+
+        try:
+            for group_start in range(0, len(data_list), group_size):
+                rendered = await self._write_batch_docx_group(
+                    start_index + group_start, data_list[group_start:group_start + group_size],
+                    original_data_filename, temp_dir_for_batch
+                )
+                if pending is not None:
+                    await finish(*pending)
+                pending = (group_start, asyncio.create_task(self._convert_batch_docx_group(rendered, temp_dir_for_batch)))
+            if pending is not None:
+                await finish(*pending)
+        finally:
+            if pending is not None and not pending[1].done():
+                # Chờ task hủy xong để soffice đã bị kill và profile đã về pool trước khi dọn thư mục batch
+                pending[1].cancel()
+                await asyncio.gather(pending[1], return_exceptions=True)
+        return results
+
+    async def _write_batch_docx_group(self, start_index: int, data_list: List[Dict[str, Any]], original_data_filename: str,
+                                      temp_dir_for_batch: str) -> List[Union[str, BaseException]]:
+        """
+        Dựng song song các file docx tạm của một nhóm dòng trên pool tiến trình.
+        """
+        output_filename_prefix = os.path.splitext(original_data_filename)[0]
+        return list(await asyncio.gather(
+            *(
+                _run_in_render_pool(
+                    self._write_batch_item_docx, start_index + offset, item_data,
+                    f"{output_filename_prefix}_item_{start_index + offset + 1}", temp_dir_for_batch
+                )
+                for offset, item_data in enumerate(data_list)
+            ),
+            return_exceptions=True
+        ))
+
+    @staticmethod
+    async def _convert_batch_docx_group(results: List[Union[str, BaseException]],
+                                        temp_dir_for_batch: str) -> List[Union[str, BaseException]]:
+        """
+        Chuyển các file docx tạm của một nhóm sang PDF trong một lần gọi LibreOffice
+        thay vì khởi động soffice cho từng dòng, rồi xóa các file docx tạm.
+        """
+        docx_positions = [position for position, result in enumerate(results) if isinstance(result, str)]
+        if not docx_positions:
+            return results
+
+        docx_paths = [results[position] for position in docx_positions]
+        try:
+            pdf_paths = await _convert_many_to_pdf_limited(docx_paths, temp_dir_for_batch)
+        except Exception as e:
+            pdf_paths = [e] * len(docx_paths)
+        finally:
+            await asyncio.gather(*(aiofiles.os.remove(path) for path in docx_paths), return_exceptions=True)
+
+        results = list(results)
+        for position, docx_path, pdf_path in zip(docx_positions, docx_paths, pdf_paths):
+            results[position] = pdf_path if pdf_path is not None else Exception(
+                f"LibreOffice không tạo được PDF cho {os.path.basename(docx_path)}"
+            )
+        return results
+
+    @staticmethod
+    def _write_batch_item_docx(index: int, item_data: Dict[str, Any], output_filename_base: str,
+                               temp_dir_for_batch: str) -> str:
+        """
+        Ghi docx của một dòng thành {output_filename_base}.docx; tên cố định theo số dòng nên
+        nhóm được giao lại ghi đè đúng file cũ (PDF chuyển từ nó cũng mang cùng tên) thay vì tạo bản trùng trong ZIP.
+        """
+        _temp_doc = DocxDocument()
+        _temp_doc.add_heading(f'Placeholder cho {output_filename_base} (item {index+1})', 0)
+        _temp_doc.add_paragraph(f'Dữ liệu: {json.dumps(item_data, ensure_ascii=False, indent=2, default=str)}')
+
+        temp_docx_path = os.path.join(temp_dir_for_batch, f"{output_filename_base}.docx")
+        _temp_doc.save(temp_docx_path)
+        return temp_docx_path
+
+    @staticmethod
+    def _build_zip(file_paths: List[str]) -> BinaryIO:
+        """
+        Đóng gói các file vào ZIP trên một file tạm spooled: giữ trong RAM tới ZIP_SPOOL_MAX_SIZE
+        rồi chuyển xuống đĩa, để bộ nhớ không tăng theo kích thước batch.
+        """
+        zip_buffer = tempfile.SpooledTemporaryFile(max_size=settings.ZIP_SPOOL_MAX_SIZE, dir=settings.TEMP_DIR)
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as zipf:
+            for file_path in file_paths:
+                # DOCX/PDF... đã được nén sẵn, nén lại chỉ tốn CPU mà không giảm kích thước
+                compress_type = (
+                    zipfile.ZIP_STORED if file_path.lower().endswith(_PRECOMPRESSED_EXTS) else zipfile.ZIP_DEFLATED
+                )
+                zipf.write(file_path, os.path.basename(file_path), compress_type=compress_type)
+        zip_buffer.seek(0)
+        return zip_buffer
+
+    async def _finalize_batch(self, batch_info: BatchProcessingInfo, generated_files_paths: List[str]) -> None:
+        """
+        Lưu kết quả batch (ZIP hoặc file đơn) vào kho tài liệu và đặt trạng thái cuối cùng.
+        """
+        task_id = batch_info.task_id
+        template_id_or_name = batch_info.template_id
+        original_data_filename = batch_info.original_data_filename
+        output_format = batch_info.output_format
+        user_id = batch_info.user_id
+
+        if output_format == "zip" or batch_info.total_files > 1:
+            zip_filename_base = f"{os.path.splitext(original_data_filename)[0]}_batch_{task_id}"
+            zip_filename = f"{zip_filename_base}.zip"
+            zip_buffer = await _run_cpu_bound(self._build_zip, generated_files_paths)
+            try:
+                zip_size = zip_buffer.seek(0, os.SEEK_END)
+
+                zip_doc_info = DocumentInfo(
+                    title=f"Batch Processed: {original_data_filename} (Task {task_id})",
+                    description=f"Archive of {batch_info.total_files} documents generated from template {template_id_or_name} and data {original_data_filename}. Task ID: {task_id}",
+                    original_filename=zip_filename,
+                    file_size=zip_size,
+                    file_type="application/zip",
+                    document_category="archive",
+                    user_id=user_id,
+                    doc_metadata={
+                        "batch_task_id": task_id,
+                        "template_id": template_id_or_name,
+                        "source_data_file": original_data_filename,
+                        "num_items": batch_info.total_files,
+                        "output_format_items": output_format if output_format != "zip" else "docx"
+                    }
+                )
+                if not self.document_repository:
+                    raise Exception("DocumentRepository not set for TemplateService, cannot save batch ZIP.")
+                saved_zip_doc = await self.document_repository.save(zip_doc_info, zip_buffer)
+                batch_info.generated_documents.append({"document_id": saved_zip_doc.id, "filename": saved_zip_doc.original_filename})
+            finally:
+                zip_buffer.close()
+
+        elif len(generated_files_paths) == 1:
+            single_file_path = generated_files_paths[0]
+            single_file_bytes = await asyncio.to_thread(Path(single_file_path).read_bytes)
+
+            single_doc_info = DocumentInfo(
+                 title=f"Generated: {os.path.basename(single_file_path)} (Task {task_id})",
+                 description=f"Document generated from template {template_id_or_name} and data {original_data_filename}. Task ID: {task_id}",
+                 original_filename=os.path.basename(single_file_path),
+                 file_size=len(single_file_bytes),
+                 file_type="application/pdf" if output_format == "pdf" else "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                 document_category="word",
+                 user_id=user_id,
+                 doc_metadata={
+                    "batch_task_id": task_id,
+                    "template_id": template_id_or_name,
+                    "source_data_file": original_data_filename
+                 }
+            )
+            if not self.document_repository:
+                raise Exception("DocumentRepository not set for TemplateService, cannot save single batch item.")
+            saved_single_doc = await self.document_repository.save(single_doc_info, single_file_bytes)
+            batch_info.generated_documents.append({"document_id": saved_single_doc.id, "filename": saved_single_doc.original_filename})
+
+        batch_info.status = "COMPLETED" if not batch_info.errors else "COMPLETED_WITH_ERRORS"
+
     async def process_batch_async(self, 
                                   task_id: str, 
                                   template_id_or_name: str,
@@ -540,116 +1213,41 @@ class TemplateService:
         if self.batch_processing_repository:
             await self.batch_processing_repository.save(batch_info)
 
-        processed_docs_info = []
         temp_dir_for_batch = os.path.join(settings.TEMP_DIR, task_id)
-        os.makedirs(temp_dir_for_batch, exist_ok=True)
+        await aiofiles.os.makedirs(temp_dir_for_batch, exist_ok=True)
         generated_files_paths = []
 
-        try:
-            for i, item_data in enumerate(data_list):
-                try:
-                    output_filename_base = f"{os.path.splitext(original_data_filename)[0]}_item_{i+1}"
-                    _temp_doc = DocxDocument()
-                    _temp_doc.add_heading(f'Placeholder cho {output_filename_base} (item {i+1})', 0)
-                    _temp_doc.add_paragraph(f'Dữ liệu: {json.dumps(item_data, ensure_ascii=False, indent=2)}')
-                    temp_output_io = io.BytesIO()
-                    _temp_doc.save(temp_output_io)
-                    item_output_bytes = temp_output_io.getvalue()
-                    actual_output_filename_base = output_filename_base
-
-                    if output_format == 'pdf':
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx", dir=temp_dir_for_batch) as temp_filled_item_doc:
-                            temp_filled_item_doc.write(item_output_bytes)
-                            temp_filled_item_doc_path = temp_filled_item_doc.name
-                        
-                        pdf_item_output_path = os.path.splitext(temp_filled_item_doc_path)[0] + ".pdf"
-                        WordConverter.convert_to_pdf(temp_filled_item_doc_path, pdf_item_output_path, method="libreoffice")
-                        
-                        with open(pdf_item_output_path, "rb") as f:
-                            final_item_output_bytes = f.read()
-                        
-                        os.unlink(temp_filled_item_doc_path)
-                        actual_output_filename_with_ext = f"{actual_output_filename_base}.pdf"
-                        path_to_save_for_zip = pdf_item_output_path
-                    else:
-                        final_item_output_bytes = item_output_bytes
-                        actual_output_filename_with_ext = f"{actual_output_filename_base}.docx"
-                        temp_docx_path = os.path.join(temp_dir_for_batch, actual_output_filename_with_ext)
-                        with open(temp_docx_path, "wb") as f_temp_docx:
-                            f_temp_docx.write(final_item_output_bytes)
-                        path_to_save_for_zip = temp_docx_path
-
-                    generated_files_paths.append(path_to_save_for_zip)
-                    
+        last_update_ts = time.monotonic()
+        last_update_count = 0
+        update_every = max(1, len(data_list) // 100)
+
+        async def record_group(group_start: int, group_results: List[Union[str, BaseException]]) -> None:
+            nonlocal last_update_ts, last_update_count
+            for offset, result in enumerate(group_results):
+                i = group_start + offset
+                if isinstance(result, BaseException):
+                    logger.error(f"Lỗi khi xử lý item {i+1} cho batch {task_id}: {result}", exc_info=result)
+                    batch_info.errors.append(f"Item {i+1}: {str(result)}")
+                else:
+                    generated_files_paths.append(result)
                     batch_info.processed_files += 1
 
-                except Exception as e_item:
-                    logger.error(f"Lỗi khi xử lý item {i+1} cho batch {task_id}: {e_item}", exc_info=True)
-                    batch_info.errors.append(f"Item {i+1}: {str(e_item)}")
-                
-                if self.batch_processing_repository:
-                    batch_info.status = "PROCESSING" if batch_info.processed_files < batch_info.total_files else "COMPLETED"
-                    await self.batch_processing_repository.update(batch_info)
-
-            if output_format == "zip" or (output_format == "pdf" and len(data_list) > 1) or (output_format == "docx" and len(data_list) > 1):
-                zip_filename_base = f"{os.path.splitext(original_data_filename)[0]}_batch_{task_id}"
-                zip_filename = f"{zip_filename_base}.zip"
-                zip_output_path = os.path.join(settings.TEMP_DIR, zip_filename)
-
-                with zipfile.ZipFile(zip_output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for file_path_in_batch_dir in generated_files_paths:
-                        zipf.write(file_path_in_batch_dir, os.path.basename(file_path_in_batch_dir))
-                
-                with open(zip_output_path, "rb") as f_zip:
-                    zip_content_bytes = f_zip.read()
-                
-                zip_doc_info = DocumentInfo(
-                    title=f"Batch Processed: {original_data_filename} (Task {task_id})",
-                    description=f"Archive of {len(data_list)} documents generated from template {template_id_or_name} and data {original_data_filename}. Task ID: {task_id}",
-                    original_filename=zip_filename,
-                    file_size=len(zip_content_bytes),
-                    file_type="application/zip",
-                    document_category="archive",
-                    user_id=user_id,
-                    doc_metadata={
-                        "batch_task_id": task_id,
-                        "template_id": template_id_or_name,
-                        "source_data_file": original_data_filename,
-                        "num_items": len(data_list),
-                        "output_format_items": output_format if output_format != "zip" else "docx"
-                    }
-                )
-                if not self.document_repository:
-                    raise Exception("DocumentRepository not set for TemplateService, cannot save batch ZIP.")
-                saved_zip_doc = await self.document_repository.save(zip_doc_info, zip_content_bytes)
-                batch_info.generated_documents.append({"document_id": saved_zip_doc.id, "filename": saved_zip_doc.original_filename})
-                os.unlink(zip_output_path)
-            
-            elif len(generated_files_paths) == 1 and output_format != "zip":
-                single_file_path = generated_files_paths[0]
-                with open(single_file_path, "rb") as f_single:
-                    single_file_bytes = f_single.read()
-                
-                single_doc_info = DocumentInfo(
-                     title=f"Generated: {os.path.basename(single_file_path)} (Task {task_id})",
-                     description=f"Document generated from template {template_id_or_name} and data {original_data_filename}. Task ID: {task_id}",
-                     original_filename=os.path.basename(single_file_path),
-                     file_size=len(single_file_bytes),
-                     file_type="application/pdf" if output_format == "pdf" else "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                     document_category="word",
-                     user_id=user_id,
-                     doc_metadata={
-                        "batch_task_id": task_id,
-                        "template_id": template_id_or_name,
-                        "source_data_file": original_data_filename
-                     }
-                )
-                if not self.document_repository:
-                    raise Exception("DocumentRepository not set for TemplateService, cannot save single batch item.")
-                saved_single_doc = await self.document_repository.save(single_doc_info, single_file_bytes)
-                batch_info.generated_documents.append({"document_id": saved_single_doc.id, "filename": saved_single_doc.original_filename})
+            # Gom các lần cập nhật tiến độ: ghi khi đủ ~1% số dòng hoặc sau BATCH_PROGRESS_INTERVAL giây
+            done = group_start + len(group_results)
+            if self.batch_processing_repository and (
+                done - last_update_count >= update_every
+                or time.monotonic() - last_update_ts > settings.BATCH_PROGRESS_INTERVAL
+            ):
+                await self.batch_processing_repository.update(batch_info)
+                last_update_ts = time.monotonic()
+                last_update_count = done
 
-            batch_info.status = "COMPLETED" if not batch_info.errors else "COMPLETED_WITH_ERRORS"
+        try:
+            await self._render_batch_items(
+                0, data_list, original_data_filename, output_format, temp_dir_for_batch, on_group_done=record_group
+            )
+
+            await self._finalize_batch(batch_info, generated_files_paths)
         except Exception as e_batch:
             logger.error(f"Lỗi nghiêm trọng trong process_batch_async cho task {task_id}: {e_batch}", exc_info=True)
             batch_info.status = "FAILED"
@@ -658,69 +1256,216 @@ class TemplateService:
             if self.batch_processing_repository:
                 await self.batch_processing_repository.update(batch_info)
             if os.path.exists(temp_dir_for_batch):
-                shutil.rmtree(temp_dir_for_batch, ignore_errors=True)
+                await asyncio.to_thread(shutil.rmtree, temp_dir_for_batch, ignore_errors=True)
             logger.info(f"Kết thúc process_batch_async cho task_id: {task_id}, status: {batch_info.status}")
 
-    def _parse_data_file(self, file_content: bytes, original_filename: str) -> List[Dict[str, Any]]:
-        """Parse CSV or Excel file content into a list of dictionaries."""
-        if original_filename.endswith(".csv"):
+    async def process_batch_chunk(self, message: Dict[str, Any]) -> None:
+        """
+        Worker: xử lý một nhóm dòng dữ liệu của batch được đăng lên queue.
+        Kết quả mỗi nhóm được ghi riêng theo start_index (giao lại không bị đếm hai lần);
+        worker nào thấy đủ số dòng và giành được quyền hoàn tất sẽ gom kết quả thành ZIP/file đơn.
+        """
+        task_id = message["task_id"]
+        start_index = message.get("start_index", 0)
+        output_format = message["output_format"]
+        original_data_filename = message.get("original_data_filename", "")
+
+        if await self.batch_processing_repository.is_finalized(task_id):
+            logger.info(f"Batch {task_id} đã hoàn tất, bỏ qua nhóm giao lại bắt đầu từ dòng {start_index}")
+            return
+
+        temp_dir_for_batch = os.path.join(settings.TEMP_DIR, task_id)
+        await aiofiles.os.makedirs(temp_dir_for_batch, exist_ok=True)
+
+        processed_files = 0
+        errors = []
+        results = await self._render_batch_items(
+            start_index, message["data_list"], original_data_filename, output_format, temp_dir_for_batch
+        )
+        for offset, result in enumerate(results):
+            i = start_index + offset
+            if isinstance(result, BaseException):
+                logger.error(f"Lỗi khi xử lý item {i+1} cho batch {task_id}: {result}", exc_info=result)
+                errors.append(f"Item {i+1}: {str(result)}")
+            else:
+                processed_files += 1
+
+        total_processed, all_errors = await self.batch_processing_repository.record_chunk_result(
+            task_id, start_index, processed_files, errors
+        )
+        total_files = message.get("total_files")
+        if total_files is None:
+            batch_info = await self.batch_processing_repository.get(task_id)
+            if not batch_info:
+                logger.warning(f"Không tìm thấy batch {task_id}, bỏ qua nhóm bắt đầu từ dòng {start_index}")
+                return
+            total_files = batch_info.total_files
+
+        if total_processed + len(all_errors) < total_files:
+            return
+        if not await self.batch_processing_repository.claim_finalization(task_id):
+            return
+
+        batch_info = await self.batch_processing_repository.get(task_id)
+        if not batch_info:
+            logger.warning(f"Không tìm thấy batch {task_id} khi hoàn tất")
+            return
+        if batch_info.status != "PROCESSING":
+            # Nhóm giao lại được dựng xong sau khi batch đã hoàn tất và thư mục tiến độ đã được dọn
+            logger.info(f"Batch {task_id} đã hoàn tất ({batch_info.status}), bỏ kết quả nhóm giao lại từ dòng {start_index}")
+            await asyncio.to_thread(shutil.rmtree, temp_dir_for_batch, ignore_errors=True)
+            await self.batch_processing_repository.clear_progress(task_id)
+            return
+        batch_info.processed_files = total_processed
+        batch_info.errors = all_errors
+
+        try:
+            generated_files_paths = sorted(
+                os.path.join(temp_dir_for_batch, name) for name in await aiofiles.os.listdir(temp_dir_for_batch)
+            )
+            await self._finalize_batch(batch_info, generated_files_paths)
+        except Exception as e_batch:
+            logger.error(f"Lỗi khi hoàn tất batch {task_id}: {e_batch}", exc_info=True)
+            batch_info.status = "FAILED"
+            batch_info.errors.append(f"Batch processing failed: {str(e_batch)}")
+        finally:
+            await asyncio.to_thread(shutil.rmtree, temp_dir_for_batch, ignore_errors=True)
+        logger.info(f"Kết thúc batch {task_id}, status: {batch_info.status}")
+
+        await self.batch_processing_repository.update(batch_info)
+        await self.batch_processing_repository.clear_progress(task_id)
+
+    def _open_data_rows(self, file_content: Union[bytes, BinaryIO], original_filename: str) -> Tuple[int, Iterator[Dict[str, Any]]]:
+        """
+        Mở file dữ liệu CSV/Excel mà không dựng toàn bộ bảng trong bộ nhớ.
+        Trả về (số dòng dữ liệu, iterator các dòng dạng dict); dòng trống bị bỏ qua ở cả hai.
+        """
+        data_io = io.BytesIO(file_content) if isinstance(file_content, bytes) else file_content
+        ext = os.path.splitext(original_filename)[1].lower()
+        if ext == ".csv":
             try:
-                data_io = io.StringIO(file_content.decode('utf-8'))
-                df = pd.read_csv(data_io)
-            except UnicodeDecodeError:
-                data_io = io.BytesIO(file_content)
-                df = pd.read_csv(data_io)
+                return self._open_csv_rows(data_io)
             except Exception as e:
                 raise InvalidDataFormatException(f"Lỗi đọc file CSV: {original_filename}. {str(e)}")
-
-        elif original_filename.endswith(('.xlsx', '.xls')):
+        if ext in (".xlsx", ".xls"):
             try:
-                data_io = io.BytesIO(file_content)
-                df = pd.read_excel(data_io)
+                return self._open_excel_rows(data_io)
             except Exception as e:
                 raise InvalidDataFormatException(f"Lỗi đọc file Excel: {original_filename}. {str(e)}")
-        else:
-            raise InvalidDataFormatException(f"Định dạng file dữ liệu không được hỗ trợ: {original_filename}. Chỉ chấp nhận CSV hoặc Excel.")
-        
-        df = df.fillna('')
-        return df.to_dict(orient='records')
+        raise InvalidDataFormatException(f"Định dạng file dữ liệu không được hỗ trợ: {original_filename}. Chỉ chấp nhận CSV hoặc Excel.")
+
+    @staticmethod
+    def _open_csv_rows(data_io: BinaryIO) -> Tuple[int, Iterator[Dict[str, Any]]]:
+        """
+        Đếm và đọc dần các dòng CSV bằng csv.DictReader (UTF-8, thay thế byte lỗi).
+        """
+        def text_lines():
+            data_io.seek(0)
+            return codecs.getreader("utf-8-sig")(data_io, errors="replace")
+
+        total = sum(1 for row in csv.reader(text_lines()) if any(row)) - 1
+        reader = csv.DictReader(text_lines())
+        rows = (
+            {key: value or '' for key, value in row.items() if key is not None}
+            for row in reader
+            if any(row.values())
+        )
+        return max(total, 0), rows
+
+    @staticmethod
+    def _open_excel_rows(data_io: BinaryIO) -> Tuple[int, Iterator[Dict[str, Any]]]:
+        """
+        Đọc sheet đầu tiên bằng python-calamine (parser Rust), nhanh và ít tốn bộ nhớ hơn openpyxl
+        với file lớn; các dòng được chuyển thành dict khi được lấy ra.
+        """
+        from python_calamine import CalamineWorkbook
+
+        sheet_rows = CalamineWorkbook.from_object(data_io).get_sheet_by_index(0).to_python(skip_empty_area=True)
+        if not sheet_rows:
+            return 0, iter(())
+        header = [str(column) for column in sheet_rows[0]]
+        body = [row for row in sheet_rows[1:] if any(cell not in (None, '') for cell in row)]
+        rows = (
+            {column: '' if cell is None else cell for column, cell in zip(header, row)}
+            for row in body
+        )
+        return len(body), rows
+
+    @staticmethod
+    def _read_rows(rows: Iterator[Dict[str, Any]], count: Optional[int]) -> List[Dict[str, Any]]:
+        try:
+            return list(itertools.islice(rows, count))
+        except Exception as e:
+            raise InvalidDataFormatException(f"Lỗi đọc file dữ liệu: {str(e)}")
 
     async def create_batch_documents_from_file(self, 
                                                template_id: str, 
-                                               file_content: bytes, 
+                                               file_content: Union[bytes, BinaryIO], 
                                                original_filename: str,
                                                output_format: str, 
-                                               user_id: str,
-                                               background_tasks: BackgroundTasks) -> str:
+                                               user_id: str) -> str:
         """
         Tạo tài liệu hàng loạt từ một template và một file dữ liệu (CSV/Excel).
-        Sử dụng background task để xử lý.
+        Dữ liệu được chia thành các nhóm BATCH_CHUNK_SIZE dòng và đăng lên RabbitMQ cho worker.
         """
         try:
-            data_list = self._parse_data_file(file_content, original_filename)
+            total_files, rows = await _run_cpu_bound(self._open_data_rows, file_content, original_filename)
         except InvalidDataFormatException as e:
             logger.error(f"Lỗi parse file dữ liệu {original_filename} cho batch: {e}")
             raise
 
-        if not data_list:
+        if not total_files:
             raise InvalidDataFormatException(f"Không có dữ liệu trong file: {original_filename}")
 
         task_id = str(uuid.uuid4())
-        
-        background_tasks.add_task(
-            self.process_batch_async,
+        batch_info = BatchProcessingInfo(
             task_id=task_id,
-            template_id_or_name=template_id,
-            data_list=data_list,
-            original_data_filename=original_filename,
+            user_id=user_id,
+            template_id=template_id,
+            status="PROCESSING",
+            total_files=total_files,
             output_format=output_format,
-            user_id=user_id
+            original_data_filename=original_filename
         )
+        await self.batch_processing_repository.save(batch_info)
+        # Worker ở process khác đọc batch khi hoàn tất, ghi metadata xuống đĩa trước khi đăng các nhóm dòng
+        await self.batch_processing_repository.flush()
+
+        start_index = 0
+        try:
+            # Gom tối đa BATCH_PUBLISH_WINDOW nhóm dòng rồi đăng cùng lúc, chỉ chờ xác nhận của broker một lượt
+            pending_chunks: List[Tuple[int, List[Dict[str, Any]]]] = []
+            next_index = 0
+            while True:
+                chunk = await _run_cpu_bound(self._read_rows, rows, settings.BATCH_CHUNK_SIZE)
+                if chunk:
+                    pending_chunks.append((next_index, chunk))
+                    next_index += len(chunk)
+                if pending_chunks and (not chunk or len(pending_chunks) >= settings.BATCH_PUBLISH_WINDOW):
+                    await self.rabbitmq_client.publish_batch_processing_tasks(
+                        task_id=task_id,
+                        template_id=template_id,
+                        chunks=pending_chunks,
+                        output_format=output_format,
+                        original_data_filename=original_filename,
+                        user_id=user_id,
+                        total_files=total_files
+                    )
+                    start_index = next_index
+                    pending_chunks = []
+                if not chunk:
+                    break
+        except Exception as e:
+            logger.error(f"Lỗi khi đăng các nhóm dòng của batch {task_id} từ dòng {start_index}: {e}", exc_info=True)
+            batch_info.status = "FAILED"
+            batch_info.errors.append(f"Batch processing failed: {str(e)}")
+            await self.batch_processing_repository.update(batch_info)
+            raise
         logger.info(f"Đã tạo task xử lý batch (create_batch_documents_from_file) với ID: {task_id} cho user {user_id}")
         return task_id
 
     async def generate_invitations_from_file(self,
-                                             file_content: bytes,
+                                             file_content: Union[bytes, BinaryIO],
                                              original_filename: str,
                                              output_format: str,
                                              user_id: str,
@@ -732,7 +1477,8 @@ class TemplateService:
         logger.info(f"Bắt đầu generate_invitations_from_file cho user {user_id} từ file {original_filename}")
         
         try:
-            data_list = self._parse_data_file(file_content, original_filename)
+            _, rows = await _run_cpu_bound(self._open_data_rows, file_content, original_filename)
+            data_list = await _run_cpu_bound(self._read_rows, rows, None)
         except InvalidDataFormatException as e:
             logger.error(f"Lỗi parse file dữ liệu {original_filename} cho invitations: {e}")
             raise 
@@ -28,19 +28,45 @@ class Settings(BaseSettings):
     RABBITMQ_USER: str = os.getenv("RABBITMQ_USER", "admin")
     RABBITMQ_PASS: str = os.getenv("RABBITMQ_PASS", "adminpassword")
     RABBITMQ_VHOST: str = os.getenv("RABBITMQ_VHOST", "/")
+    RABBITMQ_CONNECTION_POOL_SIZE: int = int(os.getenv("RABBITMQ_CONNECTION_POOL_SIZE", "2"))
+    RABBITMQ_CHANNEL_POOL_SIZE: int = int(os.getenv("RABBITMQ_CHANNEL_POOL_SIZE", "10"))
 
     MINIO_HOST: str = os.getenv("MINIO_HOST", "minio")
     MINIO_PORT: int = int(os.getenv("MINIO_PORT", "9000"))
     MINIO_ACCESS_KEY: str = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
     MINIO_SECRET_KEY: str = os.getenv("MINIO_SECRET_KEY", "minioadmin")
-    MINIO_WORD_BUCKET: str = "word-documents"
-    MINIO_TEMPLATES_BUCKET: str = "word-templates"
+    MINIO_WORD_BUCKET: str = os.getenv("MINIO_WORD_BUCKET", "word-documents")
+    MINIO_TEMPLATES_BUCKET: str = os.getenv("MINIO_TEMPLATES_BUCKET", "word-templates")
+    MINIO_POOL_MAXSIZE: int = int(os.getenv("MINIO_POOL_MAXSIZE", "64"))
+    # Endpoint MinIO mà client bên ngoài mạng compose truy cập được (host:port), dùng để ký presigned URL
+    MINIO_PUBLIC_ENDPOINT: str = os.getenv("MINIO_PUBLIC_ENDPOINT", "")
+    MINIO_PUBLIC_SECURE: bool = os.getenv("MINIO_PUBLIC_SECURE", "false").lower() == "true"
+    MINIO_REGION: str = os.getenv("MINIO_REGION", "us-east-1")
 
     TEMPLATES_DIR: str = "/app/templates"
     TEMP_DIR: str = "/app/temp"
+    # Thư mục cho file tạm ngắn hạn của từng yêu cầu (chuyển PDF), nên đặt trên tmpfs
+    SCRATCH_DIR: str = os.getenv("SCRATCH_DIR", "/app/temp")
 
     DEFAULT_PAGE_SIZE: int = 10
+    MAX_PAGE_SIZE: int = 100
+    LIST_CACHE_TTL_SECONDS: int = int(os.getenv("LIST_CACHE_TTL_SECONDS", "5"))
+    LIST_CACHE_MAXSIZE: int = int(os.getenv("LIST_CACHE_MAXSIZE", "1024"))
+    BATCH_CHUNK_SIZE: int = int(os.getenv("BATCH_CHUNK_SIZE", "100"))
+    BATCH_PUBLISH_WINDOW: int = int(os.getenv("BATCH_PUBLISH_WINDOW", "8"))
+    RENDER_CACHE_MAX_BYTES: int = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    TEMPLATE_CACHE_MAX_BYTES: int = int(os.getenv("TEMPLATE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    ZIP_SPOOL_MAX_SIZE: int = int(os.getenv("ZIP_SPOOL_MAX_SIZE", str(64 * 1024 * 1024)))
+    BATCH_METADATA_FLUSH_DELAY: float = float(os.getenv("BATCH_METADATA_FLUSH_DELAY", "0.05"))
+    BATCH_PROGRESS_INTERVAL: float = float(os.getenv("BATCH_PROGRESS_INTERVAL", "0.5"))
+    BATCH_RENDER_CONCURRENCY: int = int(os.getenv("BATCH_RENDER_CONCURRENCY", "32"))
+    WORKER_PREFETCH_COUNT: int = int(os.getenv("WORKER_PREFETCH_COUNT", "2"))
+    WORKER_MAX_RETRIES: int = int(os.getenv("WORKER_MAX_RETRIES", "3"))
     MAX_UPLOAD_SIZE: int = 20 * 1024 * 1024  
+    PDF_BACKEND: str = os.getenv("PDF_BACKEND", "libreoffice")
+    LIBREOFFICE_TIMEOUT: float = float(os.getenv("LIBREOFFICE_TIMEOUT", "300"))
+    WORD_CONV_CONCURRENCY: int = int(os.getenv("WORD_CONV_CONCURRENCY", "2"))
+    DIRECT_UPLOAD_URL_EXPIRES: int = int(os.getenv("DIRECT_UPLOAD_URL_EXPIRES", "900"))
 
     class Config:
         env_file = ".env"
@@ -50,4 +76,5 @@ class Settings(BaseSettings):
 settings = Settings()
 
 os.makedirs(settings.TEMPLATES_DIR, exist_ok=True)
-os.makedirs(settings.TEMP_DIR, exist_ok=True)
\ No newline at end of file
+os.makedirs(settings.TEMP_DIR, exist_ok=True)
+os.makedirs(settings.SCRATCH_DIR, exist_ok=True)
\ No newline at end of file
@@ -0,0 +1,33 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """
+    Cấu hình logging qua QueueHandler: các coroutine/thread chỉ đẩy record vào queue,
+    việc ghi ra stdout do một thread QueueListener riêng đảm nhận nên không tranh khóa stdout.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+
+
+def setup_process_logging(level: int = logging.INFO) -> None:
+    """
+    Cấu hình logging cho tiến trình con của pool (tiến trình spawn không kế thừa cấu hình của tiến trình cha).
+    Ghi thẳng ra stderr thay vì qua QueueListener: tiến trình con kết thúc bằng os._exit nên atexit không chạy
+    và record còn trong queue sẽ bị mất.
+    """
+    logging.basicConfig(level=level, format=LOG_FORMAT, force=True)
@@ -1,4 +1,5 @@
-from .models import WordDocumentInfo as DocumentInfo, TemplateInfo, BatchProcessingInfo, DBDocument
+from .models import WordDocumentInfo as DocumentInfo, TemplateInfo, BatchProcessingInfo
+from .db_models import DBDocument
 from .exceptions import DocumentNotFoundException, TemplateNotFoundException, StorageException
 
 __all__ = [
@@ -37,6 +37,16 @@ class InvalidDocumentFormatException(BaseServiceException):
             code="invalid_document_format"
         )
 
+class FileTooLargeException(BaseServiceException):
+    """
+    Ngoại lệ khi file vượt quá kích thước tối đa cho phép.
+    """
+    def __init__(self, max_size: int):
+        super().__init__(
+            message=f"File vượt quá kích thước tối đa {max_size // (1024 * 1024)}MB",
+            code="file_too_large"
+        )
+
 class StorageException(BaseServiceException):
     """
     Ngoại lệ khi có lỗi lưu trữ.
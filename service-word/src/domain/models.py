@@ -1,34 +1,11 @@
+import json
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Union
-from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Union, TYPE_CHECKING
+from pydantic import BaseModel, ConfigDict, Field
 import uuid
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.ext.declarative import declarative_base
 
-Base = declarative_base()
-
-class DBDocument(Base):
-    __tablename__ = "documents"
-    
-    id = Column(UUID, primary_key=True, index=True, default=uuid.uuid4)
-    storage_id = Column(UUID, unique=True, index=True, nullable=False, default=uuid.uuid4)
-    document_category = Column(String, nullable=False, default="word")
-    title = Column(String, nullable=False)
-    description = Column(Text, nullable=True)
-    file_size = Column(Integer, nullable=False)
-    storage_path = Column(String, nullable=False)
-    original_filename = Column(String, nullable=False)
-    doc_metadata = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    user_id = Column(UUID, nullable=False)
-    
-    # Word-specific fields
-    page_count = Column(Integer, nullable=True)
-    file_type = Column(String, nullable=True)
-    version = Column(Integer, nullable=True, default=1)
-    checksum = Column(String, nullable=True)
+if TYPE_CHECKING:
+    from .db_models import DBDocument
 
 class WordDocumentInfo(BaseModel):
     """
@@ -60,9 +37,40 @@ class WordDocumentInfo(BaseModel):
             data['created_at'] = datetime.now()
         super().__init__(**data)
 
-    class Config:
-        arbitrary_types_allowed = True
-        from_attributes = True
+    @classmethod
+    def from_record(cls, record: "DBDocument") -> "WordDocumentInfo":
+        """
+        Tạo từ bản ghi DBDocument do chính service ghi (dữ liệu đã tin cậy) bằng model_construct,
+        bỏ qua bước validate của Pydantic trên đường đọc tài liệu/danh sách.
+        Dữ liệu từ client vẫn phải đi qua constructor thường.
+        """
+        doc_metadata = {}
+        if record.doc_metadata:
+            try:
+                doc_metadata = json.loads(record.doc_metadata)
+            except json.JSONDecodeError:
+                doc_metadata = {}
+
+        return cls.model_construct(
+            id=str(record.id),
+            storage_id=str(record.storage_id),
+            title=record.title,
+            description=record.description,
+            file_size=record.file_size,
+            page_count=record.page_count,
+            storage_path=record.storage_path,
+            original_filename=record.original_filename,
+            created_at=record.created_at,
+            updated_at=record.updated_at,
+            doc_metadata=doc_metadata,
+            user_id=str(record.user_id),
+            document_category=record.document_category,
+            file_type=record.file_type,
+            version=record.version,
+            checksum=record.checksum
+        )
+
+    model_config = ConfigDict(from_attributes=True)
 
 class TemplateInfo(BaseModel):
     """
@@ -87,9 +95,6 @@ class TemplateInfo(BaseModel):
             data['created_at'] = datetime.now()
         super().__init__(**data)
 
-    class Config:
-        arbitrary_types_allowed = True
-
 class BatchProcessingInfo(BaseModel):
     """
     Thông tin xử lý hàng loạt
@@ -113,62 +118,3 @@ class BatchProcessingInfo(BaseModel):
         if 'created_at' not in data or data['created_at'] is None:
             data['created_at'] = datetime.now()
         super().__init__(**data)
-
-    class Config:
-        arbitrary_types_allowed = True
-
-class InternshipReportModel(BaseModel):
-    """
-    Model cho báo cáo kết quả thực tập
-    """
-    department: str = Field(..., description="Tên phòng ban")
-    location: str = Field(..., description="Địa danh")
-    day: str = Field(..., description="Ngày (2 chữ số)")
-    month: str = Field(..., description="Tháng (2 chữ số)")
-    year: str = Field(..., description="Năm (4 chữ số)")
-    intern_name: str = Field(..., description="Họ tên thực tập sinh")
-    internship_duration: str = Field(..., description="Thời gian thực tập")
-    supervisor_name: str = Field(..., description="Tên người hướng dẫn")
-    ethics_evaluation: str = Field(..., description="Đánh giá phẩm chất đạo đức")
-    capacity_evaluation: str = Field(..., description="Đánh giá năng lực")
-    compliance_evaluation: str = Field(..., description="Đánh giá ý thức chấp hành")
-    group_activities: str = Field(..., description="Đánh giá hoạt động đoàn thể")
-
-class RewardReportModel(BaseModel):
-    """
-    Model cho báo cáo thưởng
-    """
-    location: str = Field(..., description="Địa danh")
-    day: str = Field(..., description="Ngày (2 chữ số)")
-    month: str = Field(..., description="Tháng (2 chữ số)")
-    year: str = Field(..., description="Năm (4 chữ số)")
-    title: str = Field(..., description="Tiêu đề báo cáo")
-    recipient: str = Field(..., description="Người nhận báo cáo")
-    approver_name: str = Field(..., description="Người ký xác nhận")
-    submitter_name: str = Field(..., description="Người làm đơn")
-
-class LaborContractModel(BaseModel):
-    """
-    Model cho hợp đồng lao động
-    """
-    contract_number: str = Field(..., description="Số hợp đồng")
-    day: str = Field(..., description="Ngày ký")
-    month: str = Field(..., description="Tháng ký")
-    year: str = Field(..., description="Năm ký")
-    representative_name: str = Field(..., description="Tên đại diện công ty")
-    position: str = Field(..., description="Chức vụ đại diện")
-    employee_name: str = Field(..., description="Tên nhân viên")
-    nationality: str = Field(..., description="Quốc tịch")
-    date_of_birth: str = Field(..., description="Ngày sinh")
-    gender: str = Field(..., description="Giới tính")
-    profession: str = Field(..., description="Nghề nghiệp")
-    permanent_address: str = Field(..., description="Địa chỉ thường trú")
-    current_address: str = Field(..., description="Địa chỉ hiện tại")
-    id_number: str = Field(..., description="Số CMND/CCCD")
-    id_issue_date: str = Field(..., description="Ngày cấp")
-    id_issue_place: str = Field(..., description="Nơi cấp")
-    job_position: str = Field(..., description="Vị trí công việc")
-    start_date: str = Field(..., description="Ngày bắt đầu")
-    end_date: str = Field(..., description="Ngày kết thúc")
-    salary: str = Field(..., description="Mức lương")
-    allowance: str = Field(..., description="Phụ cấp")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from .repository import DocumentRepository, TemplateRepository, BatchProcessingRepository
+from .repository import DocumentRepository, TemplateRepository, BatchProcessingRepository, TaskStatusRepository
 from .minio_client import MinioClient
 from .rabbitmq_client import RabbitMQClient
 
@@ -6,6 +6,7 @@ __all__ = [
     "DocumentRepository",
     "TemplateRepository",
     "BatchProcessingRepository",
+    "TaskStatusRepository",
     "MinioClient",
     "RabbitMQClient"
 ]
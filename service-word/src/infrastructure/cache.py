@@ -0,0 +1,89 @@
+from typing import Optional, Tuple
+
+from cachetools import LRUCache, TTLCache
+
+from core.config import settings
+
+_document_list_cache: TTLCache = TTLCache(
+    maxsize=settings.LIST_CACHE_MAXSIZE,
+    ttl=settings.LIST_CACHE_TTL_SECONDS
+)
+_template_list_cache: TTLCache = TTLCache(
+    maxsize=settings.LIST_CACHE_MAXSIZE,
+    ttl=settings.LIST_CACHE_TTL_SECONDS
+)
+# Nội dung file mẫu không đổi sau khi lưu (update chỉ sửa metadata), nên cache theo storage_path không cần TTL
+_template_content_cache: LRUCache = LRUCache(maxsize=settings.TEMPLATE_CACHE_MAX_BYTES, getsizeof=len)
+
+
+def _document_list_key(user_id: Optional[str], skip: int, limit: int, search: Optional[str]) -> Tuple:
+    return (str(user_id) if user_id else None, skip, limit, search)
+
+
+def get_cached_document_list(user_id: Optional[str], skip: int, limit: int, search: Optional[str]) -> Optional[bytes]:
+    """
+    Lấy JSON đã serialize của trang danh sách tài liệu từ cache trong tiến trình.
+    """
+    return _document_list_cache.get(_document_list_key(user_id, skip, limit, search))
+
+
+def cache_document_list(user_id: Optional[str], skip: int, limit: int, search: Optional[str], body: bytes) -> None:
+    """
+    Lưu JSON đã serialize của trang danh sách tài liệu vào cache.
+    """
+    _document_list_cache[_document_list_key(user_id, skip, limit, search)] = body
+
+
+def invalidate_document_lists(user_id: Optional[str] = None) -> None:
+    """
+    Xóa cache danh sách tài liệu của một user, hoặc toàn bộ nếu không truyền user_id.
+    """
+    if user_id is None:
+        _document_list_cache.clear()
+        return
+    user_id = str(user_id)
+    for key in [key for key in list(_document_list_cache.keys()) if key[0] in (user_id, None)]:
+        _document_list_cache.pop(key, None)
+
+
+def get_cached_template_list(category: Optional[str], skip: int, limit: int) -> Optional[bytes]:
+    """
+    Lấy JSON đã serialize của trang danh sách mẫu từ cache trong tiến trình.
+    """
+    return _template_list_cache.get((category, skip, limit))
+
+
+def cache_template_list(category: Optional[str], skip: int, limit: int, body: bytes) -> None:
+    """
+    Lưu JSON đã serialize của trang danh sách mẫu vào cache.
+    """
+    _template_list_cache[(category, skip, limit)] = body
+
+
+def invalidate_template_lists() -> None:
+    """
+    Xóa toàn bộ cache danh sách mẫu.
+    """
+    _template_list_cache.clear()
+
+
+def get_cached_template_content(storage_path: str) -> Optional[bytes]:
+    """
+    Lấy nội dung file mẫu từ cache trong tiến trình.
+    """
+    return _template_content_cache.get(storage_path)
+
+
+def cache_template_content(storage_path: str, content: bytes) -> None:
+    """
+    Lưu nội dung file mẫu vào cache (bỏ qua file lớn hơn dung lượng cache).
+    """
+    if len(content) <= _template_content_cache.maxsize:
+        _template_content_cache[storage_path] = content
+
+
+def invalidate_template_content(storage_path: str) -> None:
+    """
+    Xóa nội dung file mẫu khỏi cache.
+    """
+    _template_content_cache.pop(storage_path, None)
@@ -3,7 +3,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy import select, update, delete
 from sqlalchemy.future import select
 from core.config import settings
-from domain.models import DBDocument
+from domain.db_models import DBDocument
 from typing import List, Optional
 
 engine = create_async_engine(
@@ -1,8 +1,11 @@
 import io
 import os
-from typing import Optional, List, Dict, Any, Tuple
+import asyncio
+from typing import Optional, List, Dict, Any, Tuple, BinaryIO
 from minio import Minio
 from minio.error import S3Error
+import urllib3
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
 import uuid
 
@@ -15,6 +18,8 @@ class MinioClient:
     Client để làm việc với MinIO S3 Storage.
     """
 
+    UPLOAD_PART_SIZE = 8 * 1024 * 1024
+
     def __init__(self):
         """
         Khởi tạo client với các thông tin cấu hình từ settings.
@@ -24,9 +29,26 @@ class MinioClient:
                 f"{settings.MINIO_HOST}:{settings.MINIO_PORT}",
                 access_key=settings.MINIO_ACCESS_KEY,
                 secret_key=settings.MINIO_SECRET_KEY,
-                secure=False  
+                secure=False,
+                # Các lệnh MinIO chạy song song trên threadpool; pool mặc định (10 kết nối) sẽ bỏ bớt
+                # kết nối keep-alive và phải mở TCP mới cho mỗi yêu cầu vượt quá
+                http_client=urllib3.PoolManager(
+                    timeout=urllib3.Timeout(connect=5, read=300),
+                    maxsize=settings.MINIO_POOL_MAXSIZE,
+                    retries=Retry(total=3, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504])
+                )
             )
 
+            # Host nằm trong chữ ký SigV4 nên presigned URL phải được ký bằng client trỏ tới endpoint công khai.
+            # Chỉ định region để việc ký không cần gọi mạng tới endpoint đó.
+            self.public_client = Minio(
+                settings.MINIO_PUBLIC_ENDPOINT,
+                access_key=settings.MINIO_ACCESS_KEY,
+                secret_key=settings.MINIO_SECRET_KEY,
+                secure=settings.MINIO_PUBLIC_SECURE,
+                region=settings.MINIO_REGION
+            ) if settings.MINIO_PUBLIC_ENDPOINT else self.client
+
             self._ensure_bucket_exists(settings.MINIO_WORD_BUCKET)
             self._ensure_bucket_exists(settings.MINIO_TEMPLATES_BUCKET)
         except Exception as e:
@@ -57,9 +79,10 @@ class MinioClient:
             Object path trong MinIO
         """
         try:
-            object_name = f"{datetime.now().strftime('%Y-%m-%d')}/{str(uuid.uuid4())}/{filename}"
+            object_name = self.new_document_object_name(filename)
 
-            self.client.put_object(
+            await asyncio.to_thread(
+                self.client.put_object,
                 bucket_name=settings.MINIO_WORD_BUCKET,
                 object_name=object_name,
                 data=io.BytesIO(content),
@@ -72,6 +95,100 @@ class MinioClient:
         except S3Error as e:
             raise StorageException(f"Không thể upload tài liệu: {str(e)}")
 
+    async def upload_document_stream(self, stream: BinaryIO, filename: str, length: int = -1) -> str:
+        """
+        Upload tài liệu Word lên MinIO từ file-like object theo từng phần (multipart),
+        không cần đọc toàn bộ nội dung vào bộ nhớ.
+
+        Args:
+            stream: File-like object ở chế độ nhị phân (ví dụ UploadFile.file)
+            filename: Tên file gốc
+            length: Kích thước nội dung, -1 nếu không biết
+
+        Returns:
+            Object path trong MinIO
+        """
+        try:
+            object_name = self.new_document_object_name(filename)
+
+            await asyncio.to_thread(
+                self.client.put_object,
+                bucket_name=settings.MINIO_WORD_BUCKET,
+                object_name=object_name,
+                data=stream,
+                length=length,
+                part_size=self.UPLOAD_PART_SIZE,
+                content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document" if filename.endswith(
+                    ".docx") else "application/msword"
+            )
+
+            return object_name
+        except S3Error as e:
+            raise StorageException(f"Không thể upload tài liệu: {str(e)}")
+
+    def new_document_object_name(self, filename: str) -> str:
+        """
+        Sinh object path mới cho tài liệu Word theo cùng quy ước với upload_document.
+        """
+        return f"{datetime.now().strftime('%Y-%m-%d')}/{str(uuid.uuid4())}/{filename}"
+
+    async def get_presigned_upload_url(self, object_name: str, expires: int = 900) -> str:
+        """
+        Tạo URL có chữ ký để client PUT tài liệu trực tiếp lên MinIO.
+
+        Args:
+            object_name: Đường dẫn đối tượng trong MinIO
+            expires: Thời gian hết hạn (giây)
+
+        Returns:
+            URL có chữ ký
+        """
+        try:
+            return self.public_client.presigned_put_object(
+                bucket_name=settings.MINIO_WORD_BUCKET,
+                object_name=object_name,
+                expires=timedelta(seconds=expires)
+            )
+        except S3Error as e:
+            raise StorageException(f"Không thể tạo URL upload: {str(e)}")
+
+    async def stat_document(self, object_name: str) -> Optional[Any]:
+        """
+        Lấy thông tin đối tượng tài liệu Word (kích thước, content type), None nếu chưa tồn tại.
+        """
+        try:
+            return await asyncio.to_thread(
+                self.client.stat_object,
+                bucket_name=settings.MINIO_WORD_BUCKET,
+                object_name=object_name
+            )
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            raise StorageException(f"Không thể lấy thông tin tài liệu: {str(e)}")
+
+    async def read_document_head(self, object_name: str, length: int = 8) -> bytes:
+        """
+        Đọc length byte đầu của tài liệu Word (để kiểm tra chữ ký định dạng file).
+        """
+        def read_head() -> bytes:
+            response = self.client.get_object(
+                bucket_name=settings.MINIO_WORD_BUCKET,
+                object_name=object_name,
+                offset=0,
+                length=length
+            )
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+
+        try:
+            return await asyncio.to_thread(read_head)
+        except S3Error as e:
+            raise StorageException(f"Không thể đọc tài liệu: {str(e)}")
+
     async def upload_template(self, content: bytes, filename: str) -> str:
         """
         Upload mẫu tài liệu Word lên MinIO.
@@ -86,7 +203,8 @@ class MinioClient:
         try:
             object_name = f"{datetime.now().strftime('%Y-%m-%d')}/{str(uuid.uuid4())}/{filename}"
 
-            self.client.put_object(
+            await asyncio.to_thread(
+                self.client.put_object,
                 bucket_name=settings.MINIO_TEMPLATES_BUCKET,
                 object_name=object_name,
                 data=io.BytesIO(content),
@@ -110,16 +228,38 @@ class MinioClient:
             Nội dung file dưới dạng bytes
         """
         try:
-            response = self.client.get_object(
-                bucket_name=settings.MINIO_WORD_BUCKET,
-                object_name=object_name
-            )
+            return await asyncio.to_thread(self._read_object, settings.MINIO_WORD_BUCKET, object_name)
+        except S3Error as e:
+            raise StorageException(f"Không thể tải xuống tài liệu: {str(e)}")
 
-            content = response.read()
+    def _read_object(self, bucket_name: str, object_name: str) -> bytes:
+        """
+        Đọc toàn bộ đối tượng (gọi đồng bộ qua asyncio.to_thread để không chặn event loop).
+        """
+        response = self.client.get_object(bucket_name=bucket_name, object_name=object_name)
+        try:
+            return response.read()
+        finally:
             response.close()
             response.release_conn()
 
-            return content
+    async def get_document_stream(self, object_name: str):
+        """
+        Mở luồng đọc tài liệu Word từ MinIO mà không tải toàn bộ vào bộ nhớ.
+        Người gọi chịu trách nhiệm close() và release_conn() response.
+
+        Args:
+            object_name: Đường dẫn đối tượng trong MinIO
+
+        Returns:
+            HTTP response của MinIO, đọc theo từng phần qua response.stream(chunk_size)
+        """
+        try:
+            return await asyncio.to_thread(
+                self.client.get_object,
+                bucket_name=settings.MINIO_WORD_BUCKET,
+                object_name=object_name
+            )
         except S3Error as e:
             raise StorageException(f"Không thể tải xuống tài liệu: {str(e)}")
 
@@ -134,16 +274,7 @@ class MinioClient:
             Nội dung file dưới dạng bytes
         """
         try:
-            response = self.client.get_object(
-                bucket_name=settings.MINIO_TEMPLATES_BUCKET,
-                object_name=object_name
-            )
-
-            content = response.read()
-            response.close()
-            response.release_conn()
-
-            return content
+            return await asyncio.to_thread(self._read_object, settings.MINIO_TEMPLATES_BUCKET, object_name)
         except S3Error as e:
             raise StorageException(f"Không thể tải xuống mẫu tài liệu: {str(e)}")
 
@@ -155,7 +286,8 @@ class MinioClient:
             object_name: Đường dẫn đối tượng trong MinIO
         """
         try:
-            self.client.remove_object(
+            await asyncio.to_thread(
+                self.client.remove_object,
                 bucket_name=settings.MINIO_WORD_BUCKET,
                 object_name=object_name
             )
@@ -170,7 +302,8 @@ class MinioClient:
             object_name: Đường dẫn đối tượng trong MinIO
         """
         try:
-            self.client.remove_object(
+            await asyncio.to_thread(
+                self.client.remove_object,
                 bucket_name=settings.MINIO_TEMPLATES_BUCKET,
                 object_name=object_name
             )
@@ -192,7 +325,7 @@ class MinioClient:
         try:
             bucket_name = settings.MINIO_TEMPLATES_BUCKET if is_template else settings.MINIO_WORD_BUCKET
 
-            url = self.client.presigned_get_object(
+            url = self.public_client.presigned_get_object(
                 bucket_name=bucket_name,
                 object_name=object_name,
                 expires=timedelta(seconds=expires)
@@ -1,14 +1,26 @@
-import json
-import pika
-from typing import Dict, Any, Optional, Callable
+import orjson
+import msgpack
+import aio_pika
+from aio_pika.pool import Pool
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
 import asyncio
 from datetime import datetime
-import threading
 import logging
 
 from core.config import settings
 from domain.exceptions import BaseServiceException
 
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+def _decode_body(body: bytes, content_type: Optional[str]) -> Dict[str, Any]:
+    """
+    Giải mã nội dung tin nhắn theo content_type (msgpack hoặc JSON).
+    """
+    if content_type == MSGPACK_CONTENT_TYPE:
+        return msgpack.unpackb(body, raw=False)
+    return orjson.loads(body)
+
 
 class RabbitMQClient:
     """
@@ -19,118 +31,176 @@ class RabbitMQClient:
         """
         Khởi tạo client với các thông tin cấu hình từ settings.
         """
-        self.connection = None
-        self.channel = None
-        self.credentials = pika.PlainCredentials(
-            settings.RABBITMQ_USER,
-            settings.RABBITMQ_PASS
-        )
-
         self.QUEUE_CONVERT_TO_PDF = "word_service.convert_to_pdf"
         self.QUEUE_WATERMARK = "word_service.watermark"
         self.QUEUE_APPLY_TEMPLATE = "word_service.apply_template"
         self.QUEUE_BATCH_PROCESSING = "word_service.batch_processing"
+        self.QUEUE_TASKS = "word_service.tasks"
+        self.QUEUE_DEAD_LETTER = "word_service.dead_letter"
+        self._queues = (
+            self.QUEUE_CONVERT_TO_PDF,
+            self.QUEUE_WATERMARK,
+            self.QUEUE_APPLY_TEMPLATE,
+            self.QUEUE_BATCH_PROCESSING,
+            self.QUEUE_TASKS,
+            self.QUEUE_DEAD_LETTER,
+        )
 
-        self.logger = logging.getLogger("rabbitmq_client")
+        # Pool connection/channel aio-pika cho việc publish từ event loop của API
+        self._connection_pool: Optional[Pool] = None
+        self._channel_pool: Optional[Pool] = None
+        # Connection aio-pika riêng cho các consumer của worker
+        self._consumer_connection: Optional[aio_pika.abc.AbstractRobustConnection] = None
 
-    def _get_connection(self) -> pika.BlockingConnection:
-        """
-        Lấy connection đến RabbitMQ.
+        self.logger = logging.getLogger("rabbitmq_client")
 
-        Returns:
-            Connection đến RabbitMQ
-        """
-        if self.connection is None or self.connection.is_closed:
-            self.connection = pika.BlockingConnection(
-                pika.ConnectionParameters(
-                    host=settings.RABBITMQ_HOST,
-                    port=settings.RABBITMQ_PORT,
-                    virtual_host=settings.RABBITMQ_VHOST,
-                    credentials=self.credentials
-                )
-            )
+    async def _make_connection(self) -> aio_pika.abc.AbstractRobustConnection:
+        return await aio_pika.connect_robust(
+            host=settings.RABBITMQ_HOST,
+            port=settings.RABBITMQ_PORT,
+            login=settings.RABBITMQ_USER,
+            password=settings.RABBITMQ_PASS,
+            virtualhost=settings.RABBITMQ_VHOST
+        )
 
-        return self.connection
+    async def _make_channel(self) -> aio_pika.abc.AbstractChannel:
+        async with self._connection_pool.acquire() as connection:
+            channel = await connection.channel()
+            for queue in self._queues:
+                await channel.declare_queue(queue, durable=True)
+            return channel
 
-    def _get_channel(self) -> pika.channel.Channel:
+    def _get_channel_pool(self) -> Pool:
         """
-        Lấy channel từ connection.
-
-        Returns:
-            Channel để làm việc với RabbitMQ
+        Lấy pool channel aio-pika, khởi tạo lần đầu trên event loop đang chạy.
         """
-        if self.channel is None or self.channel.is_closed:
-            self.channel = self._get_connection().channel()
+        if self._channel_pool is None:
+            self._connection_pool = Pool(self._make_connection, max_size=settings.RABBITMQ_CONNECTION_POOL_SIZE)
+            self._channel_pool = Pool(self._make_channel, max_size=settings.RABBITMQ_CHANNEL_POOL_SIZE)
+        return self._channel_pool
 
-            self.channel.queue_declare(queue=self.QUEUE_CONVERT_TO_PDF, durable=True)
-            self.channel.queue_declare(queue=self.QUEUE_WATERMARK, durable=True)
-            self.channel.queue_declare(queue=self.QUEUE_APPLY_TEMPLATE, durable=True)
-            self.channel.queue_declare(queue=self.QUEUE_BATCH_PROCESSING, durable=True)
+    async def publish(self, queue: str, message: Dict[str, Any], binary: bool = False, persistent: bool = True) -> None:
+        """
+        Gửi message đến RabbitMQ qua channel lấy từ pool, không chặn event loop.
 
-        return self.channel
+        Args:
+            queue: Tên queue
+            message: Nội dung tin nhắn dưới dạng dict
+            binary: True để mã hóa bằng msgpack (cho các tin nhắn lớn), mặc định là JSON
+            persistent: False để gửi tin nhắn transient, không ghi xuống đĩa của broker
+        """
+        await self.publish_many(queue, [message], binary=binary, persistent=persistent)
 
-    def send_message(self, queue: str, message: Dict[str, Any]) -> None:
+    async def publish_many(self, queue: str, messages: List[Dict[str, Any]], binary: bool = False,
+                           persistent: bool = True) -> None:
         """
-        Gửi message đến RabbitMQ.
+        Gửi nhiều message trên cùng một channel. Các lần publish chạy đồng thời nên chỉ phải chờ
+        xác nhận (publisher confirm) của broker một lượt thay vì lần lượt từng tin nhắn.
 
         Args:
             queue: Tên queue
-            message: Nội dung tin nhắn dưới dạng dict
+            messages: Danh sách nội dung tin nhắn dưới dạng dict
+            binary: True để mã hóa bằng msgpack (cho các tin nhắn lớn), mặc định là JSON
+            persistent: False để gửi tin nhắn transient, không ghi xuống đĩa của broker
         """
+        amqp_messages = [self._build_message(message, binary, persistent) for message in messages]
         try:
-            channel = self._get_channel()
-            channel.basic_publish(
-                exchange='',
-                routing_key=queue,
-                body=json.dumps(message),
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  
-                    content_type='application/json'
+            async with self._get_channel_pool().acquire() as channel:
+                await asyncio.gather(
+                    *(channel.default_exchange.publish(amqp_message, routing_key=queue) for amqp_message in amqp_messages)
                 )
-            )
         except Exception as e:
             self.logger.error(f"Lỗi khi gửi tin nhắn đến RabbitMQ: {str(e)}")
             raise BaseServiceException(f"Lỗi khi gửi tin nhắn đến RabbitMQ: {str(e)}")
 
-    def start_consuming(self, queue: str, callback: Callable[[Dict[str, Any]], None]) -> None:
+    @staticmethod
+    def _build_message(message: Dict[str, Any], binary: bool, persistent: bool) -> aio_pika.Message:
+        if binary:
+            body = msgpack.packb(message, use_bin_type=True, default=str)
+            content_type = MSGPACK_CONTENT_TYPE
+        else:
+            body = orjson.dumps(message, default=str)
+            content_type = "application/json"
+        return aio_pika.Message(
+            body=body,
+            content_type=content_type,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT if persistent else aio_pika.DeliveryMode.NOT_PERSISTENT
+        )
+
+    async def close_pools(self) -> None:
+        """
+        Đóng các pool channel/connection aio-pika và connection của consumer.
+        """
+        if self._consumer_connection is not None:
+            await self._consumer_connection.close()
+            self._consumer_connection = None
+        if self._channel_pool is not None:
+            await self._channel_pool.close()
+            await self._connection_pool.close()
+            self._channel_pool = None
+            self._connection_pool = None
+
+    async def consume(self, queue: str, callback: Callable[[Dict[str, Any]], Awaitable[None]],
+                      prefetch_count: int = 1) -> None:
         """
-        Bắt đầu lắng nghe tin nhắn từ queue.
+        Đăng ký consumer aio-pika cho một queue trên event loop đang chạy.
+        Handler chạy trên cùng event loop với connection nên heartbeat vẫn được trả lời
+        trong lúc xử lý tác vụ dài, broker không đóng connection và giao lại tin nhắn.
 
         Args:
             queue: Tên queue
-            callback: Hàm callback xử lý tin nhắn
+            callback: Coroutine xử lý tin nhắn
+            prefetch_count: Số tin nhắn tối đa broker đẩy trước (và xử lý đồng thời) cho consumer này
         """
-
-        def _callback(ch, method, properties, body):
+        if self._consumer_connection is None:
+            self._consumer_connection = await self._make_connection()
+        channel = await self._consumer_connection.channel()
+        await channel.set_qos(prefetch_count=prefetch_count)
+        for declared_queue in self._queues:
+            await channel.declare_queue(declared_queue, durable=True)
+        amqp_queue = await channel.declare_queue(queue, durable=True)
+
+        async def on_message(amqp_message: aio_pika.abc.AbstractIncomingMessage) -> None:
             try:
-                message = json.loads(body)
-
-                callback(message)
-
-                ch.basic_ack(delivery_tag=method.delivery_tag)
+                message = _decode_body(amqp_message.body, amqp_message.content_type)
+                await callback(message)
             except Exception as e:
-                self.logger.error(f"Lỗi khi xử lý tin nhắn: {str(e)}")
-
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-
-        try:
-            channel = self._get_channel()
-            channel.basic_qos(prefetch_count=1)
-            channel.basic_consume(queue=queue, on_message_callback=_callback)
-
-            thread = threading.Thread(target=channel.start_consuming)
-            thread.daemon = True
-            thread.start()
-        except Exception as e:
-            self.logger.error(f"Lỗi khi bắt đầu consuming: {str(e)}")
-            raise BaseServiceException(f"Lỗi khi bắt đầu consuming: {str(e)}")
-
-    def close(self) -> None:
+                self.logger.error(f"Lỗi khi xử lý tin nhắn từ {queue}: {str(e)}", exc_info=True)
+                try:
+                    await self._retry_or_dead_letter(channel, queue, amqp_message, e)
+                except Exception as publish_error:
+                    self.logger.error(f"Không thể gửi lại tin nhắn lỗi từ {queue}: {str(publish_error)}")
+                    await amqp_message.nack(requeue=True)
+                    return
+            await amqp_message.ack()
+
+        await amqp_queue.consume(on_message)
+
+    async def _retry_or_dead_letter(self, channel: aio_pika.abc.AbstractChannel, queue: str,
+                                    amqp_message: aio_pika.abc.AbstractIncomingMessage, error: Exception) -> None:
         """
-        Đóng kết nối đến RabbitMQ.
+        Gửi lại tin nhắn lỗi vào cuối queue, tối đa WORKER_MAX_RETRIES lần,
+        sau đó chuyển sang dead-letter queue thay vì requeue vô hạn.
         """
-        if self.connection is not None and self.connection.is_open:
-            self.connection.close()
+        headers = dict(amqp_message.headers or {})
+        retry_count = int(headers.get("x-retry-count", 0))
+        target = queue if retry_count < settings.WORKER_MAX_RETRIES else self.QUEUE_DEAD_LETTER
+        headers.update({
+            "x-retry-count": retry_count + 1,
+            "x-original-queue": queue,
+            "x-last-error": str(error)[:1000]
+        })
+        await channel.default_exchange.publish(
+            aio_pika.Message(
+                body=amqp_message.body,
+                content_type=amqp_message.content_type,
+                headers=headers,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+            ),
+            routing_key=target
+        )
+        if target == self.QUEUE_DEAD_LETTER:
+            self.logger.error(f"Tin nhắn từ {queue} lỗi sau {retry_count + 1} lần, đã chuyển sang {target}")
 
     async def publish_convert_to_pdf_task(self, document_id: str, priority: int = 1) -> None:
         """
@@ -147,7 +217,7 @@ class RabbitMQClient:
             "timestamp": str(datetime.now())
         }
 
-        self.send_message(self.QUEUE_CONVERT_TO_PDF, message)
+        await self.publish(self.QUEUE_CONVERT_TO_PDF, message)
 
     async def publish_watermark_task(self, document_id: str, watermark_text: str, position: str,
                                      opacity: float) -> None:
@@ -169,7 +239,7 @@ class RabbitMQClient:
             "timestamp": str(datetime.now())
         }
 
-        self.send_message(self.QUEUE_WATERMARK, message)
+        await self.publish(self.QUEUE_WATERMARK, message)
 
     async def publish_apply_template_task(self, template_id: str, data: Dict[str, Any], output_format: str) -> None:
         """
@@ -188,26 +258,78 @@ class RabbitMQClient:
             "timestamp": str(datetime.now())
         }
 
-        self.send_message(self.QUEUE_APPLY_TEMPLATE, message)
+        await self.publish(self.QUEUE_APPLY_TEMPLATE, message)
 
-    async def publish_batch_processing_task(self, task_id: str, template_id: str, data_list: Dict[str, Any],
-                                            output_format: str) -> None:
+    async def publish_task(self, task_id: str, task_type: str, payload: Dict[str, Any]) -> None:
         """
-        Đăng tác vụ xử lý hàng loạt.
+        Đăng tác vụ nặng (convert_to_pdf, watermark, apply_template) cho worker xử lý.
 
         Args:
             task_id: ID của tác vụ
-            template_id: ID của mẫu tài liệu
-            data_list: Danh sách dữ liệu áp dụng vào mẫu
-            output_format: Định dạng đầu ra (docx, pdf, zip)
+            task_type: Loại tác vụ
+            payload: Tham số của tác vụ
         """
         message = {
+            **payload,
             "task_id": task_id,
-            "template_id": template_id,
-            "data_list": data_list,
-            "output_format": output_format,
-            "task_type": "batch_processing",
+            "task_type": task_type,
             "timestamp": str(datetime.now())
         }
 
-        self.send_message(self.QUEUE_BATCH_PROCESSING, message)
\ No newline at end of file
+        await self.publish(self.QUEUE_TASKS, message)
+
+    async def publish_batch_processing_task(self, task_id: str, template_id: str, data_list: List[Dict[str, Any]],
+                                            output_format: str, start_index: int = 0,
+                                            original_data_filename: str = "", user_id: Optional[str] = None,
+                                            total_files: Optional[int] = None) -> None:
+        """
+        Đăng một nhóm dòng dữ liệu của tác vụ xử lý hàng loạt.
+
+        Args:
+            task_id: ID của tác vụ
+            template_id: ID của mẫu tài liệu
+            data_list: Các dòng dữ liệu của nhóm
+            output_format: Định dạng đầu ra (docx, pdf, zip)
+            start_index: Vị trí dòng đầu tiên của nhóm trong file dữ liệu
+            original_data_filename: Tên file dữ liệu gốc
+            user_id: ID của người dùng
+            total_files: Tổng số dòng của batch, để worker biết khi nào batch hoàn tất
+        """
+        await self.publish_batch_processing_tasks(
+            task_id, template_id, [(start_index, data_list)], output_format, original_data_filename, user_id, total_files
+        )
+
+    async def publish_batch_processing_tasks(self, task_id: str, template_id: str,
+                                             chunks: List[Tuple[int, List[Dict[str, Any]]]], output_format: str,
+                                             original_data_filename: str = "", user_id: Optional[str] = None,
+                                             total_files: Optional[int] = None) -> None:
+        """
+        Đăng nhiều nhóm dòng dữ liệu của tác vụ xử lý hàng loạt trong một lượt publish.
+
+        Args:
+            task_id: ID của tác vụ
+            template_id: ID của mẫu tài liệu
+            chunks: Danh sách (vị trí dòng đầu tiên của nhóm, các dòng dữ liệu của nhóm)
+            output_format: Định dạng đầu ra (docx, pdf, zip)
+            original_data_filename: Tên file dữ liệu gốc
+            user_id: ID của người dùng
+            total_files: Tổng số dòng của batch, để worker biết khi nào batch hoàn tất
+        """
+        timestamp = str(datetime.now())
+        messages = [
+            {
+                "task_id": task_id,
+                "template_id": template_id,
+                "data_list": data_list,
+                "output_format": output_format,
+                "start_index": start_index,
+                "original_data_filename": original_data_filename,
+                "user_id": user_id,
+                "total_files": total_files,
+                "task_type": "batch_processing",
+                "timestamp": timestamp
+            }
+            for start_index, data_list in chunks
+        ]
+
+        await self.publish_many(self.QUEUE_BATCH_PROCESSING, messages, binary=True)
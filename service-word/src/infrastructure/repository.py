@@ -1,21 +1,130 @@
 import os
 import json
-from typing import List, Dict, Any, Optional, Tuple
+import fcntl
+import asyncio
+import orjson
+import msgpack
+from pathlib import Path
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Union, BinaryIO
 from datetime import datetime
 import uuid
+import shutil
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, and_, func
 
-from domain.models import WordDocumentInfo as DocumentInfo, TemplateInfo, BatchProcessingInfo, DBDocument
+from domain.models import WordDocumentInfo as DocumentInfo, TemplateInfo, BatchProcessingInfo
+from domain.db_models import DBDocument
 from domain.exceptions import DocumentNotFoundException, TemplateNotFoundException, StorageException
 from infrastructure.minio_client import MinioClient
+from infrastructure.cache import (
+    invalidate_document_lists, invalidate_template_lists,
+    get_cached_template_content, cache_template_content, invalidate_template_content
+)
 from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Chỉ compact log metadata khi số bản ghi vượt 2 lần số entry (và tối thiểu mức này)
+_METADATA_COMPACT_MIN_ENTRIES = 64
+
+
+def _read_metadata_file(path: str, legacy_json_path: str) -> Optional[Any]:
+    """
+    Đọc file metadata msgpack; nếu chưa có thì đọc file JSON cũ (trước khi chuyển sang msgpack).
+    """
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return msgpack.unpackb(f.read(), raw=False)
+    if os.path.exists(legacy_json_path):
+        with open(legacy_json_path, 'rb') as f:
+            return orjson.loads(f.read())
+    return None
+
+
+def _write_metadata_file(path: str, data: Any) -> None:
+    """
+    Ghi file metadata dạng msgpack (datetime ghi thành chuỗi, được parse lại khi tải).
+    Ghi ra file tạm rồi rename để process khác không đọc phải file ghi dở.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(msgpack.packb(data, use_bin_type=True, default=str))
+    os.replace(temp_path, path)
+
+
+@contextmanager
+def _metadata_log_lock(log_path: str, exclusive: bool):
+    """
+    Mở file log metadata và khóa bằng flock (API và worker cùng ghi vào TEMP_DIR).
+    """
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'a+b') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield f
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_metadata_entries(path: str, legacy_json_path: str, log: BinaryIO, key_field: str) -> Tuple[Dict[str, Any], int]:
+    """
+    Đọc snapshot metadata rồi replay các bản ghi {op, id, payload} trong log.
+    Trả về (entries, số bản ghi đã replay).
+    """
+    snapshot = _read_metadata_file(path, legacy_json_path)
+    if snapshot is None:
+        entries = {}
+    elif isinstance(snapshot, list):
+        entries = {item[key_field]: item for item in snapshot}
+    else:
+        entries = dict(snapshot)
+
+    log.seek(0)
+    record_count = 0
+    for record in msgpack.Unpacker(log, raw=False):
+        record_count += 1
+        if record.get("op") == "delete":
+            entries.pop(record["id"], None)
+        else:
+            entries[record["id"]] = record.get("payload")
+    return entries, record_count
+
+
+def _load_metadata_entries(path: str, legacy_json_path: str, log_path: str, key_field: str) -> Tuple[Dict[str, Any], int]:
+    """
+    Tải metadata (snapshot + log) dưới shared lock để không đọc xen giữa lúc compact.
+    """
+    with _metadata_log_lock(log_path, exclusive=False) as log:
+        return _read_metadata_entries(path, legacy_json_path, log, key_field)
+
+
+def _append_metadata_records(log_path: str, records: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> None:
+    """
+    Ghi thêm các bản ghi thay đổi (op, id, payload) vào cuối log bằng một lần write(), không ghi lại toàn bộ file.
+    """
+    data = b"".join(
+        msgpack.packb({"op": op, "id": entry_id, "payload": payload}, use_bin_type=True, default=str)
+        for op, entry_id, payload in records
+    )
+    with _metadata_log_lock(log_path, exclusive=True) as log:
+        log.write(data)
+
+
+def _compact_metadata(path: str, legacy_json_path: str, log_path: str, key_field: str, as_list: bool) -> int:
+    """
+    Gộp snapshot + log thành snapshot mới rồi làm rỗng log. Trả về số entry sau khi gộp.
+    """
+    with _metadata_log_lock(log_path, exclusive=True) as log:
+        entries, _ = _read_metadata_entries(path, legacy_json_path, log, key_field)
+        _write_metadata_file(path, list(entries.values()) if as_list else entries)
+        log.truncate(0)
+    return len(entries)
+
 class DocumentRepository:
     """
     Repository để làm việc với tài liệu Word sử dụng bảng documents chung
@@ -25,32 +134,45 @@ class DocumentRepository:
         self.minio_client = minio_client
         self.async_session_factory = db_session_factory
 
-    async def save(self, document_info: DocumentInfo, content: bytes) -> DocumentInfo:
+    async def save(self, document_info: DocumentInfo, content: Union[bytes, BinaryIO, None]) -> DocumentInfo:
         """
-        Lưu tài liệu Word vào MinIO và metadata vào bảng documents
+        Lưu tài liệu Word vào MinIO và metadata vào bảng documents.
+        content có thể là bytes hoặc file-like object (được upload theo từng phần).
+        content là None khi client đã upload trực tiếp lên MinIO qua presigned URL:
+        khi đó document_info phải có sẵn id, storage_path và file_size.
         """
         async with self.async_session_factory() as session:
             async with session.begin():
                 try:
                     # Tạo các ID và paths
-                    doc_id = str(uuid.uuid4())
+                    doc_id = document_info.id if content is None else str(uuid.uuid4())
                     storage_id = str(uuid.uuid4())
                     document_info.id = doc_id
                     document_info.storage_id = storage_id
                     document_info.document_category = "word"
                     
-                    # Tạo storage path
-                    object_name = f"word/{storage_id}/{document_info.original_filename}"
+                    # Upload lên MinIO, dùng đúng object path mà MinIO trả về
+                    if content is None:
+                        file_size = document_info.file_size
+                        object_name = document_info.storage_path
+                    elif isinstance(content, bytes):
+                        file_size = len(content)
+                        object_name = await self.minio_client.upload_document(
+                            content=content,
+                            filename=document_info.original_filename
+                        )
+                    else:
+                        file_size = content.seek(0, os.SEEK_END)
+                        content.seek(0)
+                        object_name = await self.minio_client.upload_document_stream(
+                            stream=content,
+                            filename=document_info.original_filename,
+                            length=file_size
+                        )
                     document_info.storage_path = object_name
                     
-                    # Upload lên MinIO
-                    await self.minio_client.upload_document(
-                        content=content,
-                        filename=document_info.original_filename
-                    )
-                    
                     # Cập nhật thông tin file
-                    document_info.file_size = len(content)
+                    document_info.file_size = file_size
                     if not document_info.file_type:
                         document_info.file_type = (
                             "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
@@ -106,6 +228,7 @@ class DocumentRepository:
                     document_info.created_at = db_document.created_at
                     document_info.updated_at = db_document.updated_at
                     
+                    invalidate_document_lists(document_info.user_id)
                     return document_info
                     
                 except Exception as e:
@@ -116,6 +239,22 @@ class DocumentRepository:
         """
         Lấy tài liệu Word từ database và MinIO
         """
+        document_info = await self.get_info(document_id, user_id_check=user_id_check)
+        if not document_info:
+            return None, None
+
+        # Download content từ MinIO
+        try:
+            content = await self.minio_client.download_document(document_info.storage_path)
+            return document_info, content
+        except Exception as minio_e:
+            logger.error(f"Lỗi MinIO khi tải {document_info.storage_path}: {minio_e}", exc_info=True)
+            return None, None
+
+    async def get_info(self, document_id: str, user_id_check: Optional[str] = None) -> Optional[DocumentInfo]:
+        """
+        Lấy metadata tài liệu Word từ database (không tải nội dung từ MinIO)
+        """
         async with self.async_session_factory() as session:
             try:
                 # Build query using SQLAlchemy ORM
@@ -131,49 +270,13 @@ class DocumentRepository:
                 record = result.scalar_one_or_none()
                 
                 if not record:
-                    return None, None
-                
-                # Parse metadata
-                doc_metadata = {}
-                if record.doc_metadata:
-                    try:
-                        doc_metadata = json.loads(record.doc_metadata)
-                    except json.JSONDecodeError:
-                        doc_metadata = {}
-                
-                # Create DocumentInfo object
-                doc_data = {
-                    'id': str(record.id),
-                    'storage_id': str(record.storage_id),
-                    'title': record.title,
-                    'description': record.description,
-                    'file_size': record.file_size,
-                    'page_count': record.page_count,
-                    'storage_path': record.storage_path,
-                    'original_filename': record.original_filename,
-                    'created_at': record.created_at,
-                    'updated_at': record.updated_at,
-                    'doc_metadata': doc_metadata,
-                    'user_id': str(record.user_id),
-                    'document_category': record.document_category,
-                    'file_type': record.file_type,
-                    'version': record.version,
-                    'checksum': record.checksum
-                }
+                    return None
                 
-                document_info = DocumentInfo(**doc_data)
-                
-                # Download content từ MinIO
-                try:
-                    content = await self.minio_client.download_document(document_info.storage_path)
-                    return document_info, content
-                except Exception as minio_e:
-                    logger.error(f"Lỗi MinIO khi tải {document_info.storage_path}: {minio_e}")
-                    raise StorageException(f"Không thể tải nội dung tài liệu: {str(minio_e)}")
+                return DocumentInfo.from_record(record)
                     
             except Exception as e:
                 logger.error(f"Lỗi khi lấy tài liệu {document_id}: {e}", exc_info=True)
-                return None, None
+                return None
 
     async def list(self, skip: int = 0, limit: int = 10, search: Optional[str] = None, user_id: Optional[str] = None) -> Tuple[List[DocumentInfo], int]:
         """
@@ -196,48 +299,26 @@ class DocumentRepository:
                         (func.lower(DBDocument.description).like(search_term))
                     )
                 
-                # Count query
-                count_query = select(func.count()).select_from(query.subquery())
-                count_result = await session.execute(count_query)
-                total_count = count_result.scalar() or 0
+                # Lấy trang và tổng số bản ghi trong một truy vấn (COUNT(*) OVER ())
+                list_query = (
+                    query.add_columns(func.count().over().label("total_count"))
+                    .order_by(DBDocument.created_at.desc())
+                    .offset(skip)
+                    .limit(limit)
+                )
+                rows = (await session.execute(list_query)).all()
+                records = [row[0] for row in rows]
                 
-                # List query with pagination
-                list_query = query.order_by(DBDocument.created_at.desc()).offset(skip).limit(limit)
-                result = await session.execute(list_query)
-                records = result.scalars().all()
+                if rows:
+                    total_count = rows[0].total_count
+                elif skip > 0:
+                    # Trang nằm ngoài phạm vi, cần đếm riêng
+                    count_query = select(func.count()).select_from(query.subquery())
+                    total_count = (await session.execute(count_query)).scalar() or 0
+                else:
+                    total_count = 0
                 
-                # Convert records to DocumentInfo objects
-                documents = []
-                for record in records:
-                    # Parse metadata
-                    doc_metadata = {}
-                    if record.doc_metadata:
-                        try:
-                            doc_metadata = json.loads(record.doc_metadata)
-                        except json.JSONDecodeError:
-                            doc_metadata = {}
-                    
-                    # Create DocumentInfo
-                    doc_data = {
-                        'id': str(record.id),
-                        'storage_id': str(record.storage_id),
-                        'title': record.title,
-                        'description': record.description,
-                        'file_size': record.file_size,
-                        'page_count': record.page_count,
-                        'storage_path': record.storage_path,
-                        'original_filename': record.original_filename,
-                        'created_at': record.created_at,
-                        'updated_at': record.updated_at,
-                        'doc_metadata': doc_metadata,
-                        'user_id': str(record.user_id),
-                        'document_category': record.document_category,
-                        'file_type': record.file_type,
-                        'version': record.version,
-                        'checksum': record.checksum
-                    }
-                    
-                    documents.append(DocumentInfo(**doc_data))
+                documents = [DocumentInfo.from_record(record) for record in records]
                 
                 return documents, total_count
                 
@@ -281,6 +362,7 @@ class DocumentRepository:
                     if result.rowcount == 0:
                         raise DocumentNotFoundException(f"Tài liệu {document_info.id} không tìm thấy hoặc không có quyền cập nhật.")
                     
+                    invalidate_document_lists(user_id_check)
                     return document_info
                     
                 except DocumentNotFoundException:
@@ -334,6 +416,8 @@ class DocumentRepository:
                         except Exception as minio_e:
                             logger.error(f"Lỗi khi xóa file từ MinIO {storage_path}: {minio_e}")
                     
+                    invalidate_document_lists(str(record.user_id))
+                    
                 except DocumentNotFoundException:
                     raise
                 except Exception as e:
@@ -349,47 +433,49 @@ class TemplateRepository:
         self.minio_client = minio_client
         self.templates_dir = settings.TEMPLATES_DIR 
         os.makedirs(self.templates_dir, exist_ok=True)
-        self.metadata_file = os.path.join(self.templates_dir, "word_templates_metadata.json")
+        self.metadata_file = os.path.join(self.templates_dir, "word_templates_metadata.msgpack")
+        self._legacy_metadata_file = os.path.join(self.templates_dir, "word_templates_metadata.json")
+        self.metadata_log_file = os.path.join(self.templates_dir, "word_templates_metadata.log")
         self._templates_metadata: List[TemplateInfo] = []
+        self._log_records = 0
         self._load_metadata()
 
     def _load_metadata(self) -> None:
         """
-        Tải metadata của templates từ file
+        Tải metadata của templates từ snapshot và log thay đổi
         """
         try:
-            if os.path.exists(self.metadata_file):
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    raw_list = json.load(f)
-                    self._templates_metadata = [TemplateInfo(**data) for data in raw_list]
-            else:
-                self._templates_metadata = []
+            entries, self._log_records = _load_metadata_entries(
+                self.metadata_file, self._legacy_metadata_file, self.metadata_log_file, "template_id"
+            )
+            self._templates_metadata = [TemplateInfo(**data) for data in entries.values()]
         except Exception as e:
             logger.error(f"Lỗi khi tải metadata templates: {e}", exc_info=True)
             self._templates_metadata = []
 
-    def _save_metadata(self) -> None:
+    def _append_record(self, op: str, template_id: str, payload: Optional[Dict[str, Any]] = None) -> None:
         """
-        Lưu metadata của templates vào file
+        Ghi một thay đổi metadata templates vào log, compact khi log quá dài
         """
         try:
-            os.makedirs(os.path.dirname(self.metadata_file), exist_ok=True)
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                serialized_data = []
-                for template in self._templates_metadata:
-                    template_dict = template.dict()
-                    # Convert datetime to ISO format
-                    if template_dict.get('created_at'):
-                        template_dict['created_at'] = template_dict['created_at'].isoformat()
-                    if template_dict.get('updated_at'):
-                        template_dict['updated_at'] = template_dict['updated_at'].isoformat()
-                    serialized_data.append(template_dict)
-                
-                json.dump(serialized_data, f, ensure_ascii=False, indent=4)
+            _append_metadata_records(self.metadata_log_file, [(op, template_id, payload)])
+            self._log_records += 1
+            invalidate_template_lists()
+            if self._log_records > 2 * max(len(self._templates_metadata), _METADATA_COMPACT_MIN_ENTRIES):
+                self._compact()
         except Exception as e:
             logger.error(f"Lỗi khi lưu metadata templates: {e}", exc_info=True)
             raise StorageException(f"Không thể lưu metadata templates: {str(e)}")
 
+    def _compact(self) -> None:
+        """
+        Ghi lại snapshot metadata templates và làm rỗng log
+        """
+        _compact_metadata(
+            self.metadata_file, self._legacy_metadata_file, self.metadata_log_file, "template_id", as_list=True
+        )
+        self._log_records = 0
+
     async def save(self, template_info: TemplateInfo, content: bytes) -> TemplateInfo:
         """
         Lưu template mới
@@ -405,8 +491,7 @@ class TemplateRepository:
             
             # Lưu file
             template_file_path = os.path.join(template_dir, template_info.original_filename)
-            with open(template_file_path, 'wb') as f:
-                f.write(content)
+            await asyncio.to_thread(Path(template_file_path).write_bytes, content)
             
             # Cập nhật thông tin
             template_info.storage_path = template_file_path
@@ -416,7 +501,7 @@ class TemplateRepository:
             
             # Lưu metadata
             self._templates_metadata.append(template_info)
-            self._save_metadata()
+            self._append_record("put", template_info.template_id, template_info.model_dump())
             
             return template_info
             
@@ -435,12 +520,16 @@ class TemplateRepository:
             if not template:
                 return None, None
             
+            content = get_cached_template_content(template.storage_path) if template.storage_path else None
+            if content is not None:
+                return template, content
+            
             if not template.storage_path or not os.path.exists(template.storage_path):
                 logger.error(f"Template file không tồn tại: {template.storage_path}")
                 return template, None
             
-            with open(template.storage_path, 'rb') as f:
-                content = f.read()
+            content = await asyncio.to_thread(Path(template.storage_path).read_bytes)
+            cache_template_content(template.storage_path, content)
             
             return template, content
             
@@ -492,7 +581,7 @@ class TemplateRepository:
             current_template.updated_at = datetime.now()
             
             self._templates_metadata[index] = current_template
-            self._save_metadata()
+            self._append_record("put", current_template.template_id, current_template.model_dump())
             
             return current_template
             
@@ -520,15 +609,16 @@ class TemplateRepository:
                 raise TemplateNotFoundException(template_id)
             
             # Xóa file và thư mục
+            if template.storage_path:
+                invalidate_template_content(template.storage_path)
             if template.storage_path and os.path.exists(template.storage_path):
                 template_dir = os.path.dirname(template.storage_path)
                 if os.path.exists(template_dir):
-                    import shutil
                     shutil.rmtree(template_dir, ignore_errors=True)
             
             # Xóa khỏi metadata
             del self._templates_metadata[index]
-            self._save_metadata()
+            self._append_record("delete", template_id)
             
         except TemplateNotFoundException:
             raise
@@ -544,57 +634,87 @@ class BatchProcessingRepository:
     def __init__(self):
         self.batches_dir = os.path.join(settings.TEMP_DIR, "word_batches")
         os.makedirs(self.batches_dir, exist_ok=True)
-        self.metadata_file = os.path.join(self.batches_dir, "_batch_metadata.json")
+        self.metadata_file = os.path.join(self.batches_dir, "_batch_metadata.msgpack")
+        self._legacy_metadata_file = os.path.join(self.batches_dir, "_batch_metadata.json")
+        self.metadata_log_file = os.path.join(self.batches_dir, "_batch_metadata.log")
         self._batch_metadata: Dict[str, BatchProcessingInfo] = {}
+        self._log_records = 0
+        # Các thay đổi chưa ghi xuống log, gộp theo task_id để một loạt update chỉ ghi một lần
+        self._pending_records: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
         self._load_metadata()
 
     def _load_metadata(self) -> None:
         """
-        Tải metadata của batch processing
+        Tải metadata của batch processing từ snapshot và log thay đổi
         """
         try:
-            if os.path.exists(self.metadata_file):
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    raw_dict = json.load(f)
-                    for task_id, data in raw_dict.items():
-                        # Convert datetime strings back to datetime objects
-                        if data.get('created_at') and isinstance(data['created_at'], str):
-                            data['created_at'] = datetime.fromisoformat(data['created_at'])
-                        if data.get('updated_at') and isinstance(data['updated_at'], str):
-                            data['updated_at'] = datetime.fromisoformat(data['updated_at'])
-                        
-                        self._batch_metadata[task_id] = BatchProcessingInfo(**data)
-            else:
-                self._batch_metadata = {}
+            entries, self._log_records = _load_metadata_entries(
+                self.metadata_file, self._legacy_metadata_file, self.metadata_log_file, "task_id"
+            )
+            batch_metadata = {}
+            for task_id, data in entries.items():
+                # Convert datetime strings back to datetime objects
+                if data.get('created_at') and isinstance(data['created_at'], str):
+                    data['created_at'] = datetime.fromisoformat(data['created_at'])
+                if data.get('updated_at') and isinstance(data['updated_at'], str):
+                    data['updated_at'] = datetime.fromisoformat(data['updated_at'])
+                
+                batch_metadata[task_id] = BatchProcessingInfo(**data)
+            self._batch_metadata = batch_metadata
         except Exception as e:
             logger.error(f"Lỗi khi tải metadata batch processing: {e}", exc_info=True)
             self._batch_metadata = {}
 
-    def _save_metadata(self) -> None:
+    def _append_records(self, records: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> None:
         """
-        Lưu metadata của batch processing
+        Ghi các thay đổi metadata batch processing vào log, compact khi log quá dài
         """
         try:
-            os.makedirs(os.path.dirname(self.metadata_file), exist_ok=True)
-            serializable_metadata = {}
-            
-            for task_id, batch_info in self._batch_metadata.items():
-                batch_dict = batch_info.dict()
-                # Convert datetime to ISO format
-                if batch_dict.get('created_at'):
-                    batch_dict['created_at'] = batch_dict['created_at'].isoformat()
-                if batch_dict.get('updated_at'):
-                    batch_dict['updated_at'] = batch_dict['updated_at'].isoformat()
-                
-                serializable_metadata[task_id] = batch_dict
-            
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(serializable_metadata, f, ensure_ascii=False, indent=4)
-                
+            _append_metadata_records(self.metadata_log_file, records)
+            self._log_records += len(records)
+            if self._log_records > 2 * max(len(self._batch_metadata), _METADATA_COMPACT_MIN_ENTRIES):
+                self._compact()
         except Exception as e:
             logger.error(f"Lỗi khi lưu metadata batch processing: {e}", exc_info=True)
             raise StorageException(f"Không thể lưu metadata batch processing: {str(e)}")
 
+    def _schedule_flush(self) -> None:
+        """
+        Đánh dấu có thay đổi và hẹn một lần ghi gộp sau BATCH_METADATA_FLUSH_DELAY giây
+        """
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush(settings.BATCH_METADATA_FLUSH_DELAY))
+
+    async def _delayed_flush(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await self.flush()
+        except StorageException:
+            pass  # Đã log trong _append_records
+
+    async def flush(self) -> None:
+        """
+        Ghi ngay các thay đổi đang chờ xuống log (gọi trước khi nạp lại từ đĩa và khi shutdown)
+        """
+        async with self._flush_lock:
+            if not self._pending_records:
+                return
+            records = [(op, task_id, payload) for task_id, (op, payload) in self._pending_records.items()]
+            self._pending_records = {}
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._append_records, records)
+
+    def _compact(self) -> None:
+        """
+        Ghi lại snapshot metadata batch processing và làm rỗng log
+        """
+        _compact_metadata(
+            self.metadata_file, self._legacy_metadata_file, self.metadata_log_file, "task_id", as_list=False
+        )
+        self._log_records = 0
+
     async def save(self, batch_info: BatchProcessingInfo) -> BatchProcessingInfo:
         """
         Lưu thông tin batch processing
@@ -608,7 +728,8 @@ class BatchProcessingRepository:
             batch_info.updated_at = batch_info.updated_at or now
             
             self._batch_metadata[batch_info.task_id] = batch_info
-            self._save_metadata()
+            self._pending_records[batch_info.task_id] = ("put", batch_info.model_dump())
+            self._schedule_flush()
             
             return batch_info
             
@@ -621,23 +742,42 @@ class BatchProcessingRepository:
         Lấy thông tin batch processing
         """
         try:
+            await self.flush()
             self._load_metadata()
-            return self._batch_metadata.get(batch_id)
+            batch_info = self._batch_metadata.get(batch_id)
+            if batch_info and batch_info.status == "PROCESSING":
+                # Tiến độ của batch đang chạy trên worker nằm trong kết quả từng nhóm
+                progress = await asyncio.to_thread(self._read_chunk_progress, batch_id)
+                if progress is not None:
+                    batch_info.processed_files, batch_info.errors = progress
+            return batch_info
         except Exception as e:
             logger.error(f"Lỗi khi lấy batch processing {batch_id}: {e}", exc_info=True)
             return None
 
+    async def _is_known(self, task_id: str) -> bool:
+        """
+        Kiểm tra batch có trong bộ nhớ (kể cả thay đổi chưa ghi); chỉ khi không có mới ghi các thay đổi
+        đang chờ và nạp lại từ đĩa, cho batch do process khác tạo.
+        """
+        if task_id in self._batch_metadata:
+            return True
+        await self.flush()
+        self._load_metadata()
+        return task_id in self._batch_metadata
+
     async def update(self, batch_info: BatchProcessingInfo) -> BatchProcessingInfo:
         """
         Cập nhật thông tin batch processing
         """
         try:
-            if not batch_info.task_id or batch_info.task_id not in self._batch_metadata:
+            if not batch_info.task_id or not await self._is_known(batch_info.task_id):
                 raise DocumentNotFoundException(f"Batch task with ID '{batch_info.task_id}' not found.")
             
             batch_info.updated_at = datetime.now()
             self._batch_metadata[batch_info.task_id] = batch_info
-            self._save_metadata()
+            self._pending_records[batch_info.task_id] = ("put", batch_info.model_dump())
+            self._schedule_flush()
             
             return batch_info
             
@@ -652,9 +792,11 @@ class BatchProcessingRepository:
         Xóa thông tin batch processing
         """
         try:
-            if batch_id in self._batch_metadata:
+            if await self._is_known(batch_id):
                 del self._batch_metadata[batch_id]
-                self._save_metadata()
+                self._pending_records[batch_id] = ("delete", None)
+                self._schedule_flush()
+                await asyncio.to_thread(shutil.rmtree, self._progress_dir(batch_id), ignore_errors=True)
             else:
                 raise DocumentNotFoundException(f"Batch task with ID '{batch_id}' not found.")
                 
@@ -662,4 +804,122 @@ class BatchProcessingRepository:
             raise
         except Exception as e:
             logger.error(f"Lỗi khi xóa batch processing {batch_id}: {e}", exc_info=True)
-            raise StorageException(f"Không thể xóa batch processing: {str(e)}")
\ No newline at end of file
+            raise StorageException(f"Không thể xóa batch processing: {str(e)}")
+
+    def _progress_dir(self, task_id: str) -> str:
+        return os.path.join(self.batches_dir, task_id)
+
+    async def record_chunk_result(self, task_id: str, start_index: int, processed_files: int,
+                                  errors: List[str]) -> Tuple[int, List[str]]:
+        """
+        Ghi kết quả của một nhóm dòng vào file riêng theo start_index rồi trả về tổng
+        (processed_files, errors) của các nhóm đã xong. Nhóm được giao lại chỉ ghi đè đúng file của nó
+        nên không bị đếm hai lần, và các worker khác nhau không ghi đè số liệu của nhau.
+        """
+        return await asyncio.to_thread(self._record_chunk_result, task_id, start_index, processed_files, errors)
+
+    def _record_chunk_result(self, task_id: str, start_index: int, processed_files: int,
+                             errors: List[str]) -> Tuple[int, List[str]]:
+        _write_metadata_file(
+            os.path.join(self._progress_dir(task_id), f"chunk_{start_index}.msgpack"),
+            {"processed_files": processed_files, "errors": errors}
+        )
+        return self._read_chunk_progress(task_id)
+
+    def _read_chunk_progress(self, task_id: str) -> Optional[Tuple[int, List[str]]]:
+        """
+        Cộng kết quả các nhóm đã ghi của batch, lỗi sắp theo thứ tự dòng. None nếu chưa có nhóm nào.
+        """
+        progress_dir = self._progress_dir(task_id)
+        if not os.path.isdir(progress_dir):
+            return None
+        chunks = []
+        for name in os.listdir(progress_dir):
+            if name.startswith("chunk_") and name.endswith(".msgpack"):
+                with open(os.path.join(progress_dir, name), 'rb') as f:
+                    chunks.append((int(name[len("chunk_"):-len(".msgpack")]), msgpack.unpackb(f.read(), raw=False)))
+        if not chunks:
+            return None
+        chunks.sort(key=lambda chunk: chunk[0])
+        processed_files = sum(result["processed_files"] for _, result in chunks)
+        errors = [error for _, result in chunks for error in result["errors"]]
+        return processed_files, errors
+
+    async def claim_finalization(self, task_id: str) -> bool:
+        """
+        Giành quyền hoàn tất batch (tạo file đánh dấu với O_EXCL), chỉ một worker nhận True.
+        """
+        marker_path = os.path.join(self._progress_dir(task_id), "_finalized")
+        try:
+            os.close(os.open(marker_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    async def is_finalized(self, task_id: str) -> bool:
+        """
+        Batch đang/đã hoàn tất: còn file đánh dấu, hoặc bản ghi batch không còn PROCESSING
+        (thư mục tiến độ đã được dọn sau khi trạng thái cuối được ghi xuống đĩa).
+        """
+        if os.path.exists(os.path.join(self._progress_dir(task_id), "_finalized")):
+            return True
+        await self.flush()
+        self._load_metadata()
+        batch_info = self._batch_metadata.get(task_id)
+        return batch_info is None or batch_info.status != "PROCESSING"
+
+    async def clear_progress(self, task_id: str) -> None:
+        """
+        Xóa thư mục tiến độ của batch (kết quả từng nhóm và file đánh dấu) sau khi trạng thái cuối đã được cập nhật.
+        Ghi metadata đang chờ xuống đĩa trước, để worker khác nhận nhóm giao lại thấy batch đã hoàn tất.
+        """
+        await self.flush()
+        await asyncio.to_thread(shutil.rmtree, self._progress_dir(task_id), ignore_errors=True)
+
+class TaskStatusRepository:
+    """
+    Repository lưu trạng thái các tác vụ bất đồng bộ (convert, watermark, apply template).
+    Mỗi task là một file JSON riêng trong TEMP_DIR để API và worker có thể dùng chung.
+    """
+
+    def __init__(self):
+        self.tasks_dir = os.path.join(settings.TEMP_DIR, "word_tasks")
+        os.makedirs(self.tasks_dir, exist_ok=True)
+
+    def _task_path(self, task_id: str) -> str:
+        return os.path.join(self.tasks_dir, f"{task_id}.json")
+
+    def _write_status(self, task_id: str, task_status: Dict[str, Any]) -> None:
+        temp_path = f"{self._task_path(task_id)}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(orjson.dumps(task_status, default=str))
+        os.replace(temp_path, self._task_path(task_id))
+
+    def _read_status(self, task_id: str) -> Dict[str, Any]:
+        with open(self._task_path(task_id), 'rb') as f:
+            return orjson.loads(f.read())
+
+    async def save(self, task_id: str, task_status: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ghi trạng thái task (ghi file tạm rồi rename để tránh đọc phải file ghi dở)
+        """
+        try:
+            task_status["task_id"] = task_id
+            task_status["updated_at"] = datetime.now().isoformat()
+            await asyncio.to_thread(self._write_status, task_id, task_status)
+            return task_status
+        except Exception as e:
+            logger.error(f"Lỗi khi lưu trạng thái task {task_id}: {e}", exc_info=True)
+            raise StorageException(f"Không thể lưu trạng thái task: {str(e)}")
+
+    async def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lấy trạng thái task
+        """
+        try:
+            return await asyncio.to_thread(self._read_status, task_id)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Lỗi khi lấy trạng thái task {task_id}: {e}", exc_info=True)
+            return None
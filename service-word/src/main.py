@@ -1,89 +1,116 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-import threading
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from domain.models import Base
 
 from core.config import settings
+from core.logging_config import setup_logging
+from domain.exceptions import (
+    BaseServiceException, DocumentNotFoundException, TemplateNotFoundException,
+    InvalidDocumentFormatException, InvalidDataFormatException, FileTooLargeException
+)
 from api.routes import router as api_router
-from utils.grpc_server import start_grpc_server, GRPCServer
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from api.middleware import UploadSizeLimitMiddleware
+from application.services import (
+    DocumentService, TemplateService, convert_to_pdf_limited, get_conversion_stats, get_render_cache_stats
 )
+from infrastructure.repository import DocumentRepository, TemplateRepository, BatchProcessingRepository, TaskStatusRepository
+from infrastructure.minio_client import MinioClient
+from infrastructure.rabbitmq_client import RabbitMQClient
+from utils.grpc_server import start_grpc_server
+from utils.word_service import warm_up_libreoffice_profiles
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    description=settings.PROJECT_DESCRIPTION,
-    version=settings.PROJECT_VERSION,
-    docs_url="/docs",
-    redoc_url="/redoc",
-)
+grpc_server_instance = None
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.ALLOWED_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.include_router(api_router)
+def _build_services(app: FastAPI) -> None:
+    """
+    Khởi tạo một lần các client, repository và service dùng chung rồi gán vào app.state.
+    """
+    minio_client = MinioClient()
+    rabbitmq_client = RabbitMQClient()
+    task_repo = TaskStatusRepository()
+    document_repo = DocumentRepository(minio_client, app.state.db_session_factory)
 
-grpc_server_instance = None
-app.state.db_engine = None
-app.state.db_session_factory = None
+    template_service = TemplateService(
+        template_repository=TemplateRepository(minio_client),
+        minio_client=minio_client,
+        rabbitmq_client=rabbitmq_client,
+        batch_processing_repository=BatchProcessingRepository(),
+        task_repository=task_repo,
+        document_repository=document_repo
+    )
+
+    app.state.minio_client = minio_client
+    app.state.rabbitmq_client = rabbitmq_client
+    app.state.document_service = DocumentService(document_repo, minio_client, rabbitmq_client, task_repository=task_repo)
+    app.state.template_service = template_service
 
-@app.on_event("startup")
-async def startup_event():
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     """
-    Hàm được gọi khi ứng dụng khởi động.
-    Khởi động gRPC server trong một thread riêng.
-    Khởi tạo SQLAlchemy database engine và session factory.
+    Vòng đời ứng dụng.
+    Khi khởi động: tạo SQLAlchemy engine, session factory, các service dùng chung,
+    khởi tạo trước profile LibreOffice và gRPC server.
+    Khi shutdown: ghi metadata batch còn chờ, đóng kết nối RabbitMQ, engine và dừng gRPC server.
     """
     global grpc_server_instance
-    global app
-    
+
+    app.state.db_engine = None
+    app.state.db_session_factory = None
+    app.state.rabbitmq_client = None
+    app.state.document_service = None
+    app.state.template_service = None
+
     try:
-        # Create async engine with asyncpg driver
         app.state.db_engine = create_async_engine(
             settings.DATABASE_URL,
             echo=False,
             pool_size=10,
             max_overflow=20
         )
-        
-        # Create async session factory
         app.state.db_session_factory = async_sessionmaker(
             app.state.db_engine,
             expire_on_commit=False
         )
-        
         logger.info("SQLAlchemy async engine started for service-word.")
+        _build_services(app)
     except Exception as e:
-        logger.error(f"Không thể tạo SQLAlchemy engine: {e}")
+        logger.error(f"Không thể khởi tạo database engine hoặc các service: {e}")
+
+    if settings.PDF_BACKEND == "libreoffice":
+        await warm_up_libreoffice_profiles(settings.WORD_CONV_CONCURRENCY)
 
     grpc_host = f"[::]:{settings.GRPC_PORT}"
-    
     logger.info(f"Khởi động gRPC server trên {grpc_host}")
-    grpc_server_instance = start_grpc_server(host=grpc_host, max_workers=settings.GRPC_WORKERS)
-    
+    grpc_server_instance = start_grpc_server(
+        convert_to_pdf_limited, asyncio.get_running_loop(),
+        host=grpc_host, max_workers=settings.GRPC_WORKERS
+    )
     logger.info("Ứng dụng FastAPI và gRPC server đã khởi động")
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """
-    Hàm được gọi khi ứng dụng shutdown.
-    Dừng gRPC server nếu đang chạy.
-    Đóng SQLAlchemy database engine.
-    """
-    global grpc_server_instance
-    global app
+    yield
+
+    if app.state.template_service:
+        try:
+            await app.state.template_service.batch_processing_repository.flush()
+        except Exception as e:
+            logger.error(f"Lỗi khi ghi metadata batch còn chờ: {e}")
+
+    if app.state.rabbitmq_client:
+        try:
+            await app.state.rabbitmq_client.close_pools()
+        except Exception as e:
+            logger.error(f"Lỗi khi đóng kết nối RabbitMQ: {e}")
 
     if app.state.db_engine:
         try:
@@ -91,12 +118,63 @@ async def shutdown_event():
             logger.info("SQLAlchemy database engine đã được đóng.")
         except Exception as e:
             logger.error(f"Lỗi khi đóng SQLAlchemy engine: {e}")
-    
+
     if grpc_server_instance:
         logger.info("Dừng gRPC server")
         grpc_server_instance.stop(grace=5.0)
         logger.info("gRPC server đã dừng")
 
+
+app = FastAPI(
+    title=settings.PROJECT_NAME,
+    description=settings.PROJECT_DESCRIPTION,
+    version=settings.PROJECT_VERSION,
+    docs_url="/docs",
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+app.add_middleware(UploadSizeLimitMiddleware, max_size=settings.MAX_UPLOAD_SIZE)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=settings.ALLOWED_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.include_router(api_router)
+
+_EXCEPTION_STATUS_CODES = {
+    DocumentNotFoundException: 404,
+    TemplateNotFoundException: 404,
+    InvalidDocumentFormatException: 400,
+    InvalidDataFormatException: 400,
+    FileTooLargeException: 413,
+}
+
+
+@app.exception_handler(BaseServiceException)
+async def service_exception_handler(request: Request, exc: BaseServiceException):
+    """
+    Chuyển ngoại lệ nghiệp vụ thành response với status code tương ứng.
+    """
+    status_code = _EXCEPTION_STATUS_CODES.get(type(exc), 500)
+    if status_code >= 500:
+        logger.error(f"Lỗi khi xử lý {request.method} {request.url.path}: {exc.message}", exc_info=exc)
+    return ORJSONResponse(status_code=status_code, content={"detail": exc.message, "code": exc.code})
+
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """
+    Ghi log và trả về 500 cho các lỗi không mong đợi.
+    """
+    logger.error(f"Lỗi không mong đợi khi xử lý {request.method} {request.url.path}: {exc}", exc_info=exc)
+    return ORJSONResponse(status_code=500, content={"detail": "Lỗi máy chủ nội bộ"})
+
 @app.get("/", tags=["Root"])
 async def root():
     """API gốc - dùng để kiểm tra trạng thái hoạt động"""
@@ -112,7 +190,9 @@ async def health_check():
         "status": "healthy",
         "version": settings.PROJECT_VERSION,
         "service": "word-document",
-        "grpc_running": grpc_server_instance is not None and grpc_server_instance.running
+        "grpc_running": grpc_server_instance is not None and grpc_server_instance.running,
+        "conversions": get_conversion_stats(),
+        "template_render_cache": get_render_cache_stats()
     }
 
 if __name__ == "__main__":
@@ -1,22 +1,30 @@
 import os
 import grpc
+import asyncio
 import time
 import logging
 import threading
 from concurrent import futures
-from typing import Optional, Callable
+from typing import Optional, Callable, Awaitable
 
 from utils.word_pb2 import ConvertRequest, ConvertReply
 from utils.word_pb2_grpc import WordServiceServicer, add_WordServiceServicer_to_server
-from utils.word_service import WordConverter
 
 logger = logging.getLogger(__name__)
 
+ConvertFunc = Callable[[str, str], Awaitable[None]]
+
 class WordServiceImpl(WordServiceServicer):
     """
     Triển khai dịch vụ gRPC cho việc chuyển đổi Word sang PDF.
+    Việc chuyển đổi được đẩy sang event loop của ứng dụng để dùng chung giới hạn
+    WORD_CONV_CONCURRENCY và pool profile LibreOffice với DocumentService/TemplateService.
     """
     
+    def __init__(self, convert: ConvertFunc, loop: asyncio.AbstractEventLoop):
+        self.convert = convert
+        self.loop = loop
+    
     def ConvertToPDF(self, request, context):
         """
         Chuyển đổi tệp Word sang PDF qua gRPC.
@@ -37,10 +45,10 @@ class WordServiceImpl(WordServiceServicer):
                 return ConvertReply(success=False, message=error_msg)
             
             try:
-                output_path = WordConverter.convert_to_pdf_using_libreoffice(
-                    request.input_path, 
-                    request.output_path
-                )
+                output_path = request.output_path or f"{os.path.splitext(request.input_path)[0]}.pdf"
+                asyncio.run_coroutine_threadsafe(
+                    self.convert(request.input_path, output_path), self.loop
+                ).result()
                 
                 if os.path.exists(output_path):
                     logger.info(f"Chuyển đổi thành công: {output_path}")
@@ -66,14 +74,19 @@ class GRPCServer:
     Quản lý vòng đời của gRPC server.
     """
     
-    def __init__(self, host: str = "[::]:50051", max_workers: int = 10):
+    def __init__(self, convert: ConvertFunc, loop: asyncio.AbstractEventLoop,
+                 host: str = "[::]:50051", max_workers: int = 10):
         """
         Khởi tạo gRPC server.
         
         Args:
+            convert: Coroutine chuyển đổi (input_path, output_path) chạy trên loop
+            loop: Event loop của ứng dụng nơi các lần chuyển đổi được thực thi
             host: Host và port để server lắng nghe
             max_workers: Số lượng worker tối đa
         """
+        self.convert = convert
+        self.loop = loop
         self.host = host
         self.max_workers = max_workers
         self.server = None
@@ -92,7 +105,7 @@ class GRPCServer:
             return
             
         self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=self.max_workers))
-        add_WordServiceServicer_to_server(WordServiceImpl(), self.server)
+        add_WordServiceServicer_to_server(WordServiceImpl(self.convert, self.loop), self.server)
         self.server.add_insecure_port(self.host)
         self.server.start()
         self.running = True
@@ -136,7 +149,9 @@ class GRPCServer:
             logger.info("gRPC server đã dừng")
 
 
-def start_grpc_server(host: str = "[::]:50051", 
+def start_grpc_server(convert: ConvertFunc,
+                     loop: asyncio.AbstractEventLoop,
+                     host: str = "[::]:50051", 
                      max_workers: int = 10,
                      block: bool = False,
                      on_start: Optional[Callable] = None) -> GRPCServer:
@@ -144,6 +159,8 @@ def start_grpc_server(host: str = "[::]:50051",
     Khởi động gRPC server.
     
     Args:
+        convert: Coroutine chuyển đổi (input_path, output_path) chạy trên loop
+        loop: Event loop của ứng dụng nơi các lần chuyển đổi được thực thi
         host: Host và port để server lắng nghe
         max_workers: Số lượng worker tối đa
         block: Nếu True, hàm sẽ block cho đến khi server dừng
@@ -152,7 +169,7 @@ def start_grpc_server(host: str = "[::]:50051",
     Returns:
         Instance của GRPCServer
     """
-    server = GRPCServer(host, max_workers)
+    server = GRPCServer(convert, loop, host, max_workers)
     server.start(block=False)
     
     if on_start:
@@ -168,5 +185,9 @@ def start_grpc_server(host: str = "[::]:50051",
 
 
 if __name__ == "__main__":
+    from application.services import convert_to_pdf_limited
+
     logging.basicConfig(level=logging.INFO)
-    start_grpc_server(block=True) 
\ No newline at end of file
+    standalone_loop = asyncio.new_event_loop()
+    threading.Thread(target=standalone_loop.run_forever, daemon=True).start()
+    start_grpc_server(convert_to_pdf_limited, standalone_loop, block=True) 
\ No newline at end of file
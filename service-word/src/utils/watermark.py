@@ -95,14 +95,12 @@ class WatermarkHelper:
         """
         from docx_watermark import add_watermark
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_in:
-            temp_in.write(input_data)
-            temp_in_path = temp_in.name
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_out:
-            temp_out_path = temp_out.name
+        with tempfile.TemporaryDirectory() as work_dir:
+            temp_in_path = os.path.join(work_dir, "input.docx")
+            temp_out_path = os.path.join(work_dir, "output.docx")
+            with open(temp_in_path, "wb") as f:
+                f.write(input_data)
             
-        try:
             add_watermark(
                 input_docx=temp_in_path,
                 output_docx=temp_out_path,
@@ -117,12 +115,6 @@ class WatermarkHelper:
                 output_data = f.read()
                 
             return output_data
-            
-        finally:
-            if os.path.exists(temp_in_path):
-                os.unlink(temp_in_path)
-            if os.path.exists(temp_out_path):
-                os.unlink(temp_out_path)
                 
     @staticmethod
     def _add_watermark_with_groupdocs(
@@ -140,14 +132,12 @@ class WatermarkHelper:
         import groupdocs.watermark as gw
         import groupdocs.watermark.watermarks as gwo
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_in:
-            temp_in.write(input_data)
-            temp_in_path = temp_in.name
+        with tempfile.TemporaryDirectory() as work_dir:
+            temp_in_path = os.path.join(work_dir, "input.docx")
+            temp_out_path = os.path.join(work_dir, "output.docx")
+            with open(temp_in_path, "wb") as f:
+                f.write(input_data)
             
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_out:
-            temp_out_path = temp_out.name
-            
-        try:
             font = gwo.Font(font_name, font_size)
             
             with gw.Watermarker(temp_in_path) as watermarker:
@@ -189,12 +179,6 @@ class WatermarkHelper:
                 output_data = f.read()
                 
             return output_data
-            
-        finally:
-            if os.path.exists(temp_in_path):
-                os.unlink(temp_in_path)
-            if os.path.exists(temp_out_path):
-                os.unlink(temp_out_path)
                 
     @staticmethod
     def _add_watermark_direct(
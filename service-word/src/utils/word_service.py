@@ -1,13 +1,18 @@
 import os
+import signal
+import asyncio
 import tempfile
 import subprocess
 from pathlib import Path
 import logging
-from typing import Optional
+from typing import List, Optional, Tuple
 import uuid
 import time
+import queue
+import itertools
 import grpc
 
+from core.config import settings
 from utils.word_pb2 import ConvertRequest, ConvertReply
 from utils.word_pb2_grpc import WordServiceStub
 
@@ -15,6 +20,90 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_GRPC_SERVER = "service-word:50051"
 
+LIBREOFFICE_PROFILE_ROOT = os.getenv(
+    "LIBREOFFICE_PROFILE_DIR",
+    os.path.join(tempfile.gettempdir(), "libreoffice_profiles")
+)
+
+# Các thư mục profile LibreOffice được tái sử dụng giữa các lần chuyển đổi.
+# Mỗi lần chuyển đổi đang chạy giữ riêng một profile nên các tiến trình song song không tranh khóa profile,
+# và từ lần thứ hai trở đi LibreOffice không phải khởi tạo lại profile (phần tốn nhất của cold start).
+_libreoffice_profiles: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+_libreoffice_profile_ids = itertools.count()
+
+
+def _acquire_libreoffice_profile() -> str:
+    try:
+        return _libreoffice_profiles.get_nowait()
+    except queue.Empty:
+        profile_dir = os.path.join(LIBREOFFICE_PROFILE_ROOT, f"{os.getpid()}_{next(_libreoffice_profile_ids)}")
+        os.makedirs(profile_dir, exist_ok=True)
+        return profile_dir
+
+
+def _kill_libreoffice(process) -> None:
+    """
+    Dừng cả nhóm tiến trình LibreOffice (script libreoffice khởi chạy soffice.bin như tiến trình con).
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def _run_libreoffice_async(command: List[str]) -> Tuple[int, bytes]:
+    """
+    Chạy LibreOffice trong giới hạn LIBREOFFICE_TIMEOUT. Khi quá thời gian hoặc task bị hủy,
+    tiến trình bị kill và chờ thoát hẳn trước khi profile được trả về pool,
+    để lần chuyển đổi sau không gặp khóa profile của tiến trình cũ.
+    Trả về (returncode, stderr).
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), settings.LIBREOFFICE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _kill_libreoffice(process)
+        await process.wait()
+        raise Exception(f"LibreOffice không hoàn thành sau {settings.LIBREOFFICE_TIMEOUT} giây")
+    except BaseException:
+        if process.returncode is None:
+            _kill_libreoffice(process)
+            await asyncio.shield(process.wait())
+        raise
+    return process.returncode, stderr
+
+
+async def warm_up_libreoffice_profiles(count: int) -> None:
+    """
+    Khởi tạo trước count profile LibreOffice (soffice --terminate_after_init) và đưa vào pool,
+    để các lần chuyển đổi đầu tiên của tiến trình không phải trả chi phí khởi tạo profile.
+    """
+    async def warm_up(profile_dir: str) -> None:
+        returncode, stderr = await _run_libreoffice_async([
+            'libreoffice',
+            f'-env:UserInstallation={Path(profile_dir).as_uri()}',
+            '--headless',
+            '--terminate_after_init'
+        ])
+        if returncode != 0:
+            raise Exception(stderr.decode())
+
+    profile_dirs = [_acquire_libreoffice_profile() for _ in range(count)]
+    try:
+        results = await asyncio.gather(*(warm_up(profile_dir) for profile_dir in profile_dirs), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning(f"Không thể khởi tạo trước profile LibreOffice: {result}")
+    finally:
+        for profile_dir in profile_dirs:
+            _libreoffice_profiles.put(profile_dir)
+
+
 class WordConverter:
     """
     Lớp chuyển đổi tài liệu Word sang PDF sử dụng nhiều phương pháp.
@@ -39,36 +128,122 @@ class WordConverter:
             output_dir = os.path.dirname(input_path)
             output_path = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(input_path))[0]}.pdf")
         
+        profile_dir = _acquire_libreoffice_profile()
         try:
-            cmd = [
-                'libreoffice', 
-                '--headless', 
-                '--convert-to', 
-                'pdf', 
-                '--outdir', 
-                os.path.dirname(output_path), 
-                input_path
-            ]
-            
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            stdout, stderr = process.communicate()
+            process = subprocess.Popen(
+                WordConverter._libreoffice_command([input_path], os.path.dirname(output_path), profile_dir),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                start_new_session=True
+            )
+            try:
+                _, stderr = process.communicate(timeout=settings.LIBREOFFICE_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                _kill_libreoffice(process)
+                process.wait()
+                raise Exception(f"LibreOffice không hoàn thành sau {settings.LIBREOFFICE_TIMEOUT} giây")
             
             if process.returncode != 0:
                 logger.error(f"Lỗi khi chuyển đổi: {stderr.decode()}")
                 raise Exception(f"Lỗi khi chuyển đổi: {stderr.decode()}")
             
-            generated_pdf = os.path.join(
-                os.path.dirname(output_path), 
-                f"{os.path.splitext(os.path.basename(input_path))[0]}.pdf"
-            )
-            
-            if generated_pdf != output_path:
-                os.rename(generated_pdf, output_path)
-            
-            return output_path
+            return WordConverter._move_generated_pdf(input_path, output_path)
         except Exception as e:
             logger.error(f"Lỗi khi chuyển đổi file Word sang PDF: {str(e)}")
             raise
+        finally:
+            _libreoffice_profiles.put(profile_dir)
+
+    @staticmethod
+    async def convert_to_pdf_using_libreoffice_async(input_path: str, output_path: str) -> str:
+        """
+        Chuyển đổi tài liệu Word sang PDF bằng LibreOffice chạy như subprocess bất đồng bộ,
+        không giữ thread nào trong lúc chờ tiến trình soffice.
+        
+        Args:
+            input_path: Đường dẫn đến tài liệu Word
+            output_path: Đường dẫn để lưu tài liệu PDF đầu ra
+            
+        Returns:
+            Đường dẫn đến tài liệu PDF đã tạo
+        """
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Tệp đầu vào không tồn tại: {input_path}")
+        
+        profile_dir = _acquire_libreoffice_profile()
+        try:
+            returncode, stderr = await _run_libreoffice_async(
+                WordConverter._libreoffice_command([input_path], os.path.dirname(output_path), profile_dir)
+            )
+            
+            if returncode != 0:
+                logger.error(f"Lỗi khi chuyển đổi: {stderr.decode()}")
+                raise Exception(f"Lỗi khi chuyển đổi: {stderr.decode()}")
+            
+            return WordConverter._move_generated_pdf(input_path, output_path)
+        finally:
+            _libreoffice_profiles.put(profile_dir)
+
+    @staticmethod
+    async def convert_many_to_pdf_using_libreoffice_async(input_paths: List[str], output_dir: str) -> List[Optional[str]]:
+        """
+        Chuyển đổi nhiều tài liệu Word sang PDF trong một lần gọi soffice, để chi phí khởi động
+        LibreOffice được chia cho cả nhóm thay vì trả lại cho từng file.
+        
+        Args:
+            input_paths: Danh sách đường dẫn đến các tài liệu Word (tên file không trùng nhau)
+            output_dir: Thư mục để lưu các tài liệu PDF đầu ra
+            
+        Returns:
+            Đường dẫn PDF tương ứng với từng tài liệu đầu vào theo đúng thứ tự,
+            hoặc None nếu LibreOffice không tạo được PDF cho tài liệu đó
+        """
+        missing = [path for path in input_paths if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"Tệp đầu vào không tồn tại: {', '.join(missing)}")
+        
+        profile_dir = _acquire_libreoffice_profile()
+        try:
+            returncode, stderr = await _run_libreoffice_async(
+                WordConverter._libreoffice_command(input_paths, output_dir, profile_dir)
+            )
+            
+            if returncode != 0:
+                logger.error(f"Lỗi khi chuyển đổi: {stderr.decode()}")
+                raise Exception(f"Lỗi khi chuyển đổi: {stderr.decode()}")
+        finally:
+            _libreoffice_profiles.put(profile_dir)
+        
+        output_paths: List[Optional[str]] = []
+        for input_path in input_paths:
+            pdf_path = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(input_path))[0]}.pdf")
+            output_paths.append(pdf_path if os.path.exists(pdf_path) else None)
+        return output_paths
+
+    @staticmethod
+    def _libreoffice_command(input_paths: List[str], output_dir: str, profile_dir: str) -> List[str]:
+        return [
+            'libreoffice', 
+            f'-env:UserInstallation={Path(profile_dir).as_uri()}',
+            '--headless', 
+            '--convert-to', 
+            'pdf', 
+            '--outdir', 
+            output_dir, 
+            *input_paths
+        ]
+
+    @staticmethod
+    def _move_generated_pdf(input_path: str, output_path: str) -> str:
+        generated_pdf = os.path.join(
+            os.path.dirname(output_path), 
+            f"{os.path.splitext(os.path.basename(input_path))[0]}.pdf"
+        )
+        
+        if generated_pdf != output_path:
+            os.rename(generated_pdf, output_path)
+        
+        return output_path
 
     @staticmethod
     def convert_to_pdf_using_docx2pdf(input_path: str, output_path: Optional[str] = None) -> str:
@@ -0,0 +1,102 @@
+import sys
+import signal
+import asyncio
+import logging
+from typing import Any, Dict
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from core.config import settings
+from core.logging_config import setup_logging
+from application.services import DocumentService, TemplateService
+from infrastructure.repository import DocumentRepository, TemplateRepository, BatchProcessingRepository, TaskStatusRepository
+from infrastructure.minio_client import MinioClient
+from infrastructure.rabbitmq_client import RabbitMQClient
+from utils.word_service import warm_up_libreoffice_profiles
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+async def run() -> None:
+    """
+    Worker xử lý các tác vụ nặng (convert_to_pdf, watermark, apply_template)
+    trên queue word_service.tasks và các nhóm dòng batch trên word_service.batch_processing.
+    Consumer aio-pika chạy trên cùng event loop với các handler, loop chạy liên tục
+    nên heartbeat RabbitMQ và các tác vụ hẹn giờ (ghi metadata batch) không bị chặn.
+    """
+    db_engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=False,
+        pool_size=5,
+        max_overflow=5
+    )
+    db_session_factory = async_sessionmaker(db_engine, expire_on_commit=False)
+
+    minio_client = MinioClient()
+    rabbitmq_client = RabbitMQClient()
+    task_repo = TaskStatusRepository()
+    document_repo = DocumentRepository(minio_client, db_session_factory)
+    batch_repo = BatchProcessingRepository()
+
+    document_service = DocumentService(document_repo, minio_client, rabbitmq_client, task_repository=task_repo)
+    template_service = TemplateService(
+        template_repository=TemplateRepository(minio_client),
+        minio_client=minio_client,
+        rabbitmq_client=rabbitmq_client,
+        batch_processing_repository=batch_repo,
+        task_repository=task_repo,
+        document_repository=document_repo
+    )
+
+    if settings.PDF_BACKEND == "libreoffice":
+        await warm_up_libreoffice_profiles(settings.WORD_CONV_CONCURRENCY)
+
+    handlers = {
+        "convert_to_pdf": document_service.run_task,
+        "watermark": document_service.run_task,
+        "apply_template": template_service.run_task,
+    }
+
+    async def on_message(message: Dict[str, Any]) -> None:
+        handler = handlers.get(message.get("task_type"))
+        if not handler:
+            logger.warning(f"Bỏ qua task không hỗ trợ: {message.get('task_type')}")
+            return
+        await handler(message)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    try:
+        await rabbitmq_client.consume(rabbitmq_client.QUEUE_TASKS, on_message)
+        await rabbitmq_client.consume(
+            rabbitmq_client.QUEUE_BATCH_PROCESSING,
+            template_service.process_batch_chunk,
+            prefetch_count=settings.WORKER_PREFETCH_COUNT
+        )
+        logger.info(f"Word worker đang lắng nghe queue {rabbitmq_client.QUEUE_TASKS}, {rabbitmq_client.QUEUE_BATCH_PROCESSING}")
+        await stop_event.wait()
+    finally:
+        await rabbitmq_client.close_pools()
+        await batch_repo.flush()
+        await db_engine.dispose()
+
+
+def main() -> None:
+    if sys.platform != "win32":
+        import uvloop
+        loop = uvloop.new_event_loop()
+    else:
+        loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()